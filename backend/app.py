@@ -12,6 +12,7 @@ import base64
 import threading
 import serial
 import serial.tools.list_ports
+from sensors.parser import parse_raw_sensor_string
 from ml_engine import MLEngine  # Import ML Engine
 
 print("[DIAGNOSTIC] Environment OK ✅")
@@ -108,28 +109,6 @@ def calculate_cv_head_pose(landmarks, img_w, img_h):
     
     return pitch, yaw, roll
 
-def parse_raw_sensor_string(raw: str):
-
-    parts = [p.strip() for p in raw.split(',') if p.strip()]
-    parsed = {}
-    for p in parts:
-        if ':' not in p:
-            continue
-        k, v = p.split(':', 1)
-        k, v = k.lower(), v.strip()
-        try:
-            if k in ("t", "temperature"):
-                parsed["temperature"] = float(v)
-            elif k in ("hr", "bpm", "heart_rate"):
-                parsed["hr"] = float(v)
-            elif k in ("spo2", "sp02"):
-                parsed["spo2"] = float(v)
-            elif k in ("ax", "ay", "az", "gx", "gy", "gz"):
-                parsed[k] = float(v)
-        except ValueError:
-            continue
-    return parsed
-
 
 def find_arduino_port():
     # FORCE COM6 for now (User confirmed it exists)
@@ -0,0 +1,32 @@
+"""
+Per-frame decode + FaceMesh cost: full frame vs. ROI tracking.
+
+    python -m bench.face_roi <image>
+"""
+import sys
+import time
+
+from cv.perclos import create_face_mesh
+from cv.pipeline import analyze_frame
+
+
+def benchmark(image_path, frames=50):
+    with open(image_path, "rb") as f:
+        payload = f.read()
+
+    for label, use_roi in (("full frame", False), ("roi tracking", True)):
+        mesh = create_face_mesh()
+        hint = None
+        result = analyze_frame(payload, mesh, hint if use_roi else None)
+        start = time.perf_counter()
+        for _ in range(frames):
+            result = analyze_frame(payload, mesh, hint if use_roi else None)
+            hint = result["roi"]
+        elapsed = (time.perf_counter() - start) / frames
+        mesh.close()
+        roi = result["roi"] or {}
+        print(f"{label:>12}: {1000 * elapsed:6.2f} ms/frame (decode scale {roi.get('scale', 1)}, cropped {roi.get('cropped', False)})")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1])
@@ -0,0 +1,59 @@
+"""
+Per-frame head pose cost: the old rebuild-everything cold solve vs.
+HeadPoseSolver, on a synthetic head motion around real landmarks (moving,
+plus a still stretch where the skip applies).
+
+    python -m bench.head_pose <image>
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from cv.head_pose import MODEL_POINTS, HeadPoseSolver
+from cv.landmark_metrics import landmarks_to_array, pnp_image_points
+from cv.perclos import create_face_mesh, detect_face_landmarks
+
+
+def benchmark(image_path, frames=2000, epsilon=None):
+    frame = cv2.imread(image_path)
+    h, w = frame.shape[:2]
+    face = detect_face_landmarks(frame, create_face_mesh())
+    if face is None:
+        print(f"No face found in {image_path}")
+        return
+    base = pnp_image_points(landmarks_to_array(face), w, h)
+
+    rng = np.random.default_rng(0)
+    t = np.arange(frames)[:, None, None]
+    moving = base + 20 * np.sin(t / 15.0) + rng.normal(0, 0.5, (frames, 6, 2))
+    still = base + rng.normal(0, 0.1, (frames, 6, 2))
+
+    def cold(points):
+        model_points = MODEL_POINTS.copy()
+        camera_matrix = np.array([[w, 0, w / 2], [0, w, h / 2], [0, 0, 1]], dtype="double")
+        dist_coeffs = np.zeros((4, 1))
+        _, rvec, _ = cv2.solvePnP(model_points, points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
+        return cv2.RQDecomp3x3(cv2.Rodrigues(rvec)[0])[0]
+
+    for label, trajectory in (("moving head", moving), ("still head", still)):
+        start = time.perf_counter()
+        reference = [cold(p) for p in trajectory]
+        cold_us = 1e6 * (time.perf_counter() - start) / frames
+
+        solver = HeadPoseSolver(epsilon=epsilon, calibration={})
+        start = time.perf_counter()
+        solved = [solver.solve(p, w, h) for p in trajectory]
+        warm_us = 1e6 * (time.perf_counter() - start) / frames
+
+        # Compare modulo 360: RQDecomp3x3 may report the same rotation as +179 or -181
+        error = max(np.abs((np.subtract(a, b) + 180) % 360 - 180).max() for a, b in zip(reference, solved))
+        print(
+            f"{label:>12}: cold {cold_us:6.1f} us/frame, solver {warm_us:6.1f} us/frame "
+            f"({solver.solves} solves, {solver.skips} skips, max angle diff {error:.3f} deg)"
+        )
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1])
@@ -0,0 +1,62 @@
+"""
+Per-frame cost of the old list / math.dist landmark metrics vs. the array
+engine (cv.landmark_metrics), single and batched.
+
+    python -m bench.landmark_metrics <image>
+"""
+import math
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from cv.landmark_metrics import LEFT_EYE, MOUTH_INNER, PNP_POINTS, RIGHT_EYE, compute_metrics, landmarks_to_array
+from cv.perclos import create_face_mesh, detect_face_landmarks
+
+
+def benchmark(image_path, frames=2000):
+    frame = cv2.imread(image_path)
+    h, w = frame.shape[:2]
+    face_landmarks = detect_face_landmarks(frame, create_face_mesh())
+    if face_landmarks is None:
+        print(f"No face found in {image_path}")
+        return
+    lms = face_landmarks.landmark
+    points = landmarks_to_array(face_landmarks)
+
+    def lists():
+        def ear(eye):
+            return (math.dist(eye[1], eye[5]) + math.dist(eye[2], eye[4])) / (2.0 * math.dist(eye[0], eye[3]))
+        left = [(lms[i].x * w, lms[i].y * h) for i in LEFT_EYE]
+        right = [(lms[i].x * w, lms[i].y * h) for i in RIGHT_EYE]
+        mouth = [(lms[i].x * w, lms[i].y * h) for i in MOUTH_INNER]
+        pnp = np.array([(lms[i].x * w, lms[i].y * h) for i in PNP_POINTS], dtype="double")
+        return (ear(left) + ear(right)) / 2, math.dist(mouth[0], mouth[1]) / math.dist(mouth[2], mouth[3]), pnp
+
+    def vectorized():
+        return compute_metrics(points, w, h)
+
+    for label, fn in (("lists + math.dist", lists), ("array, per frame", vectorized)):
+        start = time.perf_counter()
+        for _ in range(frames):
+            fn()
+        print(f"{label:>20}: {1e6 * (time.perf_counter() - start) / frames:7.1f} us/frame")
+
+    batch = np.repeat(points[None], frames, axis=0)
+    start = time.perf_counter()
+    compute_metrics(batch, w, h)
+    print(f"{'array, batched':>20}: {1e6 * (time.perf_counter() - start) / frames:7.1f} us/frame ({frames} frames)")
+
+    for label, fn in (
+        ("to (N, 3), list", lambda: landmarks_to_array(face_landmarks)),
+        ("to (N, 3), sequence", lambda: landmarks_to_array(list(lms)))
+    ):
+        start = time.perf_counter()
+        for _ in range(200):
+            fn()
+        print(f"{label:>20}: {1e6 * (time.perf_counter() - start) / 200:7.1f} us/frame")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1])
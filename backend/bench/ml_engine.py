@@ -0,0 +1,98 @@
+"""
+Per-call latency of MLEngine's feature assembly + inference: the previous
+path (deque history -> np.array, mean / std, one-row DataFrame,
+predict_proba) vs. the preallocated buffers and the tree-by-tree forest
+path, back to back and paced at ML_INTERVAL. Uses the trained model when
+present, else a stand-in forest of the same shape as train_model.py's.
+
+    python -m bench.ml_engine [model.pkl]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from collections import deque
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ml.ml_engine import _TEMPORAL_INDEX, FEATURE_NAMES, MLEngine
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fatigue_model.pkl")
+
+
+def load_model(model_path):
+    if os.path.exists(model_path):
+        print(f"model: {model_path}")
+        return joblib.load(model_path)
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(rng.random((4000, len(FEATURE_NAMES))), columns=FEATURE_NAMES)
+    y = rng.integers(0, 3, len(X))
+    print("model: stand-in RandomForestClassifier(n_estimators=200, max_depth=15)")
+    return RandomForestClassifier(n_estimators=200, max_depth=15, random_state=42).fit(X, y)
+
+
+def benchmark(calls=300, paced_calls=10, interval=0.5, model_path=DEFAULT_MODEL):
+    model = load_model(model_path)
+
+    random.seed(1)
+    frames = [
+        ([random.uniform(0.2, 0.35), random.uniform(0.0, 0.5), random.gauss(0, 8), random.gauss(0, 8),
+          random.gauss(72, 4), random.gauss(36.6, 0.2)], random.uniform(0, 40))
+        for _ in range(calls)
+    ]
+
+    history = deque(maxlen=20)
+
+    def previous(sample, perclos):
+        history.append(sample)
+        data_matrix = np.array(history)
+        means = np.mean(data_matrix, axis=0)
+        stds = np.std(data_matrix, axis=0)
+        feature_vector = [perclos, means[0], stds[0], means[1], stds[1], means[2], stds[2], means[4], stds[4], means[5]]
+        return model.predict_proba(pd.DataFrame([feature_vector], columns=list(FEATURE_NAMES)))[0]
+
+    engine = MLEngine(model=model)
+    print(f"engine path: {'tree by tree' if engine._trees is not None else 'model.predict_proba'}")
+
+    def current(sample, perclos):
+        stats = engine._update_window(sample)
+        engine._features[0, 0] = perclos
+        np.take(stats, _TEMPORAL_INDEX, out=engine._features[0, 1:])
+        return engine.predict_proba(engine._features)
+
+    def latencies(fn, count, pause=0.0):
+        out = []
+        for sample, perclos in frames[:count]:
+            start = time.perf_counter()
+            fn(sample, perclos)
+            out.append(1000 * (time.perf_counter() - start))
+            if pause:
+                time.sleep(pause)
+        return sorted(out)
+
+    for sample, perclos in frames:
+        assert np.allclose(previous(sample, perclos), current(sample, perclos))
+    print(f"{calls} feature rows: identical probabilities")
+
+    for label, fn in (("previous", previous), ("current", current)):
+        fast = latencies(fn, calls)
+        paced = latencies(fn, paced_calls, interval)
+        print(f"{label:>9}: back to back p50 {fast[len(fast) // 2]:7.3f} ms, p99 {fast[int(len(fast) * 0.99)]:7.3f} ms "
+              f"({1000 / (sum(fast) / len(fast)):6.0f} calls/s); every {interval:g} s p50 {paced[len(paced) // 2]:7.3f} ms")
+
+    vision = {"status": "Active", "ear": 0.3, "mar": 0.1, "closed_frames": 0, "perclos": 12.0,
+              "head_angle_x": 3.0, "head_angle_y": -2.0}
+    sensor = {"hr": 72.0, "temperature": 36.6}
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = latencies(lambda sample, perclos: engine.predict(sensor, vision), calls)
+    print(f"full predict(): p50 {full[len(full) // 2]:.3f} ms")
+
+
+if __name__ == "__main__":
+    benchmark(model_path=sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL)
@@ -0,0 +1,49 @@
+"""
+IMU orientation filter cost per sample and steadiness on a noisy, still,
+biased IMU (sensors.orientation).
+
+    python -m bench.orientation
+"""
+import math
+import random
+import time
+
+from sensors.orientation import OrientationFilter
+
+
+def benchmark(samples=200000, rate=500):
+    g = 9.80665
+    pitch = math.radians(15)
+    stream = []
+    for _ in range(samples):
+        stream.append({
+            "ax": -g * math.sin(pitch) + random.gauss(0, 0.3),
+            "ay": random.gauss(0, 0.3),
+            "az": g * math.cos(pitch) + random.gauss(0, 0.3),
+            "gx": 0.02 + random.gauss(0, 0.01), "gy": -0.01 + random.gauss(0, 0.01), "gz": 0.03 + random.gauss(0, 0.01)
+        })
+
+    fused = OrientationFilter()
+    fused_x = []
+    start = time.perf_counter()
+    for i, sample in enumerate(stream):
+        fused.update_sample(sample, i / rate)
+        fused_x.append(fused.angles()[0])
+    per_sample = 1e6 * (time.perf_counter() - start) / samples
+
+    raw_x = [math.degrees(math.atan2(s["ax"], math.sqrt(s["ay"] ** 2 + s["az"] ** 2))) for s in stream]
+    settled = samples // 2
+
+    def spread(values):
+        values = values[settled:]
+        mean = sum(values) / len(values)
+        return math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+
+    print(f"filter: {per_sample:.2f} us/sample at {rate} Hz")
+    print(f"pitch (true -15.00 deg): accel-only {sum(raw_x[settled:]) / (samples - settled):6.2f} +- {spread(raw_x):.2f}, "
+          f"fused {sum(fused_x[settled:]) / (samples - settled):6.2f} +- {spread(fused_x):.2f}")
+    print(f"yaw after {samples / rate:.0f} s of 0.03 rad/s gyro bias: {fused.angles()[1]:.2f} deg")
+
+
+if __name__ == "__main__":
+    benchmark()
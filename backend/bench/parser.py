@@ -0,0 +1,58 @@
+"""
+Per-line cost of the original sensor line parser vs. the dispatch table,
+the compiled layout and the batch API (sensors.parser).
+
+    python -m bench.parser
+"""
+import time
+
+from sensors.parser import SensorLineParser, _parse_general
+
+LINE = "T:36.50, HR:72, SpO2:98.0, Ax:0.12, Ay:-0.40, Az:9.79, Gx:0.01, Gy:-0.02, Gz:0.00"
+
+
+def original(raw):
+    parts = [p.strip() for p in raw.split(',') if p.strip()]
+    parsed = {}
+    for p in parts:
+        if ':' not in p:
+            continue
+        k, v = p.split(':', 1)
+        k, v = k.lower(), v.strip()
+        try:
+            if k in ("t", "temperature"):
+                parsed["temperature"] = float(v)
+            elif k in ("hr", "bpm", "heart_rate"):
+                parsed["hr"] = float(v)
+            elif k in ("spo2", "sp02"):
+                parsed["spo2"] = float(v)
+            elif k in ("ax", "ay", "az", "gx", "gy", "gz"):
+                parsed[k] = float(v)
+        except ValueError:
+            continue
+    return parsed
+
+
+def benchmark(iterations=20000):
+    parser = SensorLineParser()
+    parser.parse(LINE) # Learns the layout
+
+    cases = [
+        ("original", lambda: original(LINE)),
+        ("dispatch table", lambda: _parse_general(LINE)),
+        ("compiled layout", lambda: parser.parse(LINE))
+    ]
+    for label, fn in cases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        print(f"{label:>16}: {1e6 * (time.perf_counter() - start) / iterations:6.2f} us/line")
+
+    lines = [LINE] * iterations
+    start = time.perf_counter()
+    parser.parse_lines(lines)
+    print(f"{'batch (columnar)':>16}: {1e6 * (time.perf_counter() - start) / iterations:6.2f} us/line ({iterations} lines)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,30 @@
+"""
+Replays a dataset into a SensorStore: ingest throughput (max speed) or
+schedule lag (paced). See sensors.replay.
+
+    python -m bench.replay [dataset] [speed]
+"""
+import sys
+import time
+
+from sensors.replay import ReplaySource, parse_speed
+from sensors.store import SensorStore
+
+
+def benchmark(dataset="fatigue_dataset", speed=None):
+    source = ReplaySource(dataset, speed)
+    store = SensorStore("replay", history_capacity=max(len(source.samples), 1))
+    start = time.perf_counter()
+    source.run(store.publish)
+    elapsed = time.perf_counter() - start
+    label = "max" if speed is None else f"{speed:g}x"
+    print(
+        f"{source.name} @ {label}: {source.stats['samples']} samples in {elapsed:.2f} s "
+        f"({source.stats['samples'] / elapsed:,.0f} samples/s, {source.stats['batches']} publishes), "
+        f"max lag {source.stats['max_lag_ms']:.1f} ms, history {len(store.history)} rows"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    benchmark(args[0] if args else "fatigue_dataset", parse_speed(args[1] if len(args) > 1 else "max"))
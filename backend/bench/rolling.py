@@ -0,0 +1,59 @@
+"""
+Per-frame cost of ml.rolling's incremental window against MLEngine's
+previous recompute (deque -> np.array, np.mean / np.std), and agreement
+with it and with pandas rolling() over a long run.
+
+    python -m bench.rolling
+"""
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from ml.rolling import RollingStats, rolling_features
+
+
+def benchmark(frames=20000, window=20):
+    rng = np.random.default_rng(0)
+    data = np.column_stack([
+        rng.normal(0.3, 0.03, frames), rng.normal(0.2, 0.1, frames), rng.normal(0, 8, frames),
+        rng.normal(0, 8, frames), rng.normal(72, 4, frames), rng.normal(36.6, 0.05, frames)
+    ])
+    rows = data.tolist()
+
+    def recompute_all():
+        history = deque(maxlen=window)
+        for row in rows:
+            history.append(row)
+            matrix = np.array(history)
+            yield np.mean(matrix, axis=0), np.std(matrix, axis=0)
+
+    def incremental_all():
+        stats = RollingStats(6, window)
+        for row in rows:
+            stats.add(row)
+            yield stats.means(), stats.stds()
+
+    timings = {}
+    for label, run in (("recompute", recompute_all), ("incremental", incremental_all)):
+        start = time.perf_counter()
+        for _ in run():
+            pass
+        timings[label] = 1e6 * (time.perf_counter() - start) / frames
+
+    error = 0.0
+    for (means, stds), (expected_means, expected_stds) in zip(incremental_all(), recompute_all()):
+        error = max(error, np.max(np.abs(np.subtract(means, expected_means))), np.max(np.abs(np.subtract(stds, expected_stds))))
+    print(f"window {window}, {frames} frames: recompute {timings['recompute']:.2f} us/frame, "
+          f"incremental {timings['incremental']:.2f} us/frame, max difference {error:.1e}")
+
+    means, stds = rolling_features(data, 5)
+    frame = pd.DataFrame(data)
+    pandas_error = max(np.nanmax(np.abs(means - frame.rolling(5, min_periods=1).mean().to_numpy())),
+                       np.nanmax(np.abs(stds - frame.rolling(5, min_periods=1).std().to_numpy())))
+    print(f"rolling_features(window=5) vs pandas rolling(): max difference {pandas_error:.1e}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,61 @@
+"""
+Feeds a virtual port (pty) at `rate` Hz and runs each serial read mode
+against it: samples received and reader CPU time per sample.
+
+    python -m bench.serial_reader [rate]
+"""
+import sys
+import threading
+import time
+
+import serial
+
+from config import get_config
+from sensors.serial_reader import read_bulk, read_lines_bulk, read_lines_legacy
+from sensors.virtual_port import VirtualSerialPort
+
+config = get_config()
+
+
+def benchmark(rate=500, seconds=5.0):
+    modes = (
+        ("line (legacy)", "text", read_lines_legacy),
+        ("bulk, text", "text", read_lines_bulk),
+        ("bulk, binary", "binary", read_bulk)
+    )
+    for label, protocol, read in modes:
+        device = VirtualSerialPort(protocol, rate)
+        ser = serial.Serial(device.port, baudrate=config.BAUD_RATE, timeout=0.1)
+        stop = threading.Event()
+        counts = {"samples": 0, "publishes": 0, "cpu": 0.0}
+
+        def publish(samples):
+            counts["samples"] += len(samples)
+            counts["publishes"] += 1
+
+        def reader():
+            start = time.thread_time()
+            try:
+                read(ser, publish, stop)
+            finally:
+                counts["cpu"] = time.thread_time() - start
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        device.start(limit=int(rate * seconds)).wait()
+        time.sleep(0.2)
+        stop.set()
+        thread.join(timeout=1)
+        ser.close()
+        device.close()
+
+        received = counts["samples"]
+        print(
+            f"{label:>14}: {received}/{device.count} samples, "
+            f"{1e6 * counts['cpu'] / max(received, 1):6.1f} us CPU/sample, "
+            f"{received / max(counts['publishes'], 1):.1f} samples/publish"
+        )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
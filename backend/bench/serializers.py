@@ -0,0 +1,66 @@
+"""
+Encoding cost of one /api/combined_data payload: FastAPI's default path
+(jsonable_encoder + json.dumps, after converting NumPy by hand as the
+routes used to) vs. the serializers module.
+
+    python -m bench.serializers
+"""
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from serializers import _msgpack_dumps, _orjson_dumps, _stdlib_json_dumps
+
+
+def benchmark(iterations=20000):
+    ema_probs = np.array([0.71234, 0.21345, 0.07421])
+    payload = {
+        "sensor": {
+            "temperature": 36.6, "ax": 0.12, "ay": -0.4, "az": 9.79,
+            "gx": 0.01, "gy": -0.02, "gz": 0.0, "hr": 72.0, "spo2": 98.1,
+            "timestamp": int(time.time())
+        },
+        "perclos": {
+            "perclos": np.float64(12.5), "ear": np.float64(0.2874), "mar": np.float64(0.0412),
+            "status": "Alert", "closed_frames": 0, "is_calibrating": False,
+            "calibration_progress": 100, "ear_threshold": 0.2143
+        },
+        "head_position": {
+            "position": "Center", "angle_x": 2.31, "angle_y": -4.12, "angle_z": 0.56,
+            "timestamp": int(time.time()), "source": "Vision (Fallback)", "calibrated": True
+        },
+        "prediction": {
+            "status": "Alert", "confidence": ema_probs.max(), "raw_probs": ema_probs.round(2),
+            "flag": None
+        },
+        "server_time": int(time.time()),
+        "system_status": "Active"
+    }
+
+    def legacy():
+        converted = {**payload, "prediction": {
+            **payload["prediction"],
+            "confidence": round(float(ema_probs.max()), 2),
+            "raw_probs": [round(float(p), 2) for p in ema_probs]
+        }, "perclos": {k: float(v) if isinstance(v, np.floating) else v for k, v in payload["perclos"].items()}}
+        return json.dumps(jsonable_encoder(converted)).encode("utf-8")
+
+    cases = [("fastapi default", legacy), ("stdlib json", lambda: _stdlib_json_dumps(payload))]
+    if _orjson_dumps is not None:
+        cases.append(("orjson", lambda: _orjson_dumps(payload)))
+    if _msgpack_dumps is not None:
+        cases.append(("msgpack", lambda: _msgpack_dumps(payload)))
+
+    for label, fn in cases:
+        size = len(fn())
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call = 1e6 * (time.perf_counter() - start) / iterations
+        print(f"{label:>16}: {per_call:7.2f} us/response, {size} bytes")
+
+
+if __name__ == "__main__":
+    benchmark()
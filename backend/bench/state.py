@@ -0,0 +1,58 @@
+"""
+Sensor state reader throughput while a writer thread publishes: the old
+lock-and-copy dict vs. snapshot reads (sensors.state).
+
+    python -m bench.state
+"""
+import threading
+import time
+
+from sensors.state import SensorState
+
+
+def benchmark(seconds=1.0, write_rate=2000):
+    fields = {"temperature": 36.6, "ax": 0.1, "ay": 0.2, "az": 9.8, "gx": 0.0, "gy": 0.0, "gz": 0.0,
+              "hr": 72.0, "spo2": 98.0, "timestamp": int(time.time())}
+
+    def run(write, read):
+        stop = threading.Event()
+
+        def writer():
+            interval = 1.0 / write_rate
+            while not stop.is_set():
+                write()
+                time.sleep(interval)
+
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+        reads = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for _ in range(100):
+                read()
+            reads += 100
+        stop.set()
+        thread.join()
+        return reads / seconds
+
+    lock = threading.Lock()
+    legacy = dict(fields)
+
+    def legacy_write():
+        with lock:
+            legacy.update(fields)
+
+    def legacy_read():
+        with lock:
+            return legacy.copy()
+
+    state = SensorState(fields)
+    for label, write, read in [
+        ("lock + copy", legacy_write, legacy_read),
+        ("snapshot", lambda: state.update(fields), lambda: state.current.data)
+    ]:
+        print(f"{label:>12}: {run(write, read) / 1e6:6.2f} M reads/s with writes at {write_rate} Hz")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,48 @@
+"""
+FaceMeshWorkerPool throughput for increasing worker counts, many sessions
+streaming at once.
+
+    python -m bench.worker_pool <image> [workers ...]
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from cv.worker_pool import FaceMeshPoolBusy, FaceMeshWorkerPool
+
+
+def benchmark(image_path, workers=(1, 2, 4), sessions=8, frames_per_session=30):
+    """Frames/second of the pool for increasing worker counts, many sessions streaming at once."""
+    with open(image_path, "rb") as f:
+        payload = f.read()
+    h, w = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR).shape[:2]
+    print(f"Image: {image_path} ({w}x{h}), {sessions} sessions x {frames_per_session} frames")
+
+    for n in workers:
+        pool = FaceMeshWorkerPool(num_workers=n, queue_size=frames_per_session)
+        pool.start()
+        # Warm up: one frame per session builds every graph
+        for f in [pool.submit(f"s{s}", payload) for s in range(sessions)]:
+            f.result()
+
+        start = time.perf_counter()
+        futures = []
+        for _ in range(frames_per_session):
+            for s in range(sessions):
+                while True:
+                    try:
+                        futures.append(pool.submit(f"s{s}", payload))
+                        break
+                    except FaceMeshPoolBusy:
+                        time.sleep(0.001)
+        for f in futures:
+            f.result()
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+        print(f"{n} worker(s): {len(futures) / elapsed:7.1f} frames/s")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1], workers=tuple(int(n) for n in sys.argv[2:]) or (1, 2, 4))
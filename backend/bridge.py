@@ -3,13 +3,36 @@ import serial
 import serial.tools.list_ports
 import time
 import json
+import gzip
+import os
+import socket
+import threading
 import traceback
+from collections import deque
 
 # --- CONFIGURATION ---
 ARDUINO_PORT = "COM6"
 BAUD_RATE = 115200
-BACKEND_URL = "https://fatigue-backend-40t1.onrender.com"  
-API_ENDPOINT = f"{BACKEND_URL}/sensor_data/ingest"  
+BACKEND_URL = "https://fatigue-backend-40t1.onrender.com"
+API_ENDPOINT = f"{BACKEND_URL}/api/sensor_data/ingest/batch"
+DEVICE_ID = socket.gethostname()
+
+# Lines are uploaded in batches: whichever limit is hit first
+BATCH_INTERVAL = 1.0 # Seconds
+BATCH_MAX_LINES = 200
+UPLOAD_TIMEOUT = 5
+
+# Store-and-forward: batches wait in memory while the uploader is busy or the
+# backend is unreachable; past QUEUE_MAX_BATCHES they go to the disk spool.
+QUEUE_MAX_BATCHES = 60
+SPOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bridge_spool")
+SPOOL_MAX_BYTES = 200 * 1024 * 1024 # Beyond this new batches are dropped (and counted)
+REPLAY_MAX_LINES = 5000 # Spooled batches are merged into requests of up to this many lines
+RETRY_MIN = 1.0 # Seconds; doubles per failed upload up to RETRY_MAX
+RETRY_MAX = 30.0
+# Statuses worth retrying besides 5xx; any other 4xx means the batch itself was refused
+RETRY_STATUSES = (408, 429)
+STATS_INTERVAL = 10.0
 
 def find_arduino():
     ports = list(serial.tools.list_ports.comports())
@@ -18,44 +41,407 @@ def find_arduino():
             return p.device
     return ARDUINO_PORT
 
-def bridge():
+def encode_batch(lines):
+    """[[timestamp, line], ...] -> gzip-compressed JSON body for the batch endpoint."""
+    body = json.dumps({"device_id": DEVICE_ID, "lines": lines}, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(body, compresslevel=6)
+
+class BatchRejected(Exception):
+    """The backend refused the batch itself (a 4xx other than RETRY_STATUSES); retrying can't help."""
+
+    def __init__(self, status_code, detail=""):
+        super().__init__(f"HTTP {status_code} {detail}".strip())
+        self.status_code = status_code
+
+def upload_batch(session, lines, endpoint=None):
+    """
+    POSTs one batch over the keep-alive session. Returns the body size sent,
+    or None on a failure worth retrying (network error, 5xx, 408 / 429).
+    Raises BatchRejected when the backend refuses the batch for good.
+    """
+    body = encode_batch(lines)
+    try:
+        response = session.post(
+            endpoint or API_ENDPOINT,
+            data=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+            timeout=UPLOAD_TIMEOUT
+        )
+    except Exception as req_e:
+        print(f"⚠️ Cloud Upload Failed ({len(lines)} lines): {req_e}")
+        return None
+    status = response.status_code
+    if 400 <= status < 500 and status not in RETRY_STATUSES:
+        raise BatchRejected(status, response.text[:200])
+    if status >= 400:
+        print(f"⚠️ Cloud Upload Failed ({len(lines)} lines): HTTP {status}")
+        return None
+    return len(body)
+
+class BatchSpool:
+    """
+    Append-only on-disk queue of batches: one JSON line per batch in
+    spool.jsonl, plus the byte offset of the first batch not yet uploaded
+    in spool.offset. Survives restarts; once everything is uploaded the
+    spool is truncated.
+
+    Delivery is at-least-once: a crash between an upload and the offset
+    update replays that request. A record cut short by a crash mid-append
+    is truncated when the spool is opened; records that still fail to
+    decode are skipped (and counted in .corrupt).
+    """
+
+    def __init__(self, directory=SPOOL_DIR, max_bytes=SPOOL_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, "spool.jsonl")
+        self.offset_path = os.path.join(directory, "spool.offset")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.corrupt = 0
+        self._size = self._truncate_partial_record() if os.path.exists(self.path) else 0
+        self._offset = 0
+        if os.path.exists(self.offset_path):
+            with open(self.offset_path) as f:
+                self._offset = min(int(f.read().strip() or 0), self._size)
+        self._file = open(self.path, "ab")
+
+    @property
+    def pending(self):
+        """Bytes spooled but not uploaded yet."""
+        return self._size - self._offset
+
+    def append(self, lines):
+        """Writes one batch to the end of the spool. Returns False if the spool is full."""
+        record = json.dumps(lines, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._size + len(record) > self.max_bytes:
+                return False
+            self._file.write(record)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._size += len(record)
+        return True
+
+    def read(self, max_lines=REPLAY_MAX_LINES):
+        """
+        The oldest spooled batches, merged (at least one batch, at most
+        max_lines lines unless a single batch is larger) -> (lines, offset
+        to commit() once they are uploaded). ([], None) if empty.
+        """
+        with self._lock:
+            if self._size <= self._offset:
+                return [], None
+            lines = []
+            offset = self._offset
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                while offset < self._size:
+                    record = f.readline()
+                    if not record.endswith(b"\n"):
+                        break
+                    try:
+                        batch = json.loads(record)
+                        if not isinstance(batch, list):
+                            raise ValueError(f"expected a list of lines, got {type(batch).__name__}")
+                    except ValueError as e:
+                        print(f"⚠️ Skipping corrupt spool record at byte {offset} ({len(record)} bytes): {e}")
+                        self.corrupt += 1
+                        offset += len(record)
+                        continue
+                    if lines and len(lines) + len(batch) > max_lines:
+                        break
+                    lines.extend(batch)
+                    offset += len(record)
+            if not lines:
+                # Only corrupt records: nothing to upload, move past them now
+                self._offset = offset
+                if self._offset >= self._size:
+                    self._reset()
+                else:
+                    self._write_offset()
+                return [], None
+            return lines, offset
+
+    def commit(self, offset):
+        """Marks everything before `offset` as uploaded; empties the spool once it's all sent."""
+        with self._lock:
+            self._offset = max(self._offset, offset)
+            if self._offset >= self._size:
+                self._reset()
+            else:
+                self._write_offset()
+
+    def prepend(self, batches):
+        """
+        Puts `batches` in front of the unsent spool contents (shutdown: data
+        that was still in memory is older than anything spooled). Rewrites
+        the file once.
+        """
+        if not batches:
+            return
+        with self._lock:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                remaining = f.read()
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                for lines in batches:
+                    f.write(json.dumps(lines, separators=(",", ":")).encode("utf-8") + b"\n")
+                f.write(remaining)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "ab")
+            self._size = os.path.getsize(self.path)
+            self._offset = 0
+            self._write_offset()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _truncate_partial_record(self):
+        """
+        Cuts the spool after its last complete record (a crash mid-append
+        leaves a partial one, which the next append would run into).
+        Returns the resulting size.
+        """
+        size = os.path.getsize(self.path)
+        end = size
+        with open(self.path, "r+b") as f:
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                print(f"⚠️ Spool ended in a partial record: truncated {size - end} bytes")
+                f.truncate(end)
+        return end
+
+    # Caller holds the lock
+    def _write_offset(self):
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(self._offset))
+        os.replace(tmp, self.offset_path)
+
+    def _reset(self):
+        self._file.close()
+        self._file = open(self.path, "wb") # Truncates
+        self._size = 0
+        self._offset = 0
+        if os.path.exists(self.offset_path):
+            os.remove(self.offset_path)
+
+class StoreAndForward:
+    """
+    Hands batches from the serial reader to the uploader thread, in order,
+    without ever blocking the reader.
+
+    New batches go to a bounded in-memory queue. Once the queue is full, or
+    anything is already spooled, they go to the disk spool instead. Memory
+    therefore always holds older batches than the spool, and the uploader
+    drains memory first and the spool second. A failed upload is retried
+    (with backoff) before anything newer is sent; a batch the backend
+    rejects outright (BatchRejected) is dropped and counted instead, so it
+    can't hold up everything behind it.
+
+    Counters: the reader thread owns read / spooled / dropped, the uploader
+    owns the rest.
+    """
+
+    def __init__(self, endpoint=None, spool=None, max_batches=None):
+        self.endpoint = endpoint or API_ENDPOINT
+        self.spool = spool or BatchSpool()
+        self.max_batches = max_batches or QUEUE_MAX_BATCHES
+        self._memory = deque()
+        self._held = None # (lines, spool offset or None) being uploaded / retried
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "lines_read": 0, "lines_uploaded": 0, "requests": 0, "bytes_sent": 0,
+            "upload_failures": 0, "lines_spooled": 0, "lines_replayed": 0, "lines_dropped": 0,
+            "batches_rejected": 0, "lines_rejected": 0, "uploader_errors": 0
+        }
+
+    def put(self, lines):
+        """Queues one batch (reader thread). Never blocks on the network."""
+        self.stats["lines_read"] += len(lines)
+        with self._cond:
+            if self.spool.pending or len(self._memory) >= self.max_batches:
+                if self.spool.append(lines):
+                    self.stats["lines_spooled"] += len(lines)
+                else:
+                    self.stats["lines_dropped"] += len(lines)
+            else:
+                self._memory.append(lines)
+            self._cond.notify()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="bridge-uploader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _next(self):
+        with self._cond:
+            if self._memory:
+                return self._memory.popleft(), None
+        lines, offset = self.spool.read()
+        if lines:
+            return lines, offset
+        return None
+
+    def _run(self):
+        # One session per uploader: the TCP/TLS connection is reused across uploads
+        session = requests.Session()
+        retry = RETRY_MIN
+        try:
+            while not self._stop.is_set():
+                try:
+                    retry = self._step(session, retry)
+                except Exception as e:
+                    # Keep draining: a dead uploader would leave the spool growing until the restart
+                    print(f"❌ Uploader Error: {e}")
+                    traceback.print_exc()
+                    self.stats["uploader_errors"] += 1
+                    self._stop.wait(retry)
+                    retry = min(retry * 2, RETRY_MAX)
+        finally:
+            session.close()
+
+    def _step(self, session, retry):
+        """One uploader iteration: picks the next batch if none is held and tries to send it. Returns the next retry delay."""
+        if self._held is None:
+            self._held = self._next()
+            if self._held is None:
+                with self._cond:
+                    self._cond.wait(0.5)
+                return retry
+
+        lines, offset = self._held
+        try:
+            sent = upload_batch(session, lines, self.endpoint)
+        except BatchRejected as e:
+            print(f"🚫 Batch rejected by the backend ({len(lines)} lines dropped): {e}")
+            self.stats["batches_rejected"] += 1
+            self.stats["lines_rejected"] += len(lines)
+            if offset is not None:
+                self.spool.commit(offset)
+            self._held = None
+            return RETRY_MIN
+        if sent is None:
+            self.stats["upload_failures"] += 1
+            self._stop.wait(retry)
+            return min(retry * 2, RETRY_MAX)
+
+        if offset is not None:
+            self.spool.commit(offset)
+            self.stats["lines_replayed"] += len(lines)
+        self.stats["lines_uploaded"] += len(lines)
+        self.stats["requests"] += 1
+        self.stats["bytes_sent"] += sent
+        self._held = None
+        return RETRY_MIN
+
+    def flush(self, timeout):
+        """Waits up to `timeout` seconds for everything queued or spooled to be uploaded."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._held is None and not self._memory and not self.spool.pending:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def close(self):
+        """Stops the uploader; whatever is still in memory is saved to the spool for the next run."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(UPLOAD_TIMEOUT + 1)
+        unsent = []
+        if self._held is not None and self._held[1] is None:
+            unsent.append(self._held[0]) # Spooled batches stay in the spool (offset not committed)
+        with self._cond:
+            unsent.extend(self._memory)
+            self._memory.clear()
+        self.spool.prepend(unsent)
+        self.spool.close()
+
+    def report(self, elapsed):
+        stats = self.stats
+        print(
+            f"📊 {stats['lines_read'] / elapsed:.1f} lines/s read, {stats['lines_uploaded'] / elapsed:.1f} lines/s uploaded "
+            f"in {stats['requests']} requests ({stats['bytes_sent'] / 1024:.0f} KB) | "
+            f"queued {len(self._memory)}, spool {self.spool.pending / 1024:.0f} KB | "
+            f"failures {stats['upload_failures']}, spooled {stats['lines_spooled']}, "
+            f"replayed {stats['lines_replayed']}, dropped {stats['lines_dropped']}, "
+            f"rejected {stats['lines_rejected']} ({stats['batches_rejected']} batches), "
+            f"corrupt spool records {self.spool.corrupt}, uploader errors {stats['uploader_errors']}"
+        )
+
+def bridge(port=None, endpoint=None, stop=None, spool_dir=SPOOL_DIR):
     print(f"🌉 Starting Hardware Bridge...")
-    print(f"🚀 Target Backend: {BACKEND_URL}")
-    
-    port = find_arduino()
+    print(f"🚀 Target Backend: {endpoint or BACKEND_URL}")
+
+    port = port or find_arduino()
     print(f"🔌 Connecting to Port: {port}")
 
+    stop = stop or threading.Event()
+    forwarder = StoreAndForward(endpoint, BatchSpool(spool_dir))
+    if forwarder.spool.pending:
+        print(f"💾 Replaying {forwarder.spool.pending / 1024:.0f} KB spooled by a previous run")
+    forwarder.start()
+    started = time.monotonic()
+
     try:
-        ser = serial.Serial(port, BAUD_RATE, timeout=1)
+        # Blocking readline with a short timeout; uploads happen on the uploader thread
+        ser = serial.Serial(port, BAUD_RATE, timeout=min(0.2, BATCH_INTERVAL))
         time.sleep(2) # Allow reset
         print("✅ Serial Connection Established")
-        
-        while True:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8', errors='ignore').strip()
-                if not line: continue
-                
-                print(f"📥 [RAW]: {line}")
-                
-                # Parse
-                # Expected format: "T:36.5, HR:72, Ax:0.1..."
-                # We can just send the raw string to the backend to parse, 
-                # OR parse it here. Sending raw string is easier.
-                
-                payload = {"raw_sensor_data": line}
-                
-                try:
-                    # POST to Cloud
-                    # Note: We need to implement /ingest endpoint in server.py
-                    # For now, let's just print what we WOULLD do
-                    response = requests.post(API_ENDPOINT, json=payload, timeout=2)
-                    # pass
-                except Exception as req_e:
-                    print(f"⚠️ Cloud Upload Failed: {req_e}")
 
+        batch = []
+        deadline = time.monotonic() + BATCH_INTERVAL
+        next_report = time.monotonic() + STATS_INTERVAL
+        while not stop.is_set():
+            raw = ser.readline()
+            if raw:
+                line = raw.decode('utf-8', errors='ignore').strip()
+                if line:
+                    # Expected format: "T:36.5, HR:72, Ax:0.1..." (parsed by the backend)
+                    batch.append([round(time.time(), 3), line])
+
+            now = time.monotonic()
+            if batch and (len(batch) >= BATCH_MAX_LINES or now >= deadline):
+                forwarder.put(batch)
+                batch = []
+            if now >= deadline:
+                deadline = now + BATCH_INTERVAL
+            if now >= next_report:
+                forwarder.report(now - started)
+                next_report = now + STATS_INTERVAL
+        if batch:
+            forwarder.put(batch)
+        ser.close()
+
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"❌ Bridge Error: {e}")
         traceback.print_exc()
+    finally:
+        forwarder.flush(UPLOAD_TIMEOUT)
+        forwarder.close()
+        forwarder.report(max(time.monotonic() - started, 1e-9))
+    return forwarder.stats
 
 if __name__ == "__main__":
     bridge()
@@ -9,13 +9,81 @@ class Config:
     # Defaulting to COM6 as per recent user diagnostics, but serial_reader will also auto-detect.
     ARDUINO_PORT = os.environ.get("ARDUINO_PORT", "COM6") 
     BAUD_RATE = int(os.environ.get("BAUD_RATE", 115200))
-    MAX_HISTORY = 100 # Number of sensor readings to keep in memory
+    MAX_HISTORY = 100 # Sensor readings returned by /sensor_data/history when no range is given
+    # Ring buffer rows kept in memory (44 bytes each: 131072 ~ 5.8 MB, hours at typical sensor rates)
+    SENSOR_HISTORY_CAPACITY = int(os.environ.get("SENSOR_HISTORY_CAPACITY", 131072))
     SENSOR_TIMEOUT = 2.0 # Seconds before sensor data is considered "Stale"
+    INGEST_MAX_LINES = 10000 # Lines per /sensor_data/ingest/batch request
+    INGEST_MAX_BYTES = 8 * 1024 * 1024 # Request body size after gzip decompression
+    INGEST_MAX_DEVICES = int(os.environ.get("INGEST_MAX_DEVICES", 16)) # Bridge device ids given their own store
     USE_MOCK_DATA = False # Set to True to enable random data generation when sensors are disconnected
+    # "bulk": blocking reads of everything buffered, lines parsed in batches;
+    # "line": the original in_waiting poll + readline() per line
+    SERIAL_READ_MODE = os.environ.get("SERIAL_READ_MODE", "bulk")
+    SERIAL_ECHO = os.environ.get("SERIAL_ECHO", "0") == "1" # Print every received line (bulk mode)
+    # Wire protocol: "text" lines, "binary" COBS/CRC frames (sensors.framing) or "auto"-detect per port
+    SERIAL_PROTOCOL = os.environ.get("SERIAL_PROTOCOL", "auto")
+    # Multi-seat: read every sensor board at once, one store per device (sensors.acquisition)
+    SENSOR_MULTI_PORT = os.environ.get("SENSOR_MULTI_PORT", "0") == "1"
+    # Extra / named ports for multi-port mode: "seat1=/dev/ttyUSB0,seat2=<USB serial number>"
+    SENSOR_PORTS = os.environ.get("SENSOR_PORTS", "")
+    SENSOR_SCAN_INTERVAL = float(os.environ.get("SENSOR_SCAN_INTERVAL", 2.0)) # Seconds between hot-plug scans
+    # IMU orientation filter (sensors.orientation), run once per sample
+    IMU_GYRO_UNITS = os.environ.get("IMU_GYRO_UNITS", "rad/s") # Or "deg/s", depending on the firmware
+    IMU_FILTER_TAU = float(os.environ.get("IMU_FILTER_TAU", 0.5)) # Seconds; larger trusts the gyro longer
+    IMU_YAW_RECENTER = float(os.environ.get("IMU_YAW_RECENTER", 20.0)) # Seconds for relative yaw to decay to 0
+    # Heart rate / HRV statistics (sensors.cardio): sliding window lengths in seconds
+    CARDIO_WINDOWS = tuple(float(w) for w in os.environ.get("CARDIO_WINDOWS", "30,60,300").split(","))
     
     # --- ML Engine Configuration ---
     MODEL_PATH = os.path.join(os.path.dirname(__file__), "fatigue_model.pkl")
     ML_INTERVAL = 0.5 # Seconds between ML predictions to prevent CPU overload
+
+    # --- Vision Executor ---
+    # "thread" shares memory with the server; "process" sidesteps the GIL for FaceMesh
+    VISION_EXECUTOR = os.environ.get("VISION_EXECUTOR", "thread")
+    VISION_WORKERS = int(os.environ.get("VISION_WORKERS", 2))
+    LOOP_LAG_INTERVAL = 0.5 # Seconds between event loop lag probes
+
+    # --- FaceMesh Worker Pool ---
+    # > 0 runs detection in that many processes, each session pinned to one worker
+    # (its own FaceMesh graph). 0 keeps detection on the vision executor.
+    FACE_MESH_WORKERS = int(os.environ.get("FACE_MESH_WORKERS", 0))
+    FACE_MESH_QUEUE_SIZE = 4 # Frames queued per worker before new ones are dropped
+
+    # --- Frame Scheduling (per WebSocket) ---
+    # Upper bound on analyzed frames/s per session; the freshest frame always wins
+    # and the real rate drops automatically when the pipeline is slower than this.
+    VISION_TARGET_FPS = float(os.environ.get("VISION_TARGET_FPS", 10))
+
+    # --- Face ROI Tracking ---
+    # Crop FaceMesh input to the previous frame's face box and decode large
+    # faces at 1/2 or 1/4 resolution; falls back to the full frame on loss.
+    # Opt-in (=1): landmarks from a crop differ slightly from full-frame ones.
+    VISION_ROI_TRACKING = os.environ.get("VISION_ROI_TRACKING", "0") == "1"
+    # Frames are flipped before FaceMesh (one image copy), as they always were.
+    # Set to 0 to mirror the landmarks instead (no copy); FaceMesh is not
+    # exactly mirror-symmetric, so the results differ slightly.
+    VISION_MIRROR_PIXELS = os.environ.get("VISION_MIRROR_PIXELS", "1") != "0"
+
+    # --- Head Pose ---
+    HEAD_POSE_EPSILON = 0.5 # Pixels; PnP is skipped when no image point moved more than this
+    # Optional OpenCV calibration (.yml/.xml/.npz/.json); default is a focal-length-equals-width guess
+    CAMERA_CALIBRATION_FILE = os.environ.get("CAMERA_CALIBRATION_FILE")
+
+    # --- Dashboard Stream (/ws/stream) ---
+    STREAM_INTERVAL = float(os.environ.get("STREAM_INTERVAL", 0.5)) # Seconds between pushed snapshots
+    STREAM_SEND_TIMEOUT = 2.0 # Seconds a subscriber may take per message before it is disconnected
+    STREAM_MAX_SUBSCRIBERS = 256
+
+    # --- Serialization ---
+    # "auto": orjson when installed; "json" forces the stdlib encoder
+    JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+    # --- Sessions (one per driver / device) ---
+    MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", 64))
+    SESSION_IDLE_TIMEOUT = 300 # Seconds without frames or requests before a session is evicted
+    SESSION_EVICT_INTERVAL = 30 # Seconds between idle eviction sweeps
     
     # --- Logging / Debug ---
     DEBUG = True
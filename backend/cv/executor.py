@@ -0,0 +1,162 @@
+"""
+Runs CPU-heavy vision / ML work off the asyncio event loop.
+
+FastAPI handlers are `async def`, so anything that blocks (cv2.imdecode,
+MediaPipe FaceMesh, solvePnP, model inference) stalls every other request
+and WebSocket while it runs. VisionExecutor wraps a configurable thread or
+process pool behind awaitables, and LoopLagMonitor measures how late the
+loop wakes up so stalls are visible in /api/metrics.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+
+class VisionExecutor:
+    """
+    Awaitable front-end for a vision worker pool.
+
+    run():          CPU-heavy, picklable work (decode + FaceMesh). Goes to the
+                    configured pool, which may be a process pool.
+    run_blocking(): work that must touch in-process state (ML engine, shared
+                    dicts). Always runs on a thread pool.
+    """
+
+    def __init__(self, mode=EXECUTOR_THREAD, max_workers=2):
+        if mode not in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"Unknown vision executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, int(max_workers))
+        self._pool = None
+        self._thread_pool = None
+
+        # Stats
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_time = 0.0
+        self.last_time = 0.0
+
+    @property
+    def is_process_pool(self):
+        return self.mode == EXECUTOR_PROCESS
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="vision")
+        if self.is_process_pool:
+            # spawn, not fork: a forked child inherits MediaPipe's graph threads
+            # in a dead state and deadlocks on its first frame
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._pool = self._thread_pool
+        logger.info(f"Vision executor started ({self.mode} pool, {self.max_workers} workers)")
+
+    def shutdown(self):
+        if self._pool is None:
+            return
+        if self._pool is not self._thread_pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._thread_pool = None
+
+    async def _submit(self, pool, fn, *args):
+        if pool is None:
+            raise RuntimeError("Vision executor is not started")
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on the configured (thread or process) pool."""
+        return await self._submit(self._pool, fn, *args)
+
+    async def run_blocking(self, fn, *args):
+        """Runs fn(*args) on the thread pool (shares memory with the server)."""
+        return await self._submit(self._thread_pool, fn, *args)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_task_ms": round(1000 * self.total_time / self.completed, 2) if self.completed else 0.0,
+            "last_task_ms": round(1000 * self.last_time, 2)
+        }
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: sleeps for `interval` and records how much later
+    than requested the loop actually woke up. Anything blocking the loop
+    shows up directly as lag.
+    """
+
+    def __init__(self, interval=0.5, window=120):
+        self.interval = interval
+        self.window = window
+        self._samples = []
+        self.current = 0.0
+        self.max = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.current = lag
+            self.max = max(self.max, lag)
+            self._samples.append(lag)
+            if len(self._samples) > self.window:
+                del self._samples[0]
+
+    def stats(self):
+        samples = sorted(self._samples)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+        return {
+            "current_ms": round(1000 * self.current, 2),
+            "mean_ms": round(1000 * sum(samples) / len(samples), 2) if samples else 0.0,
+            "p99_ms": round(1000 * p99, 2),
+            "max_ms": round(1000 * self.max, 2),
+            "samples": len(samples)
+        }
@@ -0,0 +1,117 @@
+"""
+Face-ROI tracking and reduced-resolution decode for FaceMesh input.
+
+Running MediaPipe on a whole 720p/1080p frame spends most of the time on
+pixels that are not the face. Given the face box from the previous frame
+(normalized, padded), the next frame is:
+
+1. decoded at 1/2 or 1/4 resolution (cv2.IMREAD_REDUCED_COLOR_2/_4) when the
+   face is large enough that FaceMesh still gets >= FACE_MIN_PX pixels,
+2. cropped to the padded box before colour conversion and FaceMesh.
+
+Landmarks are mapped back to full-frame normalized coordinates, so EAR,
+MAR and head pose are computed exactly as for a full-frame detection. If
+no face is found in the crop, the same decoded frame is searched in full
+and the next frame starts without a hint (full-resolution decode).
+
+Off by default (VISION_ROI_TRACKING=1 enables it): FaceMesh on a crop is
+close to, but not exactly, FaceMesh on the whole frame.
+
+Everything here is stateless: the caller keeps the hint returned in
+result["roi"] (per session) and passes it back with the next frame.
+"""
+import cv2
+
+ROI_PADDING = 0.35  # Fraction of the face box added on every side
+FACE_MIN_PX = 192   # FaceMesh's landmark model input size; never shrink the face below it
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+}
+
+
+def choose_decode_scale(hint):
+    """Largest reduction (1, 2 or 4) that keeps the tracked face >= FACE_MIN_PX wide."""
+    if not hint:
+        return 1
+    x0, y0, x1, y1 = hint["box"]
+    face_px = min((x1 - x0) * hint["width"], (y1 - y0) * hint["height"])
+    for scale in (4, 2):
+        if face_px / scale >= FACE_MIN_PX:
+            return scale
+    return 1
+
+
+def decode_flags(scale):
+    return _REDUCED_FLAGS.get(scale, cv2.IMREAD_COLOR)
+
+
+def full_frame_size(size, scale, hint):
+    """
+    Full-resolution (width, height) of a frame decoded at 1/scale, or None
+    if it can't be known. IMREAD_REDUCED_* rounds odd sizes up, so w * scale
+    may be off; the hint's size (from an earlier full decode) is used when
+    it reduces to `size`. None means the resolution changed: decode again
+    at full size.
+    """
+    if scale == 1:
+        return size
+    width, height = hint["width"], hint["height"]
+    if (-(-width // scale), -(-height // scale)) == tuple(size):
+        return width, height
+    return None
+
+
+def padded_box(box, padding=ROI_PADDING):
+    """Grows a normalized (x0, y0, x1, y1) box by `padding` of its size per side, clamped to the frame."""
+    x0, y0, x1, y1 = box
+    pad_x = (x1 - x0) * padding
+    pad_y = (y1 - y0) * padding
+    return (
+        max(0.0, x0 - pad_x),
+        max(0.0, y0 - pad_y),
+        min(1.0, x1 + pad_x),
+        min(1.0, y1 + pad_y)
+    )
+
+
+def crop_to_box(frame, box):
+    """
+    Crops a frame to a normalized box (a view, no copy).
+    Returns (roi, (px0, py0)) or (frame, (0, 0)) if the box is degenerate.
+    """
+    h, w = frame.shape[:2]
+    px0, py0 = int(box[0] * w), int(box[1] * h)
+    px1, py1 = int(round(box[2] * w)), int(round(box[3] * h))
+    if px1 - px0 < 16 or py1 - py0 < 16:
+        return frame, (0, 0)
+    return frame[py0:py1, px0:px1], (px0, py0)
+
+
+def map_landmarks_to_frame(points, offset, roi_size, frame_size):
+    """
+    Rewrites ROI-normalized (N, 3) landmarks (in place) as full-frame
+    normalized ones. z shares x's scale in MediaPipe, so it is rescaled with
+    the width ratio.
+    """
+    (ox, oy), (rw, rh), (fw, fh) = offset, roi_size, frame_size
+    sx, sy = rw / fw, rh / fh
+    points[:, 0] = points[:, 0] * sx + ox / fw
+    points[:, 1] = points[:, 1] * sy + oy / fh
+    points[:, 2] *= sx
+    return points
+
+
+def mirror_box(box):
+    """Reflects a normalized (x0, y0, x1, y1) box horizontally."""
+    x0, y0, x1, y1 = box
+    return (1.0 - x1, y0, 1.0 - x0, y1)
+
+
+def face_box_from_landmarks(points):
+    """Tight normalized bounding box (x0, y0, x1, y1) of (N, 3) landmarks."""
+    x0, y0 = points[:, :2].min(axis=0)
+    x1, y1 = points[:, :2].max(axis=0)
+    return (float(x0), float(y0), float(x1), float(y1))
@@ -0,0 +1,110 @@
+"""
+Wire formats for webcam frames sent over /ws/detect.
+
+Two modes are supported:
+
+* JSON (legacy): text message ``{"image_data": "data:image/jpeg;base64,..."}``
+* Binary: a binary WebSocket message carrying the raw JPEG/WebP bytes,
+  optionally prefixed by a fixed 16-byte header:
+
+      offset  size  type      field
+      0       4     bytes     magic  b"FTG1"
+      4       4     uint32    frame_id
+      8       8     float64   capture_ts (ms since epoch, client clock)
+
+  All header fields are little-endian. A JPEG starts with 0xFFD8 and a WebP
+  with b"RIFF", so the magic can never be confused with a headerless image.
+
+Clients pick a mode with the ``Sec-WebSocket-Protocol`` header
+(``fatigue.binary.v1`` / ``fatigue.json.v1``) or ``?mode=binary``; the
+server also accepts either message type at any time for old clients.
+"""
+import base64
+import struct
+
+import cv2
+import numpy as np
+
+FRAME_MAGIC = b"FTG1"
+FRAME_HEADER = struct.Struct("<4sId")
+
+SUBPROTOCOL_BINARY = "fatigue.binary.v1"
+SUBPROTOCOL_JSON = "fatigue.json.v1"
+SUPPORTED_SUBPROTOCOLS = (SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON)
+
+MODE_BINARY = "binary"
+MODE_JSON = "json"
+
+# OpenCV >= 4.10 can decode straight to RGB (what MediaPipe wants), which
+# saves the BGR->RGB cvtColor copy on every frame.
+RGB_DECODE = hasattr(cv2, "IMREAD_COLOR_RGB")
+
+
+def negotiate_mode(offered_subprotocols, query_mode=None):
+    """
+    Picks the frame mode for a new connection.
+    Returns (mode, subprotocol) where subprotocol is the value to echo back
+    in the handshake, or None if the client did not offer one we support.
+    """
+    for proto in offered_subprotocols or ():
+        if proto in SUPPORTED_SUBPROTOCOLS:
+            mode = MODE_BINARY if proto == SUBPROTOCOL_BINARY else MODE_JSON
+            return mode, proto
+
+    if query_mode and query_mode.lower() == MODE_BINARY:
+        return MODE_BINARY, None
+    return MODE_JSON, None
+
+
+def pack_frame_header(frame_id, capture_ts):
+    """Builds the optional binary header (used by tools and tests)."""
+    return FRAME_HEADER.pack(FRAME_MAGIC, frame_id & 0xFFFFFFFF, float(capture_ts))
+
+
+def split_binary_frame(message):
+    """
+    Splits a binary message into (meta, image_view).
+    meta is None when the message is a bare image; image_view is a
+    zero-copy memoryview over the encoded image bytes.
+    """
+    view = memoryview(message)
+    if len(view) >= FRAME_HEADER.size and view[:4] == FRAME_MAGIC:
+        _, frame_id, capture_ts = FRAME_HEADER.unpack_from(view)
+        return {"frame_id": frame_id, "capture_ts": capture_ts}, view[FRAME_HEADER.size:]
+    return None, view
+
+
+def rgb_decode_flags(flags=cv2.IMREAD_COLOR):
+    """
+    Turns an IMREAD_COLOR / IMREAD_REDUCED_COLOR_* flag into its RGB
+    counterpart. Only valid when RGB_DECODE is True.
+    """
+    return (flags & ~cv2.IMREAD_COLOR) | cv2.IMREAD_COLOR_RGB
+
+
+def decode_image_buffer(buffer, flags=cv2.IMREAD_COLOR):
+    """Decodes JPEG/WebP bytes straight from the received buffer (no intermediate copy)."""
+    if len(buffer) == 0:
+        return None
+    np_arr = np.frombuffer(buffer, dtype=np.uint8)
+    return cv2.imdecode(np_arr, flags)
+
+
+def decode_data_url(data_url, flags=cv2.IMREAD_COLOR):
+    """Legacy JSON path: decodes a base64 data URL ("data:image/jpeg;base64,...")."""
+    _, _, payload = data_url.partition(',')
+    frame_bytes = base64.b64decode(payload or data_url)
+    return decode_image_buffer(frame_bytes, flags)
+
+
+def decode_frame_payload(payload, flags=cv2.IMREAD_COLOR):
+    """
+    Decodes one /ws/detect frame payload into (frame, frame_meta).
+    Binary payloads are decoded straight from the received buffer; strings
+    are legacy base64 data URLs.
+    """
+    if isinstance(payload, str):
+        return decode_data_url(payload, flags), None
+
+    frame_meta, image_view = split_binary_frame(payload)
+    return decode_image_buffer(image_view, flags), frame_meta
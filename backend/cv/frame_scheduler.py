@@ -0,0 +1,120 @@
+"""
+Latest-frame-wins scheduling for /ws/detect.
+
+Replaces the fixed "process every 3rd frame" rule. Each connection gets a
+FrameScheduler: incoming frames overwrite a single pending slot, and one
+consumer task processes whatever is freshest as soon as the previous frame
+is done and the rate limit allows. Frames replaced before they were picked
+up, or that process_fn declined, are counted as dropped. The rate adapts to the measured pipeline
+latency: an idle server runs at target_fps, a loaded one slows down to what
+it can actually sustain instead of building a backlog.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FrameScheduler:
+    def __init__(self, process_fn, target_fps=15.0, latency_alpha=0.2):
+        """
+        process_fn: async callable taking one frame payload; returns True if
+            the frame was processed, False if the pipeline declined it (e.g. a
+            busy worker). Exceptions count as failures.
+        target_fps: upper bound on processed frames per second.
+        latency_alpha: EMA weight for the measured pipeline latency.
+        """
+        self.process_fn = process_fn
+        self.min_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.latency_alpha = latency_alpha
+
+        self._pending = None
+        self._wake = asyncio.Event()
+        self._next_allowed = 0.0
+        self._task = None
+
+        # Stats
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.in_flight = False
+        self.latency_ema = 0.0
+
+    # --- Producer side ---
+    def submit(self, payload):
+        """Offers a new frame. Never blocks; replaces (drops) any frame still waiting."""
+        self.received += 1
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = payload
+        self._wake.set()
+
+    # --- Consumer side ---
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def interval(self):
+        """Current spacing between frame starts: the target rate or the pipeline latency, whichever is slower."""
+        return max(self.min_interval, self.latency_ema)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+
+            delay = self._next_allowed - loop.time()
+            if delay > 0:
+                # Frames arriving meanwhile just replace the pending one
+                await asyncio.sleep(delay)
+
+            payload, self._pending = self._pending, None
+            if payload is None:
+                continue
+
+            start = loop.time()
+            self.in_flight = True
+            try:
+                if await self.process_fn(payload):
+                    self.processed += 1
+                else:
+                    self.dropped += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error processing frame: {e}")
+            finally:
+                self.in_flight = False
+
+            latency = loop.time() - start
+            if self.latency_ema == 0.0:
+                self.latency_ema = latency
+            else:
+                self.latency_ema = self.latency_alpha * latency + (1 - self.latency_alpha) * self.latency_ema
+            self._next_allowed = start + self.interval
+
+            if self._pending is not None:
+                self._wake.set()
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "latency_ms": round(1000 * self.latency_ema, 2),
+            "max_fps": round(1.0 / self.interval, 2) if self.interval > 0 else None
+        }
@@ -1,108 +1,298 @@
 import cv2
+import json
+import logging
 import numpy as np
+import os
 import threading
+from config import get_config
+from cv.landmark_metrics import landmarks_to_array, pnp_image_points
 
-# --- Global State for Calibration ---
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# --- Calibration ---
 # We assume the user looks at the screen comfortably during the first few seconds.
 CALIBRATION_FRAMES_TARGET = 30  # Number of frames to average for calibration
-calibration_counter = 0
-pitch_accumulator = 0.0
-yaw_accumulator = 0.0
-roll_accumulator = 0.0
 
-pitch_offset = 0.0
-yaw_offset = 0.0
-roll_offset = 0.0
-is_calibrated = False
+# 3D Model Points (Y-Down Convention), in PNP_POINTS order
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),             # Nose tip
+    (0.0, 330.0, -65.0),         # Chin
+    (-225.0, -170.0, -135.0),    # Left eye left corner
+    (225.0, -170.0, -135.0),     # Right eye right corner
+    (-150.0, 150.0, -125.0),     # Left Mouth corner
+    (150.0, 150.0, -125.0)       # Right mouth corner
+], dtype="double")
 
-# Global Output State
-cv_head_angles = {"pitch": 0.0, "yaw": 0.0, "roll": 0.0}
-cv_angles_lock = threading.Lock()
 
-def calculate_cv_head_pose(landmarks, img_w, img_h):
+def load_camera_calibration(path):
+    """
+    Loads a camera calibration: an OpenCV FileStorage file (.yml/.yaml/.xml,
+    as written by the calibration samples), a .npz or a .json file.
+    Recognised keys: camera_matrix / K, distortion_coefficients /
+    dist_coeffs / D, and optionally image_width + image_height (the
+    resolution it was calibrated at, used to rescale to other sizes).
+    Returns {"camera_matrix", "dist_coeffs", "size"}.
+    """
+    def pick(get, *names):
+        for name in names:
+            value = get(name)
+            if value is not None:
+                return value
+        return None
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npz":
+        data = np.load(path)
+        get = lambda k: data[k] if k in data else None
+    elif ext == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        get = data.get
+    else:
+        fs = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
+        if not fs.isOpened():
+            raise IOError(f"Cannot open camera calibration {path}")
+
+        def get(k):
+            node = fs.getNode(k)
+            if node.empty():
+                return None
+            return node.real() if node.isInt() or node.isReal() else node.mat()
+
+    camera_matrix = pick(get, "camera_matrix", "K")
+    dist_coeffs = pick(get, "distortion_coefficients", "dist_coeffs", "D")
+    if camera_matrix is None:
+        raise ValueError(f"No camera_matrix in {path}")
+    width, height = get("image_width"), get("image_height")
+
+    return {
+        "camera_matrix": np.asarray(camera_matrix, dtype="double").reshape(3, 3),
+        "dist_coeffs": np.asarray(dist_coeffs if dist_coeffs is not None else np.zeros(4), dtype="double").reshape(-1, 1),
+        "size": (int(width), int(height)) if width and height else None
+    }
+
+
+_default_calibration = None
+_default_calibration_lock = threading.Lock()
+
+def default_camera_calibration():
+    """The calibration from Config.CAMERA_CALIBRATION_FILE (loaded once), or None."""
+    global _default_calibration
+    path = config.CAMERA_CALIBRATION_FILE
+    if not path:
+        return None
+    with _default_calibration_lock:
+        if _default_calibration is None:
+            try:
+                _default_calibration = load_camera_calibration(path)
+                logger.info(f"Loaded camera calibration from {path}")
+            except Exception as e:
+                logger.error(f"Failed to load camera calibration {path}: {e}")
+                _default_calibration = {}
+        return _default_calibration or None
+
+
+class HeadPoseSolver:
+    """
+    Stateful PnP solver for one video stream.
+
+    - Intrinsics are built once per frame size (approximate pinhole with
+      focal length = width, or a real calibration rescaled to the size).
+    - The previous rvec/tvec seed SOLVEPNP_ITERATIVE as an extrinsic guess,
+      so consecutive frames converge in a few iterations.
+    - If no image point moved more than `epsilon` pixels since the last
+      solve, the previous angles are returned without solving.
+    """
+
+    def __init__(self, epsilon=None, calibration=None):
+        self.epsilon = config.HEAD_POSE_EPSILON if epsilon is None else epsilon
+        self.calibration = calibration if calibration is not None else default_camera_calibration()
+        self._intrinsics = {} # (w, h) -> (camera_matrix, dist_coeffs)
+        self.solves = 0
+        self.skips = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets the warm start and the last solution."""
+        self.rvec = None
+        self.tvec = None
+        self.last_points = None
+        self.last_size = None
+        self.last_angles = None
+
+    def intrinsics(self, w, h):
+        cached = self._intrinsics.get((w, h))
+        if cached is None:
+            if self.calibration:
+                camera_matrix = self.calibration["camera_matrix"].copy()
+                if self.calibration["size"]:
+                    cw, ch = self.calibration["size"]
+                    camera_matrix[0] *= w / cw
+                    camera_matrix[1] *= h / ch
+                dist_coeffs = self.calibration["dist_coeffs"]
+            else:
+                camera_matrix = np.array([
+                    [w, 0, w / 2],
+                    [0, w, h / 2],
+                    [0, 0, 1]
+                ], dtype="double")
+                dist_coeffs = np.zeros((4, 1))
+            cached = self._intrinsics[(w, h)] = (camera_matrix, dist_coeffs)
+        return cached
+
+    def solve(self, image_points, w, h):
+        """
+        Raw (pitch, yaw, roll) in degrees (OpenCV convention: +ve pitch is
+        down) for (6, 2) pixel image points, or None if PnP fails.
+        """
+        same_size = self.last_size == (w, h)
+        if (
+            same_size and self.last_angles is not None
+            and np.abs(image_points - self.last_points).max() < self.epsilon
+        ):
+            self.skips += 1
+            return self.last_angles
+
+        camera_matrix, dist_coeffs = self.intrinsics(w, h)
+        warm = same_size and self.rvec is not None
+        if warm:
+            success, rvec, tvec = cv2.solvePnP(
+                MODEL_POINTS, image_points, camera_matrix, dist_coeffs,
+                rvec=self.rvec.copy(), tvec=self.tvec.copy(),
+                useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE
+            )
+            warm = success
+        if not warm:
+            success, rvec, tvec = cv2.solvePnP(
+                MODEL_POINTS, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE
+            )
+        self.solves += 1
+
+        if not success:
+            self.reset()
+            return None
+
+        rmat, _ = cv2.Rodrigues(rvec)
+        angles = cv2.RQDecomp3x3(rmat)[0]
+
+        self.rvec, self.tvec = rvec, tvec
+        self.last_points = np.array(image_points, dtype="double")
+        self.last_size = (w, h)
+        self.last_angles = (angles[0], angles[1], angles[2])
+        return self.last_angles
+
+    def stats(self):
+        return {"solves": self.solves, "skips": self.skips, "epsilon_px": self.epsilon}
+
+
+class HeadPoseTracker:
     """
-    Estimates head pose and applies AUTO-CENTERING calibration.
-    
-    The first 30 frames of valid face detection are used to define the "Zero" (Center) position.
-    This handles any camera angle (tilted laptop, side webcam) automatically.
+    Per-driver CV head pose with auto-centering calibration.
+
+    Holds the calibration accumulators/offsets and the latest output angles,
+    so every session centres on its own camera placement.
     """
-    global calibration_counter, pitch_accumulator, yaw_accumulator, roll_accumulator
-    global pitch_offset, yaw_offset, roll_offset, is_calibrated
-
-    # --- 1. Standard PnP Head Pose Estimation ---
-    
-    # 2D Image Points
-    points_idx = [1, 152, 33, 263, 61, 291]
-    image_points = np.array([
-        (landmarks[i].x * img_w, landmarks[i].y * img_h) 
-        for i in points_idx
-    ], dtype="double")
-
-    # 3D Model Points (Y-Down Convention)
-    model_points = np.array([
-        (0.0, 0.0, 0.0),             # Nose tip
-        (0.0, 330.0, -65.0),         # Chin
-        (-225.0, -170.0, -135.0),    # Left eye left corner
-        (225.0, -170.0, -135.0),     # Right eye right corner
-        (-150.0, 150.0, -125.0),     # Left Mouth corner
-        (150.0, 150.0, -125.0)       # Right mouth corner
-    ], dtype="double")
-
-    focal_length = img_w
-    center = (img_w / 2, img_h / 2)
-    camera_matrix = np.array([
-        [focal_length, 0, center[0]],
-        [0, focal_length, center[1]],
-        [0, 0, 1]
-    ], dtype="double")
-    dist_coeffs = np.zeros((4, 1))
-
-    success, rotation_vector, translation_vector = cv2.solvePnP(
-        model_points, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE
-    )
-
-    if not success:
-        return 0, 0, 0, False
-    
-    rmat, _ = cv2.Rodrigues(rotation_vector)
-    angles, mtxR, mtxQ, Qx, Qy, Qz = cv2.RQDecomp3x3(rmat)
-    
-    # Raw Angles (Standard OpenCV: +ve Pitch is DOWN)
-    raw_pitch = angles[0]
-    raw_yaw = angles[1]
-    raw_roll = angles[2]
-
-    # --- 2. Calibration Logic ---
-    if not is_calibrated:
-        if calibration_counter < CALIBRATION_FRAMES_TARGET:
-            pitch_accumulator += raw_pitch
-            yaw_accumulator += raw_yaw
-            roll_accumulator += raw_roll
-            calibration_counter += 1
-            # While calibrating, assume Center
-            return 0.0, 0.0, 0.0, False
-        else:
-            # Calculate Average (The Baseline)
-            pitch_offset = pitch_accumulator / CALIBRATION_FRAMES_TARGET
-            yaw_offset = yaw_accumulator / CALIBRATION_FRAMES_TARGET
-            roll_offset = roll_accumulator / CALIBRATION_FRAMES_TARGET
-            is_calibrated = True
-            print(f"[CALIBRATION] ✅ Head Pose Centered! Offsets -> P:{pitch_offset:.2f}, Y:{yaw_offset:.2f}, R:{roll_offset:.2f}")
-
-    # --- 3. Apply Calibration Offset ---
-    # Center = Raw - Baseline
-    # Example: If Camera tilts back, Raw might be 15 (Looking Down). Offset captures 15.
-    # Result = 15 - 15 = 0 (Center). Correct.
-    
-    # Apply Offset first
-    # Inverting because User Hardware produces +ve for Up. We want -ve for Up.
-    final_pitch = (raw_pitch - pitch_offset) * -1
-    final_yaw = raw_yaw - yaw_offset
-    final_roll = raw_roll - roll_offset
-
-    # Clamp
-    final_pitch = max(-90, min(90, final_pitch))
-    final_yaw = max(-90, min(90, final_yaw))
-    final_roll = max(-90, min(90, final_roll))
-
-    return final_pitch, final_yaw, final_roll, is_calibrated
+
+    def __init__(self, solver=None):
+        self.lock = threading.Lock()
+        self.angles = {"pitch": 0.0, "yaw": 0.0, "roll": 0.0}
+        self.solver = solver if solver is not None else HeadPoseSolver()
+        self.reset()
+
+    def reset(self):
+        """Discards the auto-centering baseline so the next frames re-calibrate."""
+        self.solver.reset()
+        self.calibration_counter = 0
+        self.pitch_accumulator = 0.0
+        self.yaw_accumulator = 0.0
+        self.roll_accumulator = 0.0
+
+        self.pitch_offset = 0.0
+        self.yaw_offset = 0.0
+        self.roll_offset = 0.0
+        self.is_calibrated = False
+        with self.lock:
+            self.angles["is_calibrated"] = False
+
+    def update(self, landmarks, img_w, img_h):
+        """Estimates the pose for one frame and publishes it to self.angles."""
+        pitch, yaw, roll, is_calibrated = self.estimate(landmarks, img_w, img_h)
+        with self.lock:
+            self.angles["pitch"] = pitch
+            self.angles["yaw"] = yaw
+            self.angles["roll"] = roll
+            self.angles["is_calibrated"] = is_calibrated
+        return pitch, yaw, roll, is_calibrated
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.angles)
+
+    def estimate(self, landmarks, img_w, img_h):
+        """
+        Estimates head pose and applies AUTO-CENTERING calibration.
+
+        The first 30 frames of valid face detection are used to define the "Zero" (Center) position.
+        This handles any camera angle (tilted laptop, side webcam) automatically.
+        landmarks: (N, 3) landmark array or a landmark sequence.
+        """
+        # --- 1. Standard PnP Head Pose Estimation ---
+
+        # 2D Image Points (nose tip, chin, eye corners, mouth corners)
+        image_points = pnp_image_points(landmarks_to_array(landmarks), img_w, img_h)
+
+        pose = self.solver.solve(image_points, img_w, img_h)
+        if pose is None:
+            return 0, 0, 0, False
+
+        # Raw Angles (Standard OpenCV: +ve Pitch is DOWN)
+        raw_pitch, raw_yaw, raw_roll = pose
+
+        # --- 2. Calibration Logic ---
+        if not self.is_calibrated:
+            if self.calibration_counter < CALIBRATION_FRAMES_TARGET:
+                self.pitch_accumulator += raw_pitch
+                self.yaw_accumulator += raw_yaw
+                self.roll_accumulator += raw_roll
+                self.calibration_counter += 1
+                # While calibrating, assume Center
+                return 0.0, 0.0, 0.0, False
+            else:
+                # Calculate Average (The Baseline)
+                self.pitch_offset = self.pitch_accumulator / CALIBRATION_FRAMES_TARGET
+                self.yaw_offset = self.yaw_accumulator / CALIBRATION_FRAMES_TARGET
+                self.roll_offset = self.roll_accumulator / CALIBRATION_FRAMES_TARGET
+                self.is_calibrated = True
+                print(f"[CALIBRATION] ✅ Head Pose Centered! Offsets -> P:{self.pitch_offset:.2f}, Y:{self.yaw_offset:.2f}, R:{self.roll_offset:.2f}")
+
+        # --- 3. Apply Calibration Offset ---
+        # Center = Raw - Baseline
+        # Example: If Camera tilts back, Raw might be 15 (Looking Down). Offset captures 15.
+        # Result = 15 - 15 = 0 (Center). Correct.
+
+        # Apply Offset first
+        # Inverting because User Hardware produces +ve for Up. We want -ve for Up.
+        final_pitch = (raw_pitch - self.pitch_offset) * -1
+        final_yaw = raw_yaw - self.yaw_offset
+        final_roll = raw_roll - self.roll_offset
+
+        # Clamp
+        final_pitch = max(-90, min(90, final_pitch))
+        final_yaw = max(-90, min(90, final_yaw))
+        final_roll = max(-90, min(90, final_roll))
+
+        return final_pitch, final_yaw, final_roll, self.is_calibrated
+
+
+# --- Default (single-driver) State ---
+# Kept for callers that predate sessions (Flask routes, scripts).
+default_head_pose = HeadPoseTracker()
+cv_head_angles = default_head_pose.angles
+cv_angles_lock = default_head_pose.lock
+
+def calculate_cv_head_pose(landmarks, img_w, img_h):
+    return default_head_pose.estimate(landmarks, img_w, img_h)
+
+def reset_head_pose_calibration():
+    default_head_pose.reset()
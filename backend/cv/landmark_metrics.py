@@ -0,0 +1,108 @@
+"""
+Vectorized landmark metrics.
+
+FaceMesh output is converted once per frame into an (N, 3) float array of
+normalized (x, y, z). EAR, MAR, the nose position and the PnP image points
+are then read from it with fancy indexing instead of per-landmark Python
+lists and pairwise math.dist calls. Every function also accepts stacked
+(F, N, 3) arrays, so offline jobs can score many frames in one call.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# --- Landmark Indices (MediaPipe FaceMesh) ---
+LEFT_EYE = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE = [362, 385, 387, 263, 373, 380]
+MOUTH_INNER = [13, 14, 78, 308]
+NOSE_TIP = 1
+PNP_POINTS = [1, 152, 33, 263, 61, 291] # Nose tip, chin, eye corners, mouth corners
+
+_EYES = np.array([LEFT_EYE, RIGHT_EYE])
+# Every landmark the metrics read, gathered with one fancy index per frame
+_GATHER = np.concatenate([_EYES.ravel(), MOUTH_INNER, PNP_POINTS])
+_EYE_SLICE, _MOUTH_SLICE, _PNP_SLICE = slice(0, 12), slice(12, 16), slice(16, 22)
+# EAR: (|p1 - p5| + |p2 - p4|) / (2 |p0 - p3|); MAR: |top - bottom| / |left - right|
+_EYE_FROM, _EYE_TO = [1, 2, 0], [5, 4, 3]
+_MOUTH_FROM, _MOUTH_TO = [0, 2], [1, 3]
+
+LandmarkMetrics = namedtuple(
+    "LandmarkMetrics",
+    ["left_ear", "right_ear", "ear", "mar", "nose", "image_points"]
+)
+
+
+def landmarks_to_array(face_landmarks):
+    """
+    NormalizedLandmarkList (or a sequence of landmarks) -> (N, 3) float64
+    array. Arrays are returned unchanged.
+    """
+    if isinstance(face_landmarks, np.ndarray):
+        return face_landmarks
+    lms = getattr(face_landmarks, "landmark", face_landmarks)
+    return np.array([(lm.x, lm.y, lm.z) for lm in lms], dtype=np.float64).reshape(-1, 3)
+
+
+def stack_landmarks(frames):
+    """Stacks per-frame landmarks into one (F, N, 3) array for batch metrics."""
+    return np.stack([landmarks_to_array(f) for f in frames])
+
+
+def _distances(points, src, dst):
+    delta = points[..., src, :] - points[..., dst, :]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def _ratio(num, den):
+    """num / den, 0 where den is 0 (like the scalar helpers it replaces)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / den, 0.0)
+
+
+def _gather_pixels(points, w, h):
+    return points[..., _GATHER, :2] * (w, h)
+
+
+def _eye_aspect_ratios(pixels):
+    eyes = pixels[..., _EYE_SLICE, :].reshape(pixels.shape[:-2] + (2, 6, 2))
+    d = _distances(eyes, _EYE_FROM, _EYE_TO) # (..., 2, 3)
+    return _ratio(d[..., 0] + d[..., 1], 2.0 * d[..., 2])
+
+
+def _mouth_aspect_ratio(pixels):
+    d = _distances(pixels[..., _MOUTH_SLICE, :], _MOUTH_FROM, _MOUTH_TO)
+    return _ratio(d[..., 0], d[..., 1])
+
+
+def eye_aspect_ratios(points, w, h):
+    """(..., 2) EARs, left then right, from (..., N, 3) landmarks."""
+    return _eye_aspect_ratios(_gather_pixels(points, w, h))
+
+
+def mouth_aspect_ratio(points, w, h):
+    """(...) MAR (inner lip height / width) from (..., N, 3) landmarks."""
+    return _mouth_aspect_ratio(_gather_pixels(points, w, h))
+
+
+def pnp_image_points(points, w, h):
+    """(..., 6, 2) pixel coordinates of PNP_POINTS, in that order."""
+    return points[..., PNP_POINTS, :2] * (w, h)
+
+
+def compute_metrics(points, w, h):
+    """
+    All per-frame metrics at once. `points` is one frame's landmarks (list
+    or (N, 3) array) or a stacked (F, N, 3) array; fields then have a
+    leading F axis.
+    """
+    points = landmarks_to_array(points)
+    pixels = _gather_pixels(points, w, h)
+    ears = _eye_aspect_ratios(pixels)
+    return LandmarkMetrics(
+        left_ear=ears[..., 0],
+        right_ear=ears[..., 1],
+        ear=(ears[..., 0] + ears[..., 1]) / 2,
+        mar=_mouth_aspect_ratio(pixels),
+        nose=points[..., NOSE_TIP, :2],
+        image_points=pixels[..., _PNP_SLICE, :]
+    )
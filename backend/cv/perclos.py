@@ -1,141 +1,165 @@
 import cv2
 import mediapipe as mp
-import math
 import time
 import numpy as np
 from collections import deque
 import threading
-from cv.head_pose import calculate_cv_head_pose, cv_head_angles, cv_angles_lock
+from cv.head_pose import HeadPoseTracker, default_head_pose
+from cv.landmark_metrics import compute_metrics, landmarks_to_array
 
 # --- Constants & Configuration ---
-LEFT_EYE = [33, 160, 158, 133, 153, 144]
-RIGHT_EYE = [362, 385, 387, 263, 373, 380]
 EYE_AR_THRESH = 0.30
-MOUTH_INNER = [13, 14, 78, 308]
 MAR_THRESH = 0.6
 
 MAR_FRAME_COUNT = 3
 STABILITY_THRESH = 0.05 # Max allowed normalized movement per frame (5% of screen)
-
-# --- State ---
-perclos_data = {
-    "status": "No Face",
-    "perclos": 0.0,
-    "ear": 0.0,
-    "yawn_status": "Closed",
-    "mar": 0.0,
-    "adaptive_mar_thresh": 0.6,
-    "timestamp": int(time.time())
-}
-
-eye_status_history = deque(maxlen=6)
-yawn_frames_count = 0
-closed_frames_count = 0
-closed_frames_count = 0
-mar_history = deque(maxlen=20)
-prev_nose_pos = None # For motion/shake detection
-yawn_start_time = None # For time-based yawn duration check
+CALIBRATION_FRAMES = 30 # Stable open-eye frames used to learn the personal EAR threshold
 
 # --- MediaPipe Initialization ---
 mp_face_mesh = mp.solutions.face_mesh
-# Initialize locally, or can be initialized on import
-face_mesh = mp_face_mesh.FaceMesh(
-    max_num_faces=1, 
-    refine_landmarks=True, 
-    min_detection_confidence=0.5
-)
-
-def eye_aspect_ratio(eye):
-    if len(eye) != 6:
-        return 0
-    A = math.dist(eye[1], eye[5])
-    B = math.dist(eye[2], eye[4])
-    C = math.dist(eye[0], eye[3])
-    return (A + B) / (2.0 * C) if C else 0
-
-def mouth_aspect_ratio(mouth):
-    if len(mouth) != 4:
-        return 0
-    v = math.dist(mouth[0], mouth[1])
-    h = math.dist(mouth[2], mouth[3])
-    return v / h if h else 0
-
-# --- Calibration Global State ---
-PERSONAL_EAR_THRESH = 0.30 # Default (fallback)
-calibration_buffer = deque(maxlen=30)
-is_calibrating_eyes = True
 
-def reset_eye_calibration():
-    global is_calibrating_eyes, calibration_buffer, PERSONAL_EAR_THRESH
-    print("[CV] 🔄 Starting Eye Calibration...")
-    is_calibrating_eyes = True
-    calibration_buffer.clear()
-    PERSONAL_EAR_THRESH = 0.30 # Reset to default
-    return True
+def create_face_mesh():
+    """Builds a FaceMesh graph. Each graph keeps its own tracking state between frames."""
+    return mp_face_mesh.FaceMesh(
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5
+    )
 
-def process_face_mesh(frame):
+# Shared in-process graph, created on first use so worker processes that
+# build their own graphs don't pay for an unused one.
+face_mesh = None
+# The FaceMesh graph is not thread-safe; frames can arrive from several
+# executor threads at once.
+face_mesh_lock = threading.Lock()
+
+def detect_face_landmarks(frame, mesh=None, rgb=False):
     """
-    Processes a frame using MediaPipe FaceMesh to update PERCLOS, Yawn, and Head Pose.
-    Updates global state: perclos_data, cv_head_angles.
+    Runs MediaPipe FaceMesh on a BGR frame (or an RGB one if rgb=True, which
+    is passed through without a colour-conversion copy).
+    mesh: a graph owned by the caller (single-threaded use); defaults to the
+    shared in-process graph.
+    Returns the first face's NormalizedLandmarkList (picklable), or None.
     """
-    global perclos_data, eye_status_history, yawn_frames_count, mar_history, closed_frames_count, prev_nose_pos, yawn_start_time
-    now = int(time.time())
-
-    h, w, _ = frame.shape
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = face_mesh.process(rgb)
+    global face_mesh
+    if not rgb:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if mesh is not None:
+        results = mesh.process(frame)
+    else:
+        with face_mesh_lock:
+            if face_mesh is None:
+                face_mesh = create_face_mesh()
+            results = face_mesh.process(frame)
 
     if results.multi_face_landmarks:
-        lm = results.multi_face_landmarks[0]
-        
+        return results.multi_face_landmarks[0]
+    return None
+
+
+class VisionState:
+    """
+    Per-driver PERCLOS / yawn / eye-calibration state.
+
+    One instance per session, so several drivers streaming at once never
+    share eye history, nose tracking or the personal EAR threshold.
+    """
+
+    def __init__(self, head_pose=None):
+        self.head_pose = head_pose if head_pose is not None else HeadPoseTracker()
+        # Serialises frame updates and resets; reentrant so a session can hold it
+        # across a vision and head pose reset (see Session.reset_calibration)
+        self.lock = threading.RLock()
+
+        self.perclos_data = {
+            "status": "No Face",
+            "perclos": 0.0,
+            "ear": 0.0,
+            "yawn_status": "Closed",
+            "mar": 0.0,
+            "adaptive_mar_thresh": 0.6,
+            "timestamp": int(time.time())
+        }
+
+        self.eye_status_history = deque(maxlen=6)
+        self.yawn_frames_count = 0
+        self.closed_frames_count = 0
+        self.mar_history = deque(maxlen=20)
+        self.prev_nose_pos = None # For motion/shake detection
+        self.yawn_start_time = None # For time-based yawn duration check
+
+        # --- Calibration State ---
+        self.personal_ear_thresh = 0.30 # Default (fallback)
+        self.calibration_buffer = deque(maxlen=CALIBRATION_FRAMES)
+        self.is_calibrating_eyes = True
+
+    def reset_calibration(self):
+        print("[CV] 🔄 Starting Eye Calibration...")
+        with self.lock:
+            self.is_calibrating_eyes = True
+            self.calibration_buffer.clear()
+            self.personal_ear_thresh = 0.30 # Reset to default
+        return True
+
+    def process_frame(self, frame):
+        """Detects the face in a BGR frame and updates this state."""
+        h, w, _ = frame.shape
+        return self.process_landmarks(detect_face_landmarks(frame), w, h)
+
+    def process_landmarks(self, face_landmarks, w, h):
+        """
+        Updates PERCLOS, Yawn, and Head Pose from one frame's FaceMesh output.
+        face_landmarks is an (N, 3) landmark array, a NormalizedLandmarkList
+        or None (no face).
+        """
+        with self.lock:
+            if face_landmarks is None:
+                return self._update_no_face()
+            return self._update_face(landmarks_to_array(face_landmarks), w, h)
+
+    def _update_face(self, points, w, h):
+        now = int(time.time())
+        perclos_data = self.perclos_data
+        metrics = compute_metrics(points, w, h)
+
         # --- 1. MOTION STABILITY CHECK ---
         # Detect if face/camera is shaking violently (e.g. driving on bumps)
         # If shaking, we cannot trust delicate Eye Aspect Ratio (EAR).
-        nose = lm.landmark[1] # Tip of nose
-        current_nose_pos = np.array([nose.x, nose.y])
+        current_nose_pos = metrics.nose # Tip of nose
         is_stable = True
-        
-        if prev_nose_pos is not None:
-            dist = np.linalg.norm(current_nose_pos - prev_nose_pos)
+
+        if self.prev_nose_pos is not None:
+            dist = np.linalg.norm(current_nose_pos - self.prev_nose_pos)
             if dist > STABILITY_THRESH:
                 is_stable = False
                 print(f"[CV STABILITY] ⚠️ Unstable Frame (Dist: {dist:.3f}). Ignoring Eye Data.")
-        
-        prev_nose_pos = current_nose_pos
-        
+
+        self.prev_nose_pos = current_nose_pos
+
         # --- CV HEAD POSE FALLBACK ---
         try:
-            cv_pitch, cv_yaw, cv_roll, is_calibrated = calculate_cv_head_pose(lm.landmark, w, h)
-            with cv_angles_lock:
-                cv_head_angles["pitch"] = cv_pitch
-                cv_head_angles["yaw"] = cv_yaw
-                cv_head_angles["roll"] = cv_roll
-                cv_head_angles["is_calibrated"] = is_calibrated
+            self.head_pose.update(points, w, h)
         except Exception as cv_e:
             print(f"[CV POSE ERROR] {cv_e}")
 
         # --- PERCLOS / EAR ---
-        left = [(lm.landmark[i].x * w, lm.landmark[i].y * h) for i in LEFT_EYE]
-        right = [(lm.landmark[i].x * w, lm.landmark[i].y * h) for i in RIGHT_EYE]
-        ear = (eye_aspect_ratio(left) + eye_aspect_ratio(right)) / 2
-        
+        ear = float(metrics.ear)
+
         # --- CALIBRATION LOGIC ---
-        global is_calibrating_eyes, PERSONAL_EAR_THRESH
-        
-        if is_calibrating_eyes:
+        if self.is_calibrating_eyes:
             if is_stable:
-                calibration_buffer.append(ear)
-            
-            if len(calibration_buffer) >= 30:
+                self.calibration_buffer.append(ear)
+
+            if len(self.calibration_buffer) >= CALIBRATION_FRAMES:
                 # Calculate new threshold (80% of median open eye)
-                avg_ear = np.median(calibration_buffer)
-                PERSONAL_EAR_THRESH = max(0.20, avg_ear * 0.80) 
-                is_calibrating_eyes = False
-                print(f"[CV] ✅ Calibration Complete. Personal EAR Thresh: {PERSONAL_EAR_THRESH:.3f} (Avg: {avg_ear:.3f})")
-            
+                avg_ear = np.median(self.calibration_buffer)
+                self.personal_ear_thresh = max(0.20, avg_ear * 0.80)
+                self.is_calibrating_eyes = False
+                print(f"[CV] ✅ Calibration Complete. Personal EAR Thresh: {self.personal_ear_thresh:.3f} (Avg: {avg_ear:.3f})")
+
             # While calibrating, assume Eyes Open (safe)
             perclos_data.update({
-                "status": "Calibrating", 
+                "status": "Calibrating",
                 "ear": round(ear, 3),
                 "is_calibrating": True
             })
@@ -143,47 +167,44 @@ def process_face_mesh(frame):
 
         # LOGIC: If Unstable, Force Eyes 'Open' to prevent False Positive Fatigue
         if is_stable:
-             eyes_closed = 1 if ear < PERSONAL_EAR_THRESH else 0
+             eyes_closed = 1 if ear < self.personal_ear_thresh else 0
         else:
              eyes_closed = 0 # Force Open if shaking
-             
-        eye_status_history.append(eyes_closed)
-        
+
+        self.eye_status_history.append(eyes_closed)
+
         if eyes_closed:
-            closed_frames_count += 1
+            self.closed_frames_count += 1
         else:
-            closed_frames_count = 0
+            self.closed_frames_count = 0
 
-        perclos_val = (sum(eye_status_history) / len(eye_status_history)) * 100
+        perclos_val = (sum(self.eye_status_history) / len(self.eye_status_history)) * 100
 
         # --- YAWN / MAR ---
-        mouth = [(lm.landmark[i].x * w, lm.landmark[i].y * h) for i in MOUTH_INNER]
-        mar = mouth_aspect_ratio(mouth)
+        mar = float(metrics.mar)
         if mar > 0:
-            mar_history.append(mar)
-        
+            self.mar_history.append(mar)
+
         # Adaptive Thresholding (Simplified)
-        mean_mar = np.mean(mar_history) if mar_history else 0.0
-        adaptive_thresh_val = max(0.35, mean_mar * 1.3) 
+        mean_mar = np.mean(self.mar_history) if self.mar_history else 0.0
+        adaptive_thresh_val = max(0.35, mean_mar * 1.3)
 
         # --- TIME-BASED YAWN LOGIC ---
         # Frame skipping makes frame-counting unreliable. We use timestamps.
-        global yawn_start_time
-        
         if mar > adaptive_thresh_val:
-            if yawn_start_time is None:
-                yawn_start_time = time.time() # Start the clock
+            if self.yawn_start_time is None:
+                self.yawn_start_time = time.time() # Start the clock
                 yawn_status = "Opening"
             else:
-                elapsed = time.time() - yawn_start_time
+                elapsed = time.time() - self.yawn_start_time
                 # 0.8 seconds to confirm it's a yawn and not just talking
-                if elapsed > 0.8: 
+                if elapsed > 0.8:
                     yawn_status = "Yawning"
                 else:
                     yawn_status = "Opening"
         else:
-            yawn_start_time = None
-            yawn_status = "Closed" if len(mar_history) > 0 else "Relaxing"
+            self.yawn_start_time = None
+            yawn_status = "Closed" if len(self.mar_history) > 0 else "Relaxing"
 
         status_label = "Closed" if eyes_closed else "Open"
         if not is_stable:
@@ -197,25 +218,42 @@ def process_face_mesh(frame):
             "mar": round(mar, 3),
             "adaptive_mar_thresh": round(adaptive_thresh_val, 3),
             "timestamp": now,
-            "closed_frames": closed_frames_count,
+            "closed_frames": self.closed_frames_count,
             "is_calibrating": False
         })
-    else:
+        return perclos_data
+
+    def _update_no_face(self):
         # No face detected
-        prev_nose_pos = None # Reset motion tracking
-        eye_status_history.clear()
-        yawn_frames_count = 0
-        closed_frames_count = 0
-        mar_history.clear()
-        perclos_data.update({
+        self.prev_nose_pos = None # Reset motion tracking
+        self.eye_status_history.clear()
+        self.yawn_frames_count = 0
+        self.closed_frames_count = 0
+        self.mar_history.clear()
+        self.perclos_data.update({
             "status": "No Face",
             "perclos": 0.0,
             "ear": 0.0,
             "yawn_status": "No Face",
             "mar": 0.0,
             "adaptive_mar_thresh": MAR_THRESH,
-            "timestamp": now
+            "timestamp": int(time.time())
         })
+        return self.perclos_data
+
 
-    return perclos_data
+# --- Default (single-driver) State ---
+# Kept for callers that predate sessions (Flask routes, scripts).
+default_vision_state = VisionState(head_pose=default_head_pose)
+perclos_data = default_vision_state.perclos_data
 
+def reset_eye_calibration():
+    return default_vision_state.reset_calibration()
+
+def process_face_mesh(frame):
+    """
+    Processes a frame using MediaPipe FaceMesh to update PERCLOS, Yawn, and Head Pose.
+    Updates the default state: perclos_data, cv_head_angles.
+    Safe to call from several threads.
+    """
+    return default_vision_state.process_frame(frame)
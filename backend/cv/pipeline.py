@@ -0,0 +1,130 @@
+"""
+Frame analysis entry point used by the vision executor.
+
+analyze_frame() is a plain top-level function over picklable inputs/outputs
+so it can run on either a thread pool or a process pool. It only does the
+stateless heavy part (decode + FaceMesh); the per-driver temporal state is
+updated afterwards by the owning session in the server process.
+"""
+import cv2
+
+from cv.face_roi import (
+    choose_decode_scale, decode_flags, full_frame_size, padded_box, crop_to_box,
+    mirror_box, map_landmarks_to_frame, face_box_from_landmarks
+)
+from cv.frame_protocol import decode_frame_payload, rgb_decode_flags, RGB_DECODE
+from cv.landmark_metrics import landmarks_to_array
+from cv.perclos import detect_face_landmarks
+
+# Landmarks that swap places when the face is mirrored, limited to the ones
+# the metrics read: eye contours (EAR), mouth corners (MAR) and the PnP
+# points. Midline landmarks (nose tip 1, chin 152, lips 13/14) map to
+# themselves.
+MIRROR_PAIRS = (
+    (33, 263), (133, 362), (160, 387), (158, 385), (153, 380), (144, 373), # Eyes
+    (61, 291), (78, 308) # Mouth corners
+)
+_MIRROR_A = [a for a, _ in MIRROR_PAIRS]
+_MIRROR_B = [b for _, b in MIRROR_PAIRS]
+
+
+def mirror_landmarks(points):
+    """
+    Mirrors (N, 3) landmarks in place (x -> 1 - x) and swaps the
+    MIRROR_PAIRS rows, so the result reads like FaceMesh output on a
+    horizontally flipped frame without flipping any pixels.
+    """
+    points[:, 0] = 1.0 - points[:, 0]
+    points[_MIRROR_A], points[_MIRROR_B] = points[_MIRROR_B], points[_MIRROR_A]
+    return points
+
+
+def decode_rgb(payload, flags):
+    """Decodes a frame payload to RGB: directly if OpenCV supports it, else BGR + cvtColor."""
+    if RGB_DECODE:
+        return decode_frame_payload(payload, rgb_decode_flags(flags))
+    frame, frame_meta = decode_frame_payload(payload, flags)
+    if frame is not None:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return frame, frame_meta
+
+
+def analyze_frame(payload, mesh=None, roi_hint=None, mirror_pixels=True):
+    """
+    Decodes a frame payload (binary bytes or data URL) and runs FaceMesh on
+    it (on `mesh` if given, else the shared graph).
+
+    The frame is decoded straight to RGB and, by default, flipped for the
+    selfie mirror (one copy), which matches the old flip + cvtColor path
+    bit for bit. mirror_pixels=False mirrors the landmarks afterwards
+    instead, so FaceMesh reads the decoder's buffer without any per-frame
+    image copy; FaceMesh is not exactly mirror-symmetric, so that output
+    differs slightly.
+
+    roi_hint: the "roi" of the previous result for the same driver. When
+    given, the frame is decoded at reduced resolution if the face allows it
+    and only the padded face box is searched (see cv.face_roi).
+
+    Returns None for undecodable frames, else a dict with "landmarks"
+    (mirrored (N, 3) array of full-frame normalized coordinates, or None),
+    "width", "height" (full-resolution size), "frame" (client header meta
+    or None) and "roi" (hint for the next frame, or None when the face was
+    lost).
+    """
+    scale = choose_decode_scale(roi_hint)
+    frame, frame_meta = decode_rgb(payload, decode_flags(scale))
+    if frame is None:
+        return None
+    full_size = full_frame_size(frame.shape[1::-1], scale, roi_hint)
+    if full_size is None:
+        # The stream's resolution changed under the hint: start over at full size
+        roi_hint = None
+        scale = 1
+        frame, frame_meta = decode_rgb(payload, decode_flags(scale))
+        if frame is None:
+            return None
+        full_size = frame.shape[1::-1]
+
+    if mirror_pixels:
+        frame = cv2.flip(frame, 1)
+    h, w, _ = frame.shape
+
+    landmarks = None
+    cropped = False
+    if roi_hint is not None:
+        # Hint boxes are in mirrored coordinates
+        box = padded_box(roi_hint["box"])
+        roi, offset = crop_to_box(frame, box if mirror_pixels else mirror_box(box))
+        if roi is not frame:
+            # One attempt: on a miss the whole frame is searched right away
+            # (at most two FaceMesh runs per frame)
+            face = detect_face_landmarks(roi, mesh, rgb=True)
+            if face is not None:
+                cropped = True
+                rh, rw = roi.shape[:2]
+                landmarks = map_landmarks_to_frame(landmarks_to_array(face), offset, (rw, rh), (w, h))
+    if landmarks is None:
+        # No hint, or tracking lost: search the whole decoded frame
+        face = detect_face_landmarks(frame, mesh, rgb=True)
+        if face is not None:
+            landmarks = landmarks_to_array(face)
+
+    full_w, full_h = full_size
+    roi_result = None
+    if landmarks is not None:
+        if not mirror_pixels:
+            mirror_landmarks(landmarks)
+        roi_result = {
+            "box": face_box_from_landmarks(landmarks),
+            "width": full_w,
+            "height": full_h,
+            "scale": scale,
+            "cropped": cropped
+        }
+    return {
+        "landmarks": landmarks,
+        "width": full_w,
+        "height": full_h,
+        "frame": frame_meta,
+        "roi": roi_result
+    }
@@ -0,0 +1,241 @@
+"""
+Multi-process FaceMesh worker pool with session affinity.
+
+Each worker process owns its FaceMesh graphs (one per session it serves),
+so detection runs on as many cores as there are workers instead of
+queueing behind one graph under the GIL. A session is pinned to one worker
+for its whole life, which keeps MediaPipe's frame-to-frame tracking state
+local to that worker. Frames reach a worker through a bounded queue; when
+it is full the frame is refused (FaceMeshPoolBusy) rather than piling up
+latency.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+MSG_FRAME = "frame"
+MSG_RELEASE = "release"
+
+
+class FaceMeshPoolBusy(RuntimeError):
+    """The session's worker queue is full; the caller should drop the frame."""
+
+
+def _worker_main(worker_index, requests, results, mirror_pixels=True):
+    """Worker process loop: one FaceMesh graph per session served by this worker."""
+    # Imported here so the spawned child only loads MediaPipe once it runs
+    from cv.perclos import create_face_mesh
+    from cv.pipeline import analyze_frame
+
+    meshes = {}
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+
+        kind = msg[0]
+        if kind == MSG_RELEASE:
+            mesh = meshes.pop(msg[1], None)
+            if mesh is not None:
+                mesh.close()
+            continue
+
+        _, job_id, session_id, payload, roi_hint = msg
+        try:
+            mesh = meshes.get(session_id)
+            if mesh is None:
+                mesh = meshes[session_id] = create_face_mesh()
+            results.put((job_id, analyze_frame(payload, mesh, roi_hint, mirror_pixels), None))
+        except Exception as e:
+            results.put((job_id, None, f"{type(e).__name__}: {e}"))
+
+    for mesh in meshes.values():
+        mesh.close()
+
+
+class _Worker:
+    def __init__(self, index, ctx, results, queue_size, mirror_pixels=True):
+        self.index = index
+        self.requests = ctx.Queue(maxsize=queue_size)
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(index, self.requests, results, mirror_pixels),
+            name=f"facemesh-{index}",
+            daemon=True
+        )
+        self.sessions = set()
+        self.pending = {} # job_id -> Future
+        self.completed = 0
+
+    def stats(self):
+        return {
+            "worker": self.index,
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "sessions": len(self.sessions),
+            "pending": len(self.pending),
+            "completed": self.completed
+        }
+
+
+class FaceMeshWorkerPool:
+    def __init__(self, num_workers=None, queue_size=4, mirror_pixels=True):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.queue_size = queue_size
+        self.mirror_pixels = mirror_pixels # See analyze_frame()
+        # spawn, not fork: a forked child inherits MediaPipe's graph threads in a dead state
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = None
+        self._workers = []
+        self._affinity = {} # session_id -> worker index
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._reader = None
+        self._running = False
+        self.dropped = 0
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._running:
+            return
+        self._results = self._ctx.Queue()
+        self._workers = [self._spawn(i) for i in range(self.num_workers)]
+        self._running = True
+        self._reader = threading.Thread(target=self._read_results, name="facemesh-results", daemon=True)
+        self._reader.start()
+        logger.info(f"FaceMesh worker pool started ({self.num_workers} processes, queue size {self.queue_size})")
+
+    def _spawn(self, index):
+        worker = _Worker(index, self._ctx, self._results, self.queue_size, self.mirror_pixels)
+        worker.process.start()
+        return worker
+
+    def shutdown(self):
+        if not self._running:
+            return
+        self._running = False
+        for worker in self._workers:
+            try:
+                worker.requests.put(None, timeout=1)
+            except queue.Full:
+                worker.process.terminate()
+        for worker in self._workers:
+            worker.process.join(timeout=2)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            self._fail_pending(worker, RuntimeError("FaceMesh worker pool shut down"))
+        self._reader.join(timeout=2)
+
+    # --- Session Affinity ---
+    def assign(self, session_id):
+        """Pins a session to a worker (the one serving the fewest sessions) and returns its index."""
+        with self._lock:
+            index = self._affinity.get(session_id)
+            if index is None:
+                worker = min(self._workers, key=lambda w: (len(w.sessions), len(w.pending)))
+                index = worker.index
+                self._affinity[session_id] = index
+                worker.sessions.add(session_id)
+            return index
+
+    def release(self, session_id):
+        """Unpins a session and frees its FaceMesh graph in the worker."""
+        with self._lock:
+            index = self._affinity.pop(session_id, None)
+            if index is None:
+                return
+            worker = self._workers[index]
+            worker.sessions.discard(session_id)
+        try:
+            worker.requests.put((MSG_RELEASE, session_id), timeout=1)
+        except queue.Full:
+            logger.warning(f"Could not release session {session_id} on worker {index} (queue full)")
+
+    # --- Dispatch ---
+    def submit(self, session_id, payload, roi_hint=None):
+        """
+        Queues a frame on the session's worker. Returns a concurrent Future
+        resolving to the analyze_frame() result (roi_hint is passed through).
+        Raises FaceMeshPoolBusy when that worker's queue is full.
+        """
+        if not self._running:
+            raise RuntimeError("FaceMesh worker pool is not running")
+        worker = self._workers[self.assign(session_id)]
+        job_id = next(self._job_ids)
+        future = Future()
+        with self._lock:
+            worker.pending[job_id] = future
+        try:
+            worker.requests.put_nowait((MSG_FRAME, job_id, session_id, payload, roi_hint))
+        except queue.Full:
+            with self._lock:
+                worker.pending.pop(job_id, None)
+                self.dropped += 1
+            raise FaceMeshPoolBusy(f"FaceMesh worker {worker.index} is busy")
+        return future
+
+    async def analyze(self, session_id, payload, roi_hint=None):
+        """Awaitable submit()."""
+        return await asyncio.wrap_future(self.submit(session_id, payload, roi_hint))
+
+    def _read_results(self):
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check > 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                job_id, result, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                future = None
+                for worker in self._workers:
+                    future = worker.pending.pop(job_id, None)
+                    if future is not None:
+                        worker.completed += 1
+                        break
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+
+    def _check_workers(self):
+        """Restarts dead workers; their queued frames fail, their sessions stay pinned."""
+        for i, worker in enumerate(self._workers):
+            if self._running and not worker.process.is_alive():
+                logger.error(f"FaceMesh worker {i} died (exit code {worker.process.exitcode}); restarting")
+                self._fail_pending(worker, RuntimeError(f"FaceMesh worker {i} died"))
+                replacement = self._spawn(i)
+                with self._lock:
+                    replacement.sessions = worker.sessions
+                    self._workers[i] = replacement
+
+    def _fail_pending(self, worker, error):
+        with self._lock:
+            pending = list(worker.pending.values())
+            worker.pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": [w.stats() for w in self._workers],
+                "sessions": len(self._affinity),
+                "dropped": self.dropped,
+                "queue_size": self.queue_size
+            }
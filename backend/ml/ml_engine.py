@@ -1,19 +1,49 @@
 import os
 import joblib
 import numpy as np
-import pandas as pd
-from collections import deque
 import time
 
+from ml.rolling import RollingStats
+
+# Model input, in the order train_model.py fits it (the model's feature_names_in_)
+FEATURE_NAMES = (
+    'perclos',
+    'ear_mean', 'ear_std',
+    'mar_mean', 'mar_std',
+    'head_pitch_mean', 'head_pitch_std',
+    'hr_mean', 'hr_std',
+    'temperature_mean'
+)
+# Per-frame sample columns kept in the temporal window
+SAMPLE_COLUMNS = ('ear', 'mar', 'head_pitch', 'head_yaw', 'hr', 'temperature')
+# FEATURE_NAMES[1:] as indices into [means of SAMPLE_COLUMNS..., stds of SAMPLE_COLUMNS...]
+_TEMPORAL_INDEX = np.array([0, 6, 1, 7, 2, 8, 4, 10, 5])
+# Rows the forest path is checked on against model.predict_proba when a model is bound
+_PARITY_ROWS = 32
+
 class MLEngine:
-    def __init__(self, model_path="fatigue_model.pkl"):
-        self.model = None
+    def __init__(self, model_path="fatigue_model.pkl", model=None):
+        """
+        model: an already-loaded estimator to share between engines (one per
+        session) instead of loading the pickle from disk again.
+        """
+        self.model = model
         self.model_path = model_path
         self.labels = {0: "Alert", 1: "Drowsy", 2: "Fatigued"}
         
         # INDUSTRIAL UPGRADE: Feature Window
         self.window_size = 20  # WIDE window for "Movie-like" smoothing
-        self.history = deque(maxlen=self.window_size)
+        # Running mean / std over the last window_size samples (SAMPLE_COLUMNS), O(1) per sample;
+        # HR / temperature <= 0 (sensor disconnected) don't count for imputation
+        self.history = RollingStats(SAMPLE_COLUMNS, self.window_size, valid_min={'hr': 0, 'temperature': 0})
+
+        # Inference buffers, reused by every predict() call
+        self._stats = np.zeros(2 * len(SAMPLE_COLUMNS)) # Window means, then stds
+        self._features = np.zeros((1, len(FEATURE_NAMES)))
+        self._model_input = None # Features reordered / cast for the bound model
+        self._columns = None # Model column order as indices into FEATURE_NAMES (None: same order)
+        self._input_names = None # Model's feature names, for the model.predict_proba fallback
+        self._trees = None # Forest fast path: the fitted trees
         
         # ADVANCED SMOOTHING: Exponential Moving Average (EMA)
         self.ema_probs = None 
@@ -39,7 +69,10 @@ class MLEngine:
         self.last_sensor_values = {"hr": 0, "temp": 0}
         self.sensor_stale_count = 0
         
-        self.load_model()
+        if self.model is None:
+            self.load_model()
+        else:
+            self._bind_model()
     
 
     def load_model(self):
@@ -53,6 +86,87 @@ class MLEngine:
             print(f"[ML] ✅ Model loaded successfully from {self.model_path}")
         except Exception as e:
             print(f"[ML] ❌ Failed to load model: {e}")
+            return
+        self._bind_model()
+
+    def _bind_model(self):
+        """
+        Checks the model's input contract against FEATURE_NAMES and prepares
+        the inference path. A random / extra-trees forest is evaluated tree by
+        tree with each tree's predict_proba (what the forest's predict_proba
+        does, without its per-call validation and joblib dispatch, which cost
+        several times the trees themselves for one row), once that has been
+        checked to match model.predict_proba; anything else, or a forest that
+        fails the check, gets model.predict_proba.
+        """
+        model = self.model
+        self._columns = None
+        self._input_names = None
+        names = getattr(model, "feature_names_in_", None)
+        if names is not None:
+            names = [str(name) for name in names]
+            if sorted(names) != sorted(FEATURE_NAMES):
+                print(f"[ML] ❌ Model features {names} don't match the engine's {list(FEATURE_NAMES)}")
+                self.model = None
+                return
+            columns = [FEATURE_NAMES.index(name) for name in names]
+            self._columns = None if columns == list(range(len(FEATURE_NAMES))) else np.array(columns)
+            self._input_names = names
+        elif getattr(model, "n_features_in_", len(FEATURE_NAMES)) != len(FEATURE_NAMES):
+            print(f"[ML] ❌ Model expects {model.n_features_in_} features, the engine builds {len(FEATURE_NAMES)}")
+            self.model = None
+            return
+
+        self._trees = None
+        self._model_input = np.zeros((1, len(FEATURE_NAMES)))
+        try:
+            from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+        except ImportError:
+            return
+        if not isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)) or model.n_outputs_ != 1:
+            return
+        trees = list(model.estimators_)
+        if not all(len(tree.classes_) == len(model.classes_) for tree in trees):
+            return
+        try:
+            rows = np.random.default_rng(0).normal(0, 50, (_PARITY_ROWS, len(FEATURE_NAMES))).astype(np.float32)
+            rows[0] = 0
+            expected = self._model_predict_proba(rows)
+            # Trees take float32 (their split thresholds are float32 too)
+            got = sum(tree.predict_proba(rows, check_input=False) for tree in trees) / len(trees)
+            assert np.allclose(got, expected), "per-tree probabilities differ from model.predict_proba"
+        except Exception as e:
+            print(f"[ML] ⚠️ Forest fast path disabled, using model.predict_proba: {e}")
+            return
+        self._trees = trees
+        self._model_input = np.zeros((1, len(FEATURE_NAMES)), dtype=np.float32)
+
+    def _model_predict_proba(self, x):
+        """model.predict_proba on rows in the model's column order, named if it was fitted with names."""
+        if self._input_names is not None:
+            import pandas as pd
+
+            x = pd.DataFrame(x, columns=self._input_names)
+        return self.model.predict_proba(x)
+
+    def predict_proba(self, features):
+        """
+        Class probabilities for one FEATURE_NAMES-ordered feature row (a
+        (1, n) array, e.g. the engine's own buffer), as a new 1-D array.
+        """
+        x = self._model_input
+        if self._columns is not None:
+            features = features[:, self._columns]
+        np.copyto(x, features, casting="unsafe")
+
+        trees = self._trees
+        if trees is None:
+            return self._model_predict_proba(x)[0]
+        total = trees[0].predict_proba(x, check_input=False)[0]
+        for tree in trees[1:]:
+            total += tree.predict_proba(x, check_input=False)[0]
+        total /= len(trees)
+        return total
 
     def reset_calibration(self):
         """Resets the adaptive baseline for a new user/session."""
@@ -63,22 +177,25 @@ class MLEngine:
         self.current_state = 0
         print("[ML] 🔄 Calibration Reset!")
 
+    def _update_window(self, current_data):
+        """
+        Adds one sample (SAMPLE_COLUMNS order) to the rolling window and
+        writes its column means and stds (population, like np.std) into
+        self._stats. Returns self._stats.
+        """
+        self.history.add(current_data)
+        n = len(SAMPLE_COLUMNS)
+        # With one sample: mean = the sample, std = 0, as before
+        self._stats[:n] = self.history.means()
+        self._stats[n:] = self.history.stds()
+        return self._stats
+
     def calculate_temporal_features(self, current_data):
         """Computes rolling mean/std from history."""
-        self.history.append(current_data)
-        data_matrix = np.array(self.history)
-        
-        if len(self.history) < 2:
-            return {
-                'ear_mean': current_data[0], 'ear_std': 0,
-                'mar_mean': current_data[1], 'mar_std': 0,
-                'pitch_mean': current_data[2], 'pitch_std': 0,
-                'hr_mean': current_data[4], 'hr_std': 0, 
-                'temp_mean': current_data[5]
-            }
-
-        means = np.mean(data_matrix, axis=0)
-        stds = np.std(data_matrix, axis=0)
+        stats = self._update_window(current_data)
+        n = len(SAMPLE_COLUMNS)
+        means = stats[:n].tolist()
+        stds = stats[n:].tolist()
         
         return {
             'ear_mean': means[0], 'ear_std': stds[0],
@@ -108,7 +225,7 @@ class MLEngine:
             return {
                 "status": self.labels.get(self.current_state, "Unknown"),
                 "confidence": round(float(np.max(self.ema_probs)), 2) if self.ema_probs is not None else 0,
-                "raw_probs": [round(p, 2) for p in self.ema_probs] if self.ema_probs is not None else [1,0,0],
+                "raw_probs": self.ema_probs.round(2).tolist() if self.ema_probs is not None else [1,0,0],
                 "flag": f"SKIPPED_{status.upper().replace(' ', '_')}"
             }
 
@@ -126,19 +243,10 @@ class MLEngine:
             
             # If invalid (<=0), try to use history mean, else use default
             if curr_hr <= 0:
-                if len(self.history) > 0:
-                     # Calculate simple mean of valid HRs in history
-                     valid_hrs = [frame[4] for frame in self.history if frame[4] > 0]
-                     curr_hr = np.mean(valid_hrs) if valid_hrs else DEFAULT_HR
-                else:
-                    curr_hr = DEFAULT_HR
+                curr_hr = self.history.valid_mean('hr', DEFAULT_HR)
                     
             if curr_temp <= 0:
-                if len(self.history) > 0:
-                     valid_temps = [frame[5] for frame in self.history if frame[5] > 0]
-                     curr_temp = np.mean(valid_temps) if valid_temps else DEFAULT_TEMP
-                else:
-                    curr_temp = DEFAULT_TEMP
+                curr_temp = self.history.valid_mean('temperature', DEFAULT_TEMP)
 
             current_ear_raw = vision_data.get('ear', 0.3)
             current_mar = vision_data.get('mar', 0.0)
@@ -215,30 +323,16 @@ class MLEngine:
                 curr_temp   # IMPUTED
             ]
             
-            stats = self.calculate_temporal_features(raw_sample)
+            stats = self._update_window(raw_sample)
             
-            feature_vector = [
-                vision_data.get('perclos', 0),
-                stats['ear_mean'], stats['ear_std'],
-                stats['mar_mean'], stats['mar_std'],
-                stats['pitch_mean'], stats['pitch_std'],
-                stats['hr_mean'], stats['hr_std'],
-                stats['temp_mean']
-            ]
-            
-            feature_names = [
-                'perclos', 
-                'ear_mean', 'ear_std', 
-                'mar_mean', 'mar_std', 
-                'head_pitch_mean', 'head_pitch_std', 
-                'hr_mean', 'hr_std',
-                'temperature_mean'
-            ]
-            X_input = pd.DataFrame([feature_vector], columns=feature_names)
+            # Feature row in FEATURE_NAMES order, written into the preallocated buffer
+            features = self._features
+            features[0, 0] = vision_data.get('perclos', 0)
+            np.take(stats, _TEMPORAL_INDEX, out=features[0, 1:])
             
             # --- 3. PROBABILISTIC INFERENCE ---
             # Get raw probabilities [Alert%, Drowsy%, Fatigued%]
-            raw_probs = self.model.predict_proba(X_input)[0]
+            raw_probs = self.predict_proba(features)
 
             # --- 3.5 LOGICAL SENSOR OVERRIDES (Soft Integration) ---
             # Instead of a hard return, we bias the probabilities so the 
@@ -311,10 +405,11 @@ class MLEngine:
             return {
                 "status": final_label,
                 "confidence": round(float(confidence), 2),
-                "raw_probs": [round(p, 2) for p in self.ema_probs],
+                "raw_probs": self.ema_probs.round(2).tolist(),
                 "flag": sensor_condition_flag
             }
             
         except Exception as e:
             print(f"[ML ERROR] {e}")
             return {"status": "Error", "confidence": 0}
+
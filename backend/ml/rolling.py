@@ -0,0 +1,154 @@
+"""
+Count-based sliding-window statistics, shared by live inference (MLEngine's
+temporal features) and offline feature generation (train_model.py).
+
+RollingStats keeps the last `window` rows of a fixed set of columns in a
+ring and updates a per-column running mean and sum of squared deviations
+(Welford) as each row enters and the oldest leaves. Adding a row is O(1)
+whatever the window. Once as many rows have been evicted as the window
+holds, the sums are recomputed from the ring (amortized O(1)), so rounding
+can't build up over a long session.
+
+- NaN values are missing: they are stored but not counted, so each column
+  has its own count, as with pandas' rolling(min_periods=1).
+- Columns can have a lower bound for "valid" readings (e.g. HR > 0; sensors
+  send 0 when disconnected). Those columns also keep the count and mean of
+  their valid values, for imputation.
+"""
+import math
+
+import numpy as np
+
+
+class RollingStats:
+    """
+    columns: column names (or a count). window: rows kept. ddof: 0 for the
+    population std (np.std), 1 for the sample std (pandas). valid_min:
+    {column: bound}; values <= bound don't count as valid readings.
+    """
+
+    def __init__(self, columns, window, ddof=0, valid_min=None):
+        self.columns = tuple(range(columns)) if isinstance(columns, int) else tuple(columns)
+        self.window = window
+        self.ddof = ddof
+        k = len(self.columns)
+        bounds = valid_min or {}
+        self.valid_min = [bounds.get(column) for column in self.columns]
+        self._ring = [[math.nan] * k for _ in range(window)]
+        self.clear()
+
+    def clear(self):
+        k = len(self.columns)
+        self.rows = 0 # Rows ever added; the ring holds the last min(rows, window)
+        self._count = [0] * k
+        self._mean = [0.0] * k
+        self._m2 = [0.0] * k
+        self._valid_count = [0] * k
+        self._valid_sum = [0.0] * k
+        self._evicted = 0
+
+    def __len__(self):
+        return min(self.rows, self.window)
+
+    def add(self, values):
+        """Appends one row (a value per column, NaN for missing), evicting the oldest once full."""
+        slot = self._ring[self.rows % self.window]
+        full = self.rows >= self.window
+        count, mean, m2 = self._count, self._mean, self._m2
+        valid_min, valid_count, valid_sum = self.valid_min, self._valid_count, self._valid_sum
+        for i, x in enumerate(values):
+            x = float(x)
+            if full:
+                old = slot[i]
+                if old == old: # Not NaN
+                    n = count[i] - 1
+                    count[i] = n
+                    if n:
+                        delta = old - mean[i]
+                        mean[i] -= delta / n
+                        m2[i] -= delta * (old - mean[i])
+                    else:
+                        mean[i] = m2[i] = 0.0
+                    if valid_min[i] is not None and old > valid_min[i]:
+                        valid_count[i] -= 1
+                        valid_sum[i] -= old
+            slot[i] = x
+            if x == x:
+                n = count[i] + 1
+                count[i] = n
+                delta = x - mean[i]
+                mean[i] += delta / n
+                m2[i] += delta * (x - mean[i])
+                if valid_min[i] is not None and x > valid_min[i]:
+                    valid_count[i] += 1
+                    valid_sum[i] += x
+        self.rows += 1
+        if full:
+            self._evicted += 1
+            if self._evicted >= self.window:
+                self._recompute()
+
+    def _recompute(self):
+        rows = self._ring[:len(self)]
+        for i, bound in enumerate(self.valid_min):
+            values = [row[i] for row in rows if row[i] == row[i]]
+            n = len(values)
+            mean = sum(values) / n if n else 0.0
+            self._count[i] = n
+            self._mean[i] = mean
+            self._m2[i] = sum((v - mean) ** 2 for v in values)
+            if bound is not None:
+                valid = [v for v in values if v > bound]
+                self._valid_count[i] = len(valid)
+                self._valid_sum[i] = sum(valid)
+        self._evicted = 0
+
+    def _index(self, column):
+        return column if isinstance(column, int) else self.columns.index(column)
+
+    def count(self, column):
+        """Non-NaN values of `column` in the window."""
+        return self._count[self._index(column)]
+
+    def mean(self, column):
+        i = self._index(column)
+        return self._mean[i] if self._count[i] else math.nan
+
+    def std(self, column):
+        i = self._index(column)
+        n = self._count[i]
+        return math.sqrt(max(0.0, self._m2[i]) / (n - self.ddof)) if n > self.ddof else math.nan
+
+    def means(self):
+        return [self._mean[i] if n else math.nan for i, n in enumerate(self._count)]
+
+    def stds(self):
+        ddof = self.ddof
+        return [math.sqrt(max(0.0, m2) / (n - ddof)) if n > ddof else math.nan for m2, n in zip(self._m2, self._count)]
+
+    def valid_count(self, column):
+        """Values of `column` above its valid_min bound in the window."""
+        return self._valid_count[self._index(column)]
+
+    def valid_mean(self, column, default=None):
+        """Mean of the valid values of `column` in the window, or `default` if there are none."""
+        i = self._index(column)
+        n = self._valid_count[i]
+        return self._valid_sum[i] / n if n else default
+
+
+def rolling_features(values, window, ddof=1):
+    """
+    (n, k) array -> (means, stds), both (n, k): row i holds the statistics
+    of rows max(0, i - window + 1)..i, like pandas
+    rolling(window, min_periods=1) (NaN where there are too few values).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    stats = RollingStats(values.shape[1], window, ddof)
+    means = np.empty_like(values)
+    stds = np.empty_like(values)
+    for i, row in enumerate(values.tolist()):
+        stats.add(row)
+        means[i] = stats.means()
+        stds[i] = stats.stds()
+    return means, stds
@@ -3,17 +3,15 @@ API routes for sensor data, video processing, and ML predictions.
 """
 import logging
 import time
-import base64
-import cv2
-import numpy as np
 import threading
 import traceback
 from flask import Blueprint, jsonify, request
 
 from config import get_config
-from cv.perclos import process_face_mesh, perclos_data, reset_eye_calibration
+from cv.perclos import default_vision_state, perclos_data, reset_eye_calibration
+from cv.pipeline import analyze_frame
 from cv.head_pose import cv_head_angles, cv_angles_lock
-from sensors.serial_reader import latest_sensor_data, sensor_data_history, head_position_data, calculate_head_position, sensor_lock
+from sensors.serial_reader import sensor_state, sensor_data_history, publish_samples
 from ml.ml_engine import MLEngine
 
 logger = logging.getLogger(__name__)
@@ -50,40 +48,26 @@ def health_check():
 
 @api_bp.route('/sensor_data', methods=['GET'])
 def get_sensor_data():
-    with sensor_lock:
-        if latest_sensor_data["temperature"] is None:
-            logger.debug("No sensor data available yet")
-            return jsonify({"message": "No data yet"}), 200
-        data = latest_sensor_data.copy()
+    data = sensor_state.current.data
+    if data["temperature"] is None:
+        logger.debug("No sensor data available yet")
+        return jsonify({"message": "No data yet"}), 200
     return jsonify(data), 200
 
 @api_bp.route('/sensor_data/history', methods=['GET'])
 def get_sensor_data_history():
-    return jsonify(list(sensor_data_history)), 200
+    return jsonify(sensor_data_history.tail(config.MAX_HISTORY)), 200
 
 @api_bp.route('/head_position', methods=['GET'])
 def get_head_position():
     """
     Returns head position solely based on SENSORS (Arduino).
     """
-    ax = latest_sensor_data["ax"]
-    ay = latest_sensor_data["ay"]
-    az = latest_sensor_data["az"]
-
-    if ax is None or ay is None or az is None:
+    # Fused orientation, precomputed per IMU sample by the sensor path
+    head_position = sensor_state.current.head_position
+    if head_position is None:
         return jsonify({"position": "Unknown", "angle_x": 0, "angle_y": 0, "angle_z": 0}), 200
-
-    # Sensor Calculation: (Unchanged - Arduino specific)
-    pos, ang_x, ang_y, ang_z = calculate_head_position(ax, ay, az)
-
-    head_position_data.update({
-        "position": pos,
-        "angle_x": round(ang_x, 2),
-        "angle_y": round(ang_y, 2),
-        "angle_z": round(ang_z, 2),
-        "timestamp": int(time.time())
-    })
-    return jsonify(head_position_data), 200
+    return jsonify(head_position), 200
 
 @api_bp.route('/process_frame', methods=['POST'])
 def process_frame():
@@ -93,14 +77,15 @@ def process_frame():
             logger.warning("Process frame called without image_data")
             return jsonify({"error": "Missing image_data"}), 400
 
-        base64_string = data['image_data'].split(',')[1]
-        frame = cv2.imdecode(np.frombuffer(base64.b64decode(base64_string), np.uint8), cv2.IMREAD_COLOR)
-        if frame is None:
+        # Decoded straight to RGB and mirrored in landmark space (no frame copies)
+        detection = analyze_frame(data['image_data'], mirror_pixels=config.VISION_MIRROR_PIXELS)
+        if detection is None:
             logger.warning("Invalid frame data received")
             raise ValueError("Invalid frame data")
 
-        frame = cv2.flip(frame, 1)
-        result = process_face_mesh(frame)
+        result = default_vision_state.process_landmarks(
+            detection["landmarks"], detection["width"], detection["height"]
+        )
         return jsonify(result), 200
 
     except Exception as e:
@@ -131,28 +116,12 @@ def get_combined_data():
     # CHECK FALLBACK LOGIC
     current_time = time.time()
     
-    with sensor_lock:
-        sensor_active = (
-            latest_sensor_data.get("timestamp") is not None and 
-            (current_time - latest_sensor_data["timestamp"] < config.SENSOR_TIMEOUT) and
-            latest_sensor_data.get("ax") is not None
-        )
-        
-        if sensor_active:
-            # 1. USE SENSOR (ARDUINO)
-            pos, ang_x, ang_y, ang_z = calculate_head_position(
-                latest_sensor_data["ax"],
-                latest_sensor_data["ay"],
-                latest_sensor_data["az"]
-            )
-            hp = {
-                "position": pos,
-                "angle_x": round(ang_x, 2),
-                "angle_y": round(ang_y, 2),
-                "angle_z": round(ang_z, 2),
-                "timestamp": int(time.time()),
-                "source": "Sensor"
-            }
+    sensor = sensor_state.current
+    sensor_active = sensor.is_active(current_time, config.SENSOR_TIMEOUT) and sensor.head_position is not None
+
+    if sensor_active:
+        # 1. USE SENSOR (ARDUINO): fused orientation from the sensor path
+        hp = sensor.head_position
 
     if not sensor_active:
         # 2. USE CV (FALLBACK)
@@ -194,12 +163,11 @@ def get_combined_data():
     if (current_time - last_ml_time) > ML_INTERVAL and not is_calibrating:
         with ml_lock:
             if (time.time() - last_ml_time) > ML_INTERVAL:
-                with sensor_lock:
-                    safe_sensor = {
-                        "hr": latest_sensor_data.get("hr") or 0.0,
-                        "temperature": latest_sensor_data.get("temperature") or 0.0,
-                        "timestamp": latest_sensor_data.get("timestamp") or time.time()
-                    }
+                safe_sensor = {
+                    "hr": sensor.get("hr") or 0.0,
+                    "temperature": sensor.get("temperature") or 0.0,
+                    "timestamp": sensor.get("timestamp") or time.time()
+                }
                 
                 prediction_result = ml_engine.predict(safe_sensor, {
                     **perclos_data,
@@ -209,8 +177,7 @@ def get_combined_data():
                 cached_prediction = prediction_result
                 last_ml_time = time.time()
 
-    with sensor_lock:
-        sensor_data = latest_sensor_data.copy()
+    sensor_data = sensor.data
     
     return jsonify({
         "sensor": sensor_data,
@@ -255,10 +222,7 @@ def ingest_sensor_data():
         
         parsed = parse_raw_sensor_string(raw_string)
         if parsed:
-            timestamp = int(time.time())
-            with sensor_lock:
-                latest_sensor_data.update({**parsed, "timestamp": timestamp})
-                sensor_data_history.append(latest_sensor_data.copy())
+            publish_samples([parsed])
             
             logger.debug(f"Sensor data ingested: {parsed}")
             return jsonify({"status": "received", "data": parsed}), 200
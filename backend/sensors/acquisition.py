@@ -0,0 +1,306 @@
+"""
+Multi-port sensor acquisition (one edge box, several seats).
+
+AcquisitionManager polls the serial ports every SENSOR_SCAN_INTERVAL
+seconds, runs one reader thread (sensors.serial_reader.read_bulk) per
+attached board and routes each board's samples into its own SensorStore.
+Boards plugged in later are picked up on the next scan, and unplugged ones
+are detached. A store outlives its reader, so a board that comes back
+under the same id continues its history.
+
+Device ids are the names given in SENSOR_PORTS ("seat1=/dev/ttyUSB0" or
+"seat1=<USB serial number>"), else the adapter's USB serial number, else
+the port name. A session whose id matches a device id reads that device's
+store (see server._sensor_store_for).
+
+A "port" may also be a replay spec ("seat2=replay:nthu@10x", see
+sensors.replay): that device is fed from a recorded dataset instead of a
+board. add_replay() attaches one at runtime (e.g. for a single session).
+Boards behind a remote bridge (POST /api/sensor_data/ingest/batch) have no
+reader here; ingest_store() gives their device id a store of its own.
+"""
+import logging
+import os
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+from config import get_config
+from sensors.replay import REPLAY_PREFIX, ReplaySource
+from sensors.store import SensorStore
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+PORT_KEYWORDS = ("CH340", "Arduino", "USB") # Same heuristic as serial_reader.find_arduino_port
+
+
+def parse_port_spec(spec):
+    """"seat1=/dev/ttyUSB0, /dev/ttyACM1" -> {port or serial number: name or None}."""
+    entries = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, target = item.rpartition("=")
+        entries[target.strip()] = name.strip() or None
+    return entries
+
+
+def scan_ports(spec=None):
+    """
+    {device_id: port} for every sensor board present: USB serial adapters
+    matching PORT_KEYWORDS plus the ports listed in SENSOR_PORTS (which may
+    be paths list_ports doesn't enumerate, e.g. a pty).
+    """
+    entries = parse_port_spec(config.SENSOR_PORTS if spec is None else spec)
+    found = {}
+    for info in serial.tools.list_ports.comports():
+        listed = info.device in entries or (info.serial_number and info.serial_number in entries)
+        if not listed and not any(keyword in (info.description or "") for keyword in PORT_KEYWORDS):
+            continue
+        name = entries.get(info.device) or (entries.get(info.serial_number) if info.serial_number else None)
+        found[name or info.serial_number or os.path.basename(info.device)] = info.device
+
+    enumerated = set(found.values())
+    for target, name in entries.items():
+        if target.startswith(REPLAY_PREFIX):
+            found[name or target] = target
+        elif target not in enumerated and target.startswith("/dev/") and os.path.exists(target):
+            found[name or os.path.basename(target)] = target
+    return found
+
+
+class DeviceReader:
+    """
+    One attachment of a board: opens the port and reads it into `store`
+    until stopped or unplugged. A replay spec as `port` plays the dataset
+    into the store instead.
+    """
+
+    def __init__(self, device_id, port, store, settle=2.0, protocol=None):
+        self.device_id = device_id
+        self.port = port
+        self.store = store
+        self.settle = settle
+        self.protocol = protocol
+        self.connected = False
+        self.error = None
+        self.attached_at = time.time()
+        self.ended_at = None
+        self.replay = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"sensor-{device_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        from sensors.serial_reader import read_bulk
+
+        ser = None
+        try:
+            if self.port.startswith(REPLAY_PREFIX):
+                self.replay = ReplaySource.from_spec(self.port)
+                self.connected = True
+                logger.info(f"[OK] Sensor {self.device_id} replaying {self.replay.name}")
+                self.replay.run(self.store.publish, self._stop)
+                return
+            ser = serial.Serial(port=self.port, baudrate=config.BAUD_RATE, timeout=0.5)
+            self.connected = True
+            logger.info(f"[OK] Sensor {self.device_id} connected on {self.port}")
+            if self._stop.wait(self.settle): # Boards reset when the port opens
+                return
+            read_bulk(ser, self.store.publish, self._stop, self.protocol)
+        except (serial.SerialException, OSError, ValueError) as e:
+            # Unplugged (read error), not openable (busy, permissions) or a bad replay spec
+            self.error = f"{type(e).__name__}: {e}"
+            if not self._stop.is_set():
+                logger.warning(f"Sensor {self.device_id} on {self.port}: {self.error}")
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.error(f"[ERROR] Sensor reader {self.device_id} failed: {e}", exc_info=True)
+        finally:
+            self.connected = False
+            self.ended_at = time.time()
+            if ser:
+                try:
+                    ser.close()
+                except Exception as e:
+                    logger.debug(f"Error closing serial port: {e}")
+
+    def close(self, timeout=1.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def info(self):
+        return {
+            "port": self.port,
+            "connected": self.connected,
+            "attached_at": self.attached_at,
+            "error": self.error,
+            "replay": self.replay.info() if self.replay else None
+        }
+
+
+class AcquisitionManager:
+    """
+    Keeps one DeviceReader per present board and one SensorStore per device
+    id ever seen. scan() -> {device_id: port} (default: scan_ports).
+    """
+
+    def __init__(self, scan=None, interval=None, settle=2.0, protocol=None, retry=5.0):
+        self._scan = scan or scan_ports
+        self.interval = interval if interval is not None else config.SENSOR_SCAN_INTERVAL
+        self.settle = settle
+        self.protocol = protocol
+        self.retry = retry # Seconds before reopening a present port whose reader failed
+        self.stores = {}
+        self.readers = {}
+        self.pinned = {} # device_id -> port attached by add_replay(), independent of scans
+        self.attached = 0
+        self.detached = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sensor-acquisition", daemon=True)
+        self._thread.start()
+        logger.info("Multi-port sensor acquisition started")
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"[ERROR] Sensor port scan failed: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """One hot-plug pass. Returns (attached, detached) device ids."""
+        present = {**self._scan(), **self.pinned}
+        attached, detached = [], []
+        now = time.time()
+        with self._lock:
+            for device_id, reader in list(self.readers.items()):
+                gone = present.get(device_id) != reader.port
+                failed = not reader.alive and now - reader.ended_at >= self.retry
+                if gone or failed:
+                    reader.close(timeout=0)
+                    del self.readers[device_id]
+                    if gone:
+                        detached.append(device_id)
+                        logger.info(f"Sensor {device_id} detached ({reader.port})")
+
+            for device_id, port in present.items():
+                if device_id not in self.readers:
+                    self._attach(device_id, port)
+                    attached.append(device_id)
+            self.attached += len(attached)
+            self.detached += len(detached)
+        return attached, detached
+
+    def _attach(self, device_id, port):
+        # Caller holds the lock
+        store = self.stores.get(device_id)
+        if store is None:
+            store = self.stores[device_id] = SensorStore(device_id)
+        self.readers[device_id] = DeviceReader(device_id, port, store, self.settle, self.protocol).start()
+        logger.info(f"Sensor {device_id} attached on {port}")
+        return store
+
+    def add_replay(self, device_id, spec):
+        """
+        Feeds device `device_id` from a replay spec ("replay:<dataset>[@speed]")
+        until remove_replay(); replaces whatever fed it before. Raises
+        ValueError / FileNotFoundError for a bad spec.
+        """
+        if not spec.startswith(REPLAY_PREFIX):
+            spec = REPLAY_PREFIX + spec
+        ReplaySource.from_spec(spec) # Validate before touching the running reader
+        with self._lock:
+            reader = self.readers.pop(device_id, None)
+            if reader is not None:
+                reader.close(timeout=0)
+            self.pinned[device_id] = spec
+            self.attached += 1
+            return self._attach(device_id, spec)
+
+    def remove_replay(self, device_id):
+        """
+        Stops a replay started by add_replay() and drops its store (readers
+        of that id fall back to their default). False if there was none.
+        """
+        with self._lock:
+            if self.pinned.pop(device_id, None) is None:
+                return False
+            reader = self.readers.pop(device_id, None)
+            if reader is not None:
+                reader.close(timeout=0)
+            self.stores.pop(device_id, None)
+            self.detached += 1
+            return True
+
+    def get(self, device_id):
+        """The device's SensorStore, or None if no such device was ever attached."""
+        return self.stores.get(device_id)
+
+    def device_stores(self):
+        """{device_id: store} for boards and bridged uploads: every store but the add_replay() ones."""
+        with self._lock:
+            return {device_id: store for device_id, store in self.stores.items() if device_id not in self.pinned}
+
+    def ingest_store(self, device_id, max_devices=None):
+        """
+        The store for uploads from a bridged board, created on first use.
+        None if that would take the number of stores past `max_devices`.
+        """
+        with self._lock:
+            store = self.stores.get(device_id)
+            if store is None:
+                if max_devices is not None and len(self.stores) >= max_devices:
+                    return None
+                store = self.stores[device_id] = SensorStore(device_id)
+                logger.info(f"Sensor {device_id} registered for batch ingest")
+            return store
+
+    def connected(self):
+        """Ids of the devices whose port is open right now."""
+        return [device_id for device_id, reader in list(self.readers.items()) if reader.connected]
+
+    def info(self):
+        with self._lock:
+            devices = []
+            for device_id, store in self.stores.items():
+                reader = self.readers.get(device_id)
+                devices.append({
+                    **store.info(),
+                    **(reader.info() if reader else {"port": None, "connected": False, "attached_at": None, "error": None})
+                })
+            return devices
+
+    def stats(self):
+        return {
+            "devices": len(self.stores),
+            "connected": len(self.connected()),
+            "attached": self.attached,
+            "detached": self.detached
+        }
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+        with self._lock:
+            for reader in self.readers.values():
+                reader.close()
+            self.readers.clear()
@@ -0,0 +1,333 @@
+"""
+Streaming heart-rate and HRV statistics for one sensor board.
+
+The board's "HR" field is a smoothed BPM reading; HRV needs the beat-to-beat
+(RR) intervals. The firmware can send those directly ("IBI:812", in
+milliseconds, appended to a sample line or on a line of its own) or stream
+the raw pulse sensor signal ("PPG:<adc value>" on every sample), and then
+PulseDetector finds the beats. With neither, only the HR readings are
+averaged.
+
+CardioMonitor runs in the ingest path (SensorStore.publish) and keeps one
+SlidingWindow per configured length (CARDIO_WINDOWS, seconds). Every beat or
+reading is pushed once and dropped once, and each window keeps running sums,
+so mean HR, SDNN and RMSSD cost O(1) per beat whatever the window length.
+
+- Beats are placed on the RR timeline (previous beat + interval). A window
+  holds the last N seconds of heartbeats even when they arrive in bursts
+  (bulk reads, replay at N x).
+- RR intervals outside MIN_RR..MAX_RR, or differing from the previous one
+  by more than ARTIFACT_RATIO (missed or extra beats), are counted as
+  rejected and left out. RMSSD only uses differences between adjacent
+  accepted beats.
+- HR readings are sampled at most once per HR_SAMPLE_INTERVAL. The firmware
+  repeats its BPM value on every IMU sample.
+"""
+import math
+import time
+from collections import deque
+
+from sensors.orientation import spread_read_times
+
+MIN_RR = 300.0 # ms (200 BPM)
+MAX_RR = 2000.0 # ms (30 BPM)
+ARTIFACT_RATIO = 0.3 # Max relative change between consecutive RR intervals
+MAX_GAP = 5.0 # Seconds without data after which the beat sequence restarts
+HR_SAMPLE_INTERVAL = 1.0 # Seconds between HR readings taken into the windows
+HR_RANGE = (30.0, 220.0) # Plausible BPM readings (the firmware sends 0 without a finger)
+
+# Pulse detection on raw PPG
+BASELINE_TAU = 1.5 # Seconds; slow EMA removed from the signal (drift, respiration)
+AMPLITUDE_TAU = 3.0 # Seconds; EMA of |signal - baseline|
+PULSE_THRESHOLD = 0.5 # Pulse starts above this x running amplitude
+PEAK_RATIO = 0.6 # A pulse counts as a beat if its height is at least this x the recent beats'
+
+EMPTY_STATS = {"source": None, "beats": 0, "rejected": 0, "last_beat": None, "windows": [], "timestamp": None}
+
+
+class SlidingWindow:
+    """
+    Values from the last `length` seconds, pushed in time order, with running
+    sums: count, mean, SD and RMS of successive differences are O(1). Sums
+    are taken relative to the first value (better conditioned for the SD) and
+    recomputed from the entries once as many have been dropped as the window
+    holds, so rounding can't accumulate (amortized O(1)).
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.entries = deque() # (time, value, squared difference to the previous value or None)
+        self.offset = None
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.diff_sum = 0.0 # Over every entry but the oldest (its predecessor is gone)
+        self.diff_count = 0
+        self._dropped = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, t, value, diff_sq=None):
+        if self.offset is None:
+            self.offset = value
+        if self.entries and diff_sq is not None:
+            self.diff_sum += diff_sq
+            self.diff_count += 1
+        x = value - self.offset
+        self.sum += x
+        self.sum_sq += x * x
+        self.entries.append((t, value, diff_sq))
+        self.expire(t)
+
+    def expire(self, now):
+        """Drops the entries older than `length` seconds before `now`."""
+        entries = self.entries
+        cutoff = now - self.length
+        while entries and entries[0][0] <= cutoff:
+            value = entries.popleft()[1] - self.offset
+            self.sum -= value
+            self.sum_sq -= value * value
+            if entries and entries[0][2] is not None:
+                # The new oldest entry's difference no longer has both ends in the window
+                self.diff_sum -= entries[0][2]
+                self.diff_count -= 1
+            self._dropped += 1
+        if not entries:
+            self.offset = None
+            self.sum = self.sum_sq = self.diff_sum = 0.0
+            self.diff_count = self._dropped = 0
+        elif self._dropped > len(entries):
+            self._resum()
+
+    def _resum(self):
+        self.offset = self.entries[0][1]
+        self.sum = self.sum_sq = self.diff_sum = 0.0
+        self.diff_count = 0
+        for i, (_, value, diff_sq) in enumerate(self.entries):
+            x = value - self.offset
+            self.sum += x
+            self.sum_sq += x * x
+            if i and diff_sq is not None:
+                self.diff_sum += diff_sq
+                self.diff_count += 1
+        self._dropped = 0
+
+    @property
+    def mean(self):
+        n = len(self.entries)
+        return self.offset + self.sum / n if n else None
+
+    @property
+    def sd(self):
+        n = len(self.entries)
+        if n < 2:
+            return None
+        return math.sqrt(max(0.0, (self.sum_sq - self.sum * self.sum / n) / (n - 1)))
+
+    @property
+    def rms_diff(self):
+        return math.sqrt(max(0.0, self.diff_sum / self.diff_count)) if self.diff_count else None
+
+
+class PulseDetector:
+    """
+    Beat detection on a raw PPG stream (pulse peaks pointing up): the signal
+    minus a slow baseline has to rise above PULSE_THRESHOLD x its running
+    amplitude, and the beat is the highest sample of that excursion (which
+    ends once the signal is back below half that height, so a baseline
+    lagging behind drift doesn't merge pulses).
+    Excursions lower than PEAK_RATIO x the recent beats (the dicrotic wave)
+    and peaks closer than MIN_RR to the previous beat are ignored.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.baseline = None
+        self.amplitude = 0.0
+        self.height = None # Running height of the accepted pulses
+        self.last_beat = None
+        self._last_time = None
+        self._peak = None # (time, height) of the excursion in progress
+
+    def update(self, t, value):
+        """One sample at `t` seconds. Returns the RR interval (ms) when it completes a beat, else None."""
+        last = self._last_time
+        if t == last:
+            return None # Same read time as the previous sample: no time step to filter with
+        if last is None or not 0 < t - last <= MAX_GAP:
+            self.reset()
+            self.baseline = value
+            self._last_time = t
+            return None
+        dt = t - last
+        self._last_time = t
+        self.baseline += (1 - math.exp(-dt / BASELINE_TAU)) * (value - self.baseline)
+        x = value - self.baseline
+        self.amplitude += (1 - math.exp(-dt / AMPLITUDE_TAU)) * (abs(x) - self.amplitude)
+
+        peak = self._peak
+        if peak is None:
+            if x > PULSE_THRESHOLD * self.amplitude > 0:
+                self._peak = (t, x)
+            return None
+        if x > peak[1]:
+            self._peak = (t, x)
+            return None
+        if x > 0.5 * peak[1]:
+            return None
+
+        # Down to half its height: the excursion's maximum was the beat,
+        # unless it is much smaller than the recent ones (dicrotic wave, noise)
+        self._peak = None
+        beat, height = peak
+        if self.height is not None and height < PEAK_RATIO * self.height:
+            return None
+        self.height = height if self.height is None else self.height + 0.2 * (height - self.height)
+        previous = self.last_beat
+        if previous is not None and 1000 * (beat - previous) < MIN_RR:
+            return None
+        self.last_beat = beat
+        return 1000 * (beat - previous) if previous is not None else None
+
+
+class CardioMonitor:
+    """
+    Cardio state for one board: RR and HR-reading windows for each length in
+    `windows` (seconds). Fed from the ingest path; stats() gives the payload
+    published with the sensor snapshot.
+    """
+
+    def __init__(self, windows=(30, 60, 300)):
+        self.lengths = sorted(float(w) for w in windows)
+        self.beats = [SlidingWindow(length) for length in self.lengths] # RR (ms) on the RR timeline
+        self.readings = [SlidingWindow(length) for length in self.lengths] # HR readings (BPM) by read time
+        self.pulse = PulseDetector()
+        self.source = None # "ibi", "ppg" or "hr": where the latest data came from
+        self.accepted = 0
+        self.rejected = 0
+        self.last_beat = None # Read time of the latest beat
+        self._beat_time = None # Position of the latest beat on the RR timeline
+        self._last_rr = None # Previous in-range RR, for the artifact check
+        self._last_accepted = None # Previous RR if it was accepted, for successive differences
+        self._last_reading = None
+        self._last_time = None
+        self._ppg_time = None
+        self._last_tick = None
+
+    def add_interval(self, rr, read_at):
+        """One RR interval (ms) read at `read_at` (epoch seconds). Returns True if it was accepted."""
+        last = self.last_beat
+        if self._beat_time is None or last is None or not 0 <= read_at - last <= MAX_GAP:
+            # First beat or a dropout: restart the sequence at the wall clock
+            self._beat_time = read_at
+            self._last_rr = self._last_accepted = None
+        else:
+            self._beat_time += rr / 1000.0
+        self.last_beat = read_at
+
+        plausible = MIN_RR <= rr <= MAX_RR
+        previous = self._last_rr
+        accepted = plausible and (previous is None or abs(rr - previous) <= ARTIFACT_RATIO * previous)
+        self._last_rr = rr if plausible else None
+        if not accepted:
+            self._last_accepted = None
+            self.rejected += 1
+            return False
+
+        diff_sq = (rr - self._last_accepted) ** 2 if self._last_accepted is not None else None
+        self._last_accepted = rr
+        for window in self.beats:
+            window.push(self._beat_time, rr, diff_sq)
+        self.accepted += 1
+        return True
+
+    def add_reading(self, hr, read_at):
+        """One HR reading (BPM). Returns True if it was taken into the windows."""
+        if not HR_RANGE[0] <= hr <= HR_RANGE[1]:
+            return False
+        last = self._last_reading
+        if last is not None and 0 <= read_at - last < HR_SAMPLE_INTERVAL:
+            return False
+        self._last_reading = read_at
+        for window in self.readings:
+            window.push(read_at, hr)
+        return True
+
+    def _ppg_sample_time(self, sample, read_at):
+        # Device tick (binary protocol, ms) when present: exact spacing despite read bursts
+        tick = sample.get("tick")
+        if tick is not None and self._last_tick is not None and self._ppg_time is not None:
+            t = self._ppg_time + ((int(tick) - self._last_tick) & 0xFFFFFFFF) / 1000.0
+        else:
+            t = read_at
+        self._last_tick = int(tick) if tick is not None else None
+        self._ppg_time = t
+        return t
+
+    def update_batch(self, samples, read_times=None, now=None):
+        """
+        Feeds parsed samples (oldest first). Without read_times the samples
+        are spread between the previous batch and `now`, as in
+        OrientationFilter.update_batch. Returns True if any beat or HR
+        reading changed the statistics.
+        """
+        if read_times is None:
+            read_times = spread_read_times(self._last_time, time.time() if now is None else now, len(samples))
+        changed = False
+        for sample, read_at in zip(samples, read_times):
+            ibi = sample.get("ibi")
+            if ibi is not None:
+                self.source = "ibi"
+                self.add_interval(ibi, read_at)
+                changed = True
+            else:
+                ppg = sample.get("ppg")
+                if ppg is not None and self.source != "ibi":
+                    rr = self.pulse.update(self._ppg_sample_time(sample, read_at), ppg)
+                    if rr is not None:
+                        self.source = "ppg"
+                        self.add_interval(rr, read_at)
+                        changed = True
+            hr = sample.get("hr")
+            if hr is not None and self.add_reading(hr, read_at):
+                if self.source is None:
+                    self.source = "hr"
+                changed = True
+        if read_times:
+            self._last_time = read_times[-1]
+        return changed
+
+    def stats(self, timestamp=None):
+        """
+        Payload per window length: accepted beats, mean RR, SDNN and RMSSD
+        (ms), mean HR (from the RR intervals when there are beats, else from
+        the HR readings) and the SD of the HR readings.
+        """
+        windows = []
+        for beats, readings in zip(self.beats, self.readings):
+            mean_rr = beats.mean if len(beats) >= 2 else None
+            hr_mean = 60000.0 / mean_rr if mean_rr else readings.mean
+            windows.append({
+                "seconds": beats.length,
+                "beats": len(beats),
+                "mean_rr": _round(mean_rr, 1),
+                "sdnn": _round(beats.sd, 2),
+                "rmssd": _round(beats.rms_diff, 2),
+                "hr_mean": _round(hr_mean, 1),
+                "hr_sd": _round(readings.sd, 2),
+                "readings": len(readings)
+            })
+        return {
+            "source": self.source,
+            "beats": self.accepted,
+            "rejected": self.rejected,
+            "last_beat": self.last_beat,
+            "windows": windows,
+            "timestamp": timestamp
+        }
+
+
+def _round(value, digits):
+    return round(value, digits) if value is not None else None
@@ -0,0 +1,196 @@
+"""
+Byte-stream framing for the Arduino serial link.
+
+Serial reads return arbitrary chunks: half a line, or many lines at high
+IMU rates. A framer keeps one reusable buffer per port, appends each chunk
+and hands back every complete frame, keeping the partial tail for the next
+read.
+
+Two wire protocols are supported:
+
+- text: newline-terminated "T:36.5, HR:72, Ax:0.1, ..." lines
+  (sensors.parser).
+- binary: COBS-encoded frames terminated by 0x00. Each decoded frame is a
+  SAMPLE_STRUCT payload followed by its CRC-16/CCITT-FALSE (little-endian
+  uint16). That is 45 bytes per sample on the wire, about half of a text
+  line.
+
+detect_protocol() tells them apart from the first bytes a port sends. A
+port may be opened mid-frame, so it only decides on positive evidence:
+binary once a frame passes its CRC (random bytes almost never do), text
+once DETECT_TEXT_LINES complete lines parse as sensor lines (binary frames
+contain stray 0x0A bytes, but not "key:value" lines).
+"""
+import binascii
+import struct
+
+import numpy as np
+
+from sensors.parser import SensorLineParser
+
+DETECT_TEXT_LINES = 3
+
+# --- Binary sample frame ---
+FRAME_SAMPLE = 0x01 # Frame type byte
+# type, device tick (ms), temperature, hr, spo2, ax, ay, az, gx, gy, gz
+SAMPLE_STRUCT = struct.Struct("<BI9f")
+FRAME_DTYPE = np.dtype([
+    ("type", "u1"), ("tick", "<u4"),
+    ("temperature", "<f4"), ("hr", "<f4"), ("spo2", "<f4"),
+    ("ax", "<f4"), ("ay", "<f4"), ("az", "<f4"),
+    ("gx", "<f4"), ("gy", "<f4"), ("gz", "<f4")
+])
+assert FRAME_DTYPE.itemsize == SAMPLE_STRUCT.size
+FRAME_FIELDS = FRAME_DTYPE.names[2:] # Sensor values (same names as sensors.parser.FIELDS)
+_CRC = struct.Struct("<H")
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), computed in C by binascii."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data):
+    """Consistent Overhead Byte Stuffing: `data` without any 0x00 bytes (+1 byte per 254)."""
+    out = bytearray()
+    for block in bytes(data).split(b"\x00"):
+        # Each zero-free run becomes <len + 1><run>, split at 254 bytes
+        while len(block) >= 254:
+            out.append(255)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(data):
+    """Inverse of cobs_encode(). Raises ValueError on malformed input."""
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        code = data[i]
+        if code == 0 or i + code > n:
+            raise ValueError("Malformed COBS block")
+        end = i + code
+        out += data[i + 1:end]
+        if code < 255 and end < n:
+            out.append(0)
+        i = end
+    return bytes(out)
+
+
+def encode_sample_frame(sample, tick):
+    """One sample dict -> wire bytes (COBS frame + 0x00). Missing fields are sent as NaN."""
+    payload = SAMPLE_STRUCT.pack(FRAME_SAMPLE, tick & 0xFFFFFFFF, *(
+        sample.get(field, float("nan")) for field in FRAME_FIELDS
+    ))
+    return cobs_encode(payload + _CRC.pack(crc16(payload))) + b"\x00"
+
+
+def decode_frames(payloads):
+    """CRC-checked payloads -> FRAME_DTYPE structured array, in one NumPy call."""
+    return np.frombuffer(b"".join(payloads), dtype=FRAME_DTYPE)
+
+
+class LineFramer:
+    """Newline-delimited frames (the text protocol: "T:36.5, HR:72, ...\\r\\n")."""
+
+    def __init__(self, max_line=512):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self.dropped = 0 # Bytes discarded as oversized garbage (no newline in sight)
+
+    def feed(self, chunk):
+        """Appends a chunk; returns the complete lines it finished (bytes, without the newline)."""
+        buffer = self._buffer
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            if len(buffer) > self.max_line:
+                # Noise or a baud-rate mismatch: don't let the buffer grow forever
+                self.dropped += len(buffer)
+                buffer.clear()
+            return []
+        lines = bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+        return lines
+
+    def reset(self):
+        self._buffer.clear()
+
+
+class BinaryFramer:
+    """
+    0x00-delimited COBS frames. feed() returns the payloads (CRC stripped)
+    of complete sample frames whose CRC matched; anything else is counted
+    and skipped, and the next 0x00 resynchronizes the stream.
+    """
+    _ENCODED_MAX = SAMPLE_STRUCT.size + _CRC.size + 2
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.bad_frames = 0 # Malformed COBS, wrong length or unknown type
+
+    def feed(self, chunk):
+        buffer = self._buffer
+        buffer += chunk
+        end = buffer.rfind(b"\x00")
+        if end < 0:
+            if len(buffer) > 4 * self._ENCODED_MAX:
+                self.bad_frames += 1
+                buffer.clear()
+            return []
+        encoded = bytes(buffer[:end]).split(b"\x00")
+        del buffer[:end + 1]
+
+        payloads = []
+        size = SAMPLE_STRUCT.size
+        for frame in encoded:
+            if not frame:
+                continue
+            try:
+                decoded = cobs_decode(frame)
+            except ValueError:
+                self.bad_frames += 1
+                continue
+            if len(decoded) != size + _CRC.size or decoded[0] != FRAME_SAMPLE:
+                self.bad_frames += 1
+                continue
+            payload = decoded[:size]
+            if crc16(payload) != _CRC.unpack_from(decoded, size)[0]:
+                self.crc_errors += 1
+                continue
+            payloads.append(payload)
+        self.frames += len(payloads)
+        return payloads
+
+    def reset(self):
+        self._buffer.clear()
+
+    def stats(self):
+        return {"frames": self.frames, "crc_errors": self.crc_errors, "bad_frames": self.bad_frames}
+
+
+def detect_protocol(data, text_lines=DETECT_TEXT_LINES):
+    """
+    "binary" if `data` holds a CRC-valid sample frame, "text" if it holds
+    `text_lines` complete lines that parse as sensor lines, else None
+    (undecided: read more). The bytes before the first delimiter are
+    ignored: the port may have been opened in the middle of a frame.
+    """
+    if b"\x00" in data and BinaryFramer().feed(data[data.index(b"\x00") + 1:]):
+        return "binary"
+    lines = bytes(data).split(b"\n")[1:-1] # Complete lines only
+    if len(lines) < text_lines:
+        return None
+    parser = SensorLineParser()
+    parsed = 0
+    for line in lines:
+        if b"\x00" not in line and parser.parse(line.decode("utf-8", errors="ignore").strip()):
+            parsed += 1
+            if parsed >= text_lines:
+                return "text"
+    return None
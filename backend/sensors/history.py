@@ -0,0 +1,148 @@
+"""
+Sensor history as a preallocated NumPy ring buffer.
+
+One structured row per sample: a float64 timestamp (epoch seconds) and a
+float32 column per sensor field, NaN where a value was never received.
+Appending writes one row in place (O(1), nothing kept per sample but the
+row); at 44 bytes a row the default capacity of 131072 samples is 5.8 MB,
+i.e. hours of data at typical sensor rates.
+
+Rows are kept in arrival order and their timestamps never decrease: a
+sample stamped earlier than the newest row (batch ingest and bridge replay
+carry client timestamps) is clamped to that row's timestamp. So the two
+contiguous segments of the ring are each sorted by timestamp and range
+queries are binary searches.
+Downsampling averages fixed-width time buckets with reduceat.
+"""
+import threading
+import time
+
+import numpy as np
+
+from sensors.parser import FIELDS
+
+HISTORY_DTYPE = np.dtype([("timestamp", "f8")] + [(field, "f4") for field in FIELDS])
+
+
+class SensorHistory:
+    def __init__(self, capacity=131072):
+        self.capacity = capacity
+        self._data = np.full(capacity, np.nan, dtype=HISTORY_DTYPE)
+        self._count = 0 # Total rows ever appended; the newest is at (_count - 1) % capacity
+        self._last = -np.inf # Newest timestamp; appends are clamped to it
+        self.clamped = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def append(self, sample, timestamp=None):
+        """
+        Appends one sample dict (missing / None fields -> NaN) at `timestamp`
+        (default: now), clamped so it is not older than the previous row.
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        with self._lock:
+            if timestamp < self._last:
+                timestamp = self._last
+                self.clamped += 1
+            self._last = timestamp
+            # NumPy stores None as NaN in float fields
+            self._data[self._count % self.capacity] = (timestamp, *map(sample.get, FIELDS))
+            self._count += 1
+
+    def clear(self):
+        with self._lock:
+            self._data[:] = np.nan
+            self._count = 0
+            self._last = -np.inf
+            self.clamped = 0
+
+    # --- Queries ---
+    def _segments(self):
+        """Physical (start, stop) ranges holding the rows, oldest first. Caller holds the lock."""
+        head = self._count % self.capacity
+        if self._count <= self.capacity:
+            return [(0, self._count)]
+        return [(head, self.capacity), (0, head)]
+
+    def query(self, since=None, until=None, fields=None, step=None, limit=None):
+        """
+        Rows with since <= timestamp <= until (either bound optional), oldest
+        first, as {"timestamp": float64 array, field: float32 array, ...}
+        for the requested `fields` (all by default).
+
+        step: bucket width in seconds; each bucket becomes one row holding
+        the NaN-ignoring mean of its samples, stamped with the bucket start.
+        limit: keep only the newest `limit` rows (after downsampling);
+        must be >= 0.
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be >= 0")
+        fields = list(FIELDS if fields is None else fields)
+        with self._lock:
+            parts = []
+            for start, stop in self._segments():
+                timestamps = self._data["timestamp"][start:stop]
+                lo = 0 if since is None else np.searchsorted(timestamps, since, side="left")
+                hi = len(timestamps) if until is None else np.searchsorted(timestamps, until, side="right")
+                if hi > lo:
+                    parts.append(self._data[["timestamp"] + fields][start + lo:start + hi])
+            rows = np.concatenate(parts) if parts else np.empty(0, dtype=self._data[["timestamp"] + fields].dtype)
+        # Multi-field selections are views; the copy above (concatenate) detaches from the ring
+
+        columns = {name: np.ascontiguousarray(rows[name]) for name in ["timestamp"] + fields}
+        if step and len(rows):
+            columns = _downsample(columns, fields, step)
+        if limit is not None:
+            columns = {name: values[-limit:] if limit else values[:0] for name, values in columns.items()}
+        return columns
+
+    def tail(self, n):
+        """The newest `n` rows as a list of dicts (the shape of the old deque history)."""
+        return to_records(self.query(limit=n))
+
+    def stats(self):
+        return {
+            "samples": len(self),
+            "appended": self._count,
+            "clamped": self.clamped,
+            "capacity": self.capacity,
+            "bytes": self.nbytes
+        }
+
+
+def _downsample(columns, fields, step):
+    buckets = np.floor(columns["timestamp"] / step)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    out = {"timestamp": buckets[starts] * step}
+    for field in fields:
+        values = columns[field].astype(np.float64)
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid, starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[field] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return out
+
+
+def to_records(columns):
+    """Columns -> list of row dicts; NaN becomes None (valid JSON)."""
+    names = list(columns)
+    if not names:
+        return []
+    lists = []
+    for name in names:
+        values = columns[name]
+        if name != "timestamp":
+            # float32 -> nearest short decimal, so 36.6 doesn't come out as 36.599998
+            values = np.round(values.astype(np.float64), 4)
+            nan = np.isnan(values)
+            if nan.any():
+                values = np.where(nan, None, values.astype(object))
+        lists.append(values.tolist())
+    return [dict(zip(names, row)) for row in zip(*lists)]
@@ -0,0 +1,87 @@
+"""
+Batched sensor ingest (POST /api/sensor_data/ingest/batch).
+
+The hardware bridge collects serial lines for a time / count window and
+uploads them in one request instead of one request per line:
+
+    {"device_id": "...", "lines": [[timestamp, "T:36.5, HR:72, ..."], ...]}
+
+device_id names the board the lines came from; its samples go to that
+device's SensorStore (sensors.acquisition), the default store only when it
+is missing. timestamp is when the bridge read the line (epoch seconds, or
+null for "now"); a bare string is accepted in place of a [timestamp, line] pair. The
+body may be gzip-compressed (Content-Encoding: gzip); decompression is
+capped so a small upload can't expand into a huge one.
+"""
+import time
+import zlib
+
+from serializers import loads
+from sensors.parser import parse_raw_sensor_string
+
+
+class IngestError(ValueError):
+    """Rejected batch; .status_code is the HTTP status to answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def decode_body(body, content_encoding=None, max_bytes=8 * 1024 * 1024):
+    """Raw request body -> bytes of JSON, gunzipped if needed (at most max_bytes)."""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        if len(body) > max_bytes:
+            raise IngestError(f"Body larger than {max_bytes} bytes", 413)
+        return body
+    if encoding != "gzip":
+        raise IngestError(f"Unsupported Content-Encoding: {content_encoding}", 415)
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, max_bytes)
+    except zlib.error as e:
+        raise IngestError(f"Invalid gzip body: {e}")
+    if decompressor.unconsumed_tail:
+        raise IngestError(f"Decompressed body larger than {max_bytes} bytes", 413)
+    return data
+
+
+MAX_DEVICE_ID_LENGTH = 128
+
+
+def parse_batch(data, max_lines=10000):
+    """
+    JSON batch -> (device_id, samples, timestamps, received). device_id is
+    None when the batch doesn't name one. Lines that don't parse are
+    skipped; they only count towards `received`.
+    """
+    try:
+        payload = loads(data)
+    except ValueError as e:
+        raise IngestError(f"Invalid JSON: {e}")
+    lines = payload.get("lines") if isinstance(payload, dict) else None
+    if not isinstance(lines, list):
+        raise IngestError('Expected {"lines": [[timestamp, line], ...]}')
+    if len(lines) > max_lines:
+        raise IngestError(f"Too many lines ({len(lines)} > {max_lines})", 413)
+    device_id = payload.get("device_id")
+    if device_id is not None and (not isinstance(device_id, str) or len(device_id) > MAX_DEVICE_ID_LENGTH):
+        raise IngestError(f"device_id must be a string of at most {MAX_DEVICE_ID_LENGTH} characters")
+
+    now = time.time()
+    samples = []
+    timestamps = []
+    for entry in lines:
+        if isinstance(entry, str):
+            timestamp, raw = None, entry
+        elif isinstance(entry, (list, tuple)) and len(entry) == 2 and isinstance(entry[1], str):
+            timestamp, raw = entry
+        else:
+            continue
+        parsed = parse_raw_sensor_string(raw)
+        if not parsed:
+            continue
+        samples.append(parsed)
+        timestamps.append(timestamp if isinstance(timestamp, (int, float)) else now)
+    return device_id or None, samples, timestamps, len(lines)
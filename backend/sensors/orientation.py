@@ -0,0 +1,211 @@
+"""
+IMU orientation filter for the head-mounted sensor.
+
+A complementary filter fuses the gyro (smooth and fast, but drifting) with
+the accelerometer's gravity direction (noisy, but absolute). It runs once
+per IMU sample in the ingest path (publish_samples), so request handlers
+only read the result that was published with the sensor snapshot.
+
+- Pitch / roll: gyro rates integrated through the Euler-rate equations,
+  pulled towards the accelerometer angles with time constant `tau`. The
+  weight depends on dt, so the result doesn't change with the sample rate.
+  Accelerometer correction is skipped while |a| is far from 1 g (the head
+  is accelerating, so "down" isn't gravity).
+- Yaw: integrated gyro z, bias-corrected. An accelerometer can't see
+  rotation about gravity and there is no magnetometer, so yaw is relative:
+  it decays back to 0 with time constant `yaw_recenter`, which also
+  absorbs residual drift. The driver faces forward most of the time.
+- Gyro bias is tracked while the sensor is still.
+
+Output angles keep the dashboard's convention: angle_x = pitch (positive
+"Up", same sign as the old atan2(ax, ...) estimate), angle_y = yaw,
+angle_z = roll.
+"""
+import math
+import time
+
+GYRO_SCALES = {"rad/s": 1.0, "deg/s": math.pi / 180}
+
+MAX_GAP = 1.0 # Seconds; longer gaps re-initialize pitch / roll from the accelerometer
+ACCEL_GATE = 0.25 # Accelerometer correction only while | |a| / g - 1 | is below this
+STILL_RATE = 0.05 # rad/s; below this (after bias) with |a| ~ g the sensor counts as still
+BIAS_TAU = 10.0 # Seconds; gyro bias learning time constant while still
+
+UP_THRESHOLD = 10
+DOWN_THRESHOLD = -10
+LEFT_THRESHOLD = -10
+RIGHT_THRESHOLD = 10
+
+
+def classify_head_position(angle_x, angle_y):
+    """Pitch / yaw (degrees) -> "Center", "Up", "Down-Left", ..."""
+    if angle_x > UP_THRESHOLD:
+        vertical = "Up"
+    elif angle_x < DOWN_THRESHOLD:
+        vertical = "Down"
+    else:
+        vertical = "Center"
+
+    if angle_y > RIGHT_THRESHOLD:
+        horizontal = "Right"
+    elif angle_y < LEFT_THRESHOLD:
+        horizontal = "Left"
+    else:
+        horizontal = "Center"
+
+    if vertical == "Center" and horizontal == "Center":
+        return "Center"
+    if horizontal == "Center":
+        return vertical
+    if vertical == "Center":
+        return horizontal
+    return f"{vertical}-{horizontal}"
+
+
+def spread_read_times(last, now, count, max_gap=MAX_GAP):
+    """
+    Read times for `count` samples that arrived together at `now`: evenly
+    spaced after the previous sample's time `last`, or all `now` when there
+    is none or the gap is longer than max_gap.
+    """
+    if last is None or not 0 < now - last <= max_gap:
+        return [now] * count
+    step = (now - last) / count
+    return [last + step * (i + 1) for i in range(count)]
+
+
+def _wrap(angle):
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class OrientationFilter:
+    """
+    Complementary filter state for one IMU. Angles are radians in the
+    aerospace convention (roll about x, pitch about y, yaw about z).
+    """
+
+    def __init__(self, tau=0.5, yaw_recenter=20.0, gyro_units="rad/s"):
+        self.tau = tau
+        self.yaw_recenter = yaw_recenter
+        self.gyro_scale = GYRO_SCALES[gyro_units]
+        self.roll = 0.0
+        self.pitch = 0.0
+        self.yaw = 0.0
+        self.bias = [0.0, 0.0, 0.0]
+        self.gravity = None # Running |a| at rest, in whatever unit the firmware sends
+        self.samples = 0
+        self._last_time = None
+        self._last_tick = None
+
+    def update(self, ax, ay, az, gx=None, gy=None, gz=None, dt=None):
+        """
+        One IMU sample. dt: seconds since the previous one (None: first
+        sample or after a gap; pitch / roll restart from the accelerometer).
+        """
+        norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if norm == 0:
+            return
+        roll_acc = math.atan2(ay, az)
+        pitch_acc = math.atan2(-ax, math.sqrt(ay * ay + az * az))
+        self.samples += 1
+
+        if self.gravity is None or dt is None or dt > MAX_GAP:
+            self.roll, self.pitch = roll_acc, pitch_acc
+            if self.gravity is None:
+                self.gravity = norm
+            return
+        if dt <= 0:
+            return
+
+        accel_ok = abs(norm / self.gravity - 1) < ACCEL_GATE
+        alpha = self.tau / (self.tau + dt) # Gyro weight
+
+        if gx is None or gy is None or gz is None:
+            # Accelerometer only: plain low-pass towards the gravity angles
+            if accel_ok:
+                self.roll = _wrap(self.roll + (1 - alpha) * _wrap(roll_acc - self.roll))
+                self.pitch += (1 - alpha) * (pitch_acc - self.pitch)
+            return
+
+        scale = self.gyro_scale
+        p = gx * scale - self.bias[0]
+        q = gy * scale - self.bias[1]
+        r = gz * scale - self.bias[2]
+
+        still = accel_ok and abs(norm / self.gravity - 1) < 0.05 and math.sqrt(p * p + q * q + r * r) < STILL_RATE
+        if still:
+            k = min(1.0, dt / BIAS_TAU)
+            self.bias[0] += k * p
+            self.bias[1] += k * q
+            self.bias[2] += k * r
+            self.gravity += k * (norm - self.gravity)
+
+        # Body rates -> Euler angle rates
+        sin_r, cos_r = math.sin(self.roll), math.cos(self.roll)
+        cos_p = max(math.cos(self.pitch), 1e-3) # Avoid the singularity at +-90 deg pitch
+        tan_p = math.sin(self.pitch) / cos_p
+        roll = self.roll + (p + (q * sin_r + r * cos_r) * tan_p) * dt
+        pitch = self.pitch + (q * cos_r - r * sin_r) * dt
+        yaw = self.yaw + (q * sin_r + r * cos_r) / cos_p * dt
+
+        if accel_ok:
+            roll = roll + (1 - alpha) * _wrap(roll_acc - roll)
+            pitch = pitch + (1 - alpha) * (pitch_acc - pitch)
+        self.roll = _wrap(roll)
+        self.pitch = max(-math.pi / 2, min(math.pi / 2, pitch))
+        yaw = _wrap(yaw)
+        if self.yaw_recenter:
+            yaw -= yaw * min(1.0, dt / self.yaw_recenter)
+        self.yaw = yaw
+
+    def update_sample(self, sample, read_at):
+        """
+        Feeds one sample dict (ax..az, optional gx..gz / "tick") read at
+        `read_at` (epoch seconds). dt comes from the device tick (binary
+        protocol, ms) when present, else from the read times.
+        Returns False if the sample carried no accelerometer data.
+        """
+        ax, ay, az = sample.get("ax"), sample.get("ay"), sample.get("az")
+        if ax is None or ay is None or az is None:
+            return False
+
+        dt = None
+        tick = sample.get("tick")
+        if tick is not None and self._last_tick is not None:
+            dt = ((int(tick) - self._last_tick) & 0xFFFFFFFF) / 1000.0
+        elif self._last_time is not None:
+            dt = read_at - self._last_time
+        self._last_tick = int(tick) if tick is not None else None
+        self._last_time = read_at
+
+        self.update(ax, ay, az, sample.get("gx"), sample.get("gy"), sample.get("gz"), dt)
+        return True
+
+    def update_batch(self, samples, read_times=None, now=None):
+        """
+        update_sample() for each sample; True if any of them had IMU data.
+        Without read_times (bulk serial reads: one arrival time per chunk)
+        the samples are spread evenly between the previous sample and `now`.
+        """
+        if read_times is None:
+            read_times = spread_read_times(self._last_time, time.time() if now is None else now, len(samples))
+        updated = False
+        for sample, read_at in zip(samples, read_times):
+            updated = self.update_sample(sample, read_at) or updated
+        return updated
+
+    def angles(self):
+        """(angle_x, angle_y, angle_z) in degrees: pitch (Up positive), yaw, roll."""
+        return -math.degrees(self.pitch), math.degrees(self.yaw), math.degrees(self.roll)
+
+    def head_position(self, timestamp):
+        """The /head_position payload for the current orientation."""
+        angle_x, angle_y, angle_z = self.angles()
+        return {
+            "position": classify_head_position(angle_x, angle_y),
+            "angle_x": round(angle_x, 2),
+            "angle_y": round(angle_y, 2),
+            "angle_z": round(angle_z, 2),
+            "timestamp": timestamp,
+            "source": "Sensor"
+        }
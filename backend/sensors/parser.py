@@ -0,0 +1,167 @@
+"""
+Parser for the Arduino text protocol ("T:36.5, HR:72, SpO2:98, Ax:0.1, ...").
+
+Keys are case-insensitive and mapped through one alias table (t ->
+temperature, bpm -> hr, sp02 -> spo2, ...). The firmware always prints the
+same keys in the same order, so the first line that parses cleanly (or a
+later clean line with more keys, if that one was cut short) is compiled
+into a regex for that exact layout; later lines are matched in one
+call and converted with float(), falling back to the general key-by-key
+path for anything that does not fit (other firmware, missing fields, bad
+values).
+
+parse_sensor_lines() parses many lines into one columnar NumPy array.
+
+"IBI" (beat-to-beat interval, ms) and "PPG" (raw pulse signal) keys, for
+the HRV statistics in sensors.cardio, are parsed into the sample dict but
+are not columns of that array.
+"""
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Output fields, in column order
+FIELDS = ("temperature", "hr", "spo2", "ax", "ay", "az", "gx", "gy", "gz")
+
+# Lowercased key -> field
+FIELD_ALIASES = {
+    "t": "temperature", "temperature": "temperature",
+    "hr": "hr", "bpm": "hr", "heart_rate": "hr",
+    "spo2": "spo2", "sp02": "spo2",
+    **{axis: axis for axis in ("ax", "ay", "az", "gx", "gy", "gz")},
+    # Heartbeat data for sensors.cardio (not history columns): beat interval in ms, raw pulse signal
+    "ibi": "ibi", "rr": "ibi", "ppg": "ppg"
+}
+
+# One row per line; NaN where a field was missing or invalid
+SAMPLE_DTYPE = np.dtype([(field, "f8") for field in FIELDS])
+
+
+def _parse_general(raw):
+    """Key-by-key parse. Returns (fields dict, keys in order as written, clean)."""
+    parsed = {}
+    keys = []
+    clean = True
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key, sep, value = part.partition(":")
+        field = FIELD_ALIASES.get(key.lower()) if sep else None
+        if field is None:
+            clean = False
+            continue
+        try:
+            parsed[field] = float(value)
+        except ValueError:
+            logger.debug(f"Failed to parse sensor value: {key}={value}")
+            clean = False
+            continue
+        keys.append(key)
+    return parsed, keys, clean
+
+
+def _compile_layout(keys):
+    """Regex matching exactly `keys` in order, capturing each value."""
+    body = r",\s*".join(re.escape(key) + r":([^,]*)" for key in keys)
+    return re.compile(r"\s*" + body + r",?\s*")
+
+
+class SensorLineParser:
+    """Sensor line parser with a learned fast path for the firmware's fixed layout."""
+
+    def __init__(self):
+        self._layout = None # (compiled regex, fields in capture order)
+        self.fast = 0
+        self.slow = 0
+
+    def parse(self, raw):
+        """Line -> {field: float}. Unknown keys and unparsable values are skipped."""
+        layout = self._layout
+        if layout is not None:
+            match = layout[0].fullmatch(raw)
+            if match is not None:
+                try:
+                    values = [float(v) for v in match.groups()]
+                except ValueError:
+                    pass
+                else:
+                    self.fast += 1
+                    return dict(zip(layout[1], values))
+
+        self.slow += 1
+        parsed, keys, clean = _parse_general(raw)
+        if clean and keys and (layout is None or len(keys) > len(layout[1])) \
+                and any(FIELD_ALIASES[key.lower()] in FIELDS for key in keys):
+            # Not from a line carrying only a beat interval: the next sample line is the layout.
+            # A longer clean line replaces a layout learned from a truncated one (port opened mid-line).
+            self._learn(keys)
+        return parsed
+
+    def _learn(self, keys):
+        fields = tuple(FIELD_ALIASES[key.lower()] for key in keys)
+        self._layout = (_compile_layout(keys), fields)
+        logger.debug(f"Sensor line layout: {', '.join(keys)}")
+
+    def parse_lines(self, lines):
+        """
+        Lines -> SAMPLE_DTYPE structured array, one row per line (NaN where
+        a field is absent; rows of unparsable lines are all NaN). Until a
+        layout is learned lines go through parse() one by one; after that,
+        lines in the layout are converted in one pass straight into the columns.
+        """
+        out = np.full(len(lines), np.nan, dtype=SAMPLE_DTYPE)
+        start = 0
+        while self._layout is None and start < len(lines):
+            # Partial or noisy lines (just after opening a port) don't block the rest
+            _fill_row(out, start, self.parse(lines[start]))
+            start += 1
+
+        rows = []
+        values = []
+        layout = self._layout
+        if layout is not None:
+            pattern, fields = layout
+            for i in range(start, len(lines)):
+                match = pattern.fullmatch(lines[i])
+                if match is None:
+                    _fill_row(out, i, self.parse(lines[i]))
+                    continue
+                rows.append(i)
+                values.extend(match.groups())
+
+        if rows:
+            try:
+                matrix = np.fromiter(map(float, values), np.float64, len(values)).reshape(len(rows), len(fields))
+            except ValueError:
+                # A bad value somewhere: convert row by row so only that row loses the field
+                for i in rows:
+                    _fill_row(out, i, self.parse(lines[i]))
+            else:
+                self.fast += len(rows)
+                for column, field in enumerate(fields):
+                    if field in SAMPLE_DTYPE.fields:
+                        out[field][rows] = matrix[:, column]
+        return out
+
+
+def _fill_row(out, i, row):
+    for field, value in row.items():
+        if field in SAMPLE_DTYPE.fields:
+            out[field][i] = value
+
+
+default_parser = SensorLineParser()
+
+
+def parse_raw_sensor_string(raw: str):
+    """Parse comma-separated sensor data string into dictionary"""
+    return default_parser.parse(raw)
+
+
+def parse_sensor_lines(lines):
+    """Many lines -> columnar SAMPLE_DTYPE array (see SensorLineParser.parse_lines)."""
+    return default_parser.parse_lines(lines)
@@ -0,0 +1,207 @@
+"""
+Deterministic sensor replay from the CSV datasets.
+
+ReplaySource streams the sensor columns of a recorded CSV
+(fatigue_dataset.csv, nthu_converted.csv, logs/fatigue_debug.csv, or any
+file with the same column names) into the normal ingest path (a
+SensorStore's publish) or into a virtual serial port, on the recording's
+own timing:
+
+    speed 1      real time (the CSV's timestamp deltas)
+    speed N      N times faster
+    speed None   as fast as the consumer takes it ("max")
+
+Rows without usable timing (nthu_converted.csv has timestamp 0 throughout,
+and gaps or clock jumps longer than MAX_GAP) advance at `rate` Hz. The same
+file, speed and rate always produce the same sample sequence and schedule,
+which gives repeatable load and latency runs without hardware.
+
+A source is selected with a spec string, usable anywhere a port name is:
+
+    replay:<dataset or path>[@<speed>]     e.g. replay:fatigue_dataset.csv@10x, replay:nthu@max
+
+(ARDUINO_PORT for the single-port reader, SENSOR_PORTS entries in
+multi-seat mode, or POST /api/sessions/{id}/replay.)
+
+    python -m sensors.replay [dataset] [speed] [text|binary]   (from backend/)
+        Plays the dataset through a virtual serial port (like
+        python -m sensors.virtual_port); point ARDUINO_PORT at the printed
+        port.
+
+Ingest throughput and schedule lag: python -m bench.replay [dataset] [speed].
+"""
+import bisect
+import csv
+import math
+import os
+import time
+
+from sensors.parser import FIELD_ALIASES
+
+REPLAY_PREFIX = "replay:"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Short names for the bundled recordings (paths relative to backend/)
+DATASETS = {
+    "fatigue_dataset": "fatigue_dataset.csv",
+    "nthu": "nthu_converted.csv",
+    "fatigue_debug": os.path.join("logs", "fatigue_debug.csv")
+}
+
+# CSV header (lowercased) -> sensor field; the serial aliases plus the debug log's names
+CSV_ALIASES = {**FIELD_ALIASES, "temp": "temperature", "acc_x": "ax", "acc_y": "ay", "acc_z": "az"}
+
+MAX_GAP = 5.0 # Seconds; longer (or negative) timestamp steps advance at the nominal rate instead
+
+
+def resolve_dataset(name):
+    """Dataset short name, bundled file name or path -> absolute path. Raises FileNotFoundError."""
+    relative = DATASETS.get(name) or DATASETS.get(os.path.splitext(os.path.basename(name))[0]) or name
+    path = relative if os.path.isabs(relative) else os.path.join(BASE_DIR, relative)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Replay dataset not found: {name}")
+    return path
+
+
+def parse_speed(value):
+    """"10x" / "10" / "1" -> 10.0 / 10.0 / 1.0; "max", "0" or "inf" -> None (no pacing)."""
+    if value is None or value == "":
+        return 1.0
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("max", "inf"):
+            return None
+        value = value.rstrip("x")
+    speed = float(value)
+    return speed if speed > 0 and math.isfinite(speed) else None
+
+
+def load_csv(path, rate=10.0):
+    """
+    CSV -> (offsets, samples): seconds since the first row (the replay
+    schedule) and one sample dict per row with the sensor fields it has.
+    """
+    samples = []
+    times = []
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        columns = [(i, CSV_ALIASES[name]) for i, name in enumerate(header) if name in CSV_ALIASES]
+        time_column = header.index("timestamp") if "timestamp" in header else None
+        for row in reader:
+            sample = {}
+            for i, field in columns:
+                try:
+                    value = float(row[i])
+                except (ValueError, IndexError):
+                    continue
+                if math.isfinite(value):
+                    sample[field] = value
+            if not sample:
+                continue
+            samples.append(sample)
+            try:
+                times.append(float(row[time_column]) if time_column is not None else None)
+            except (ValueError, IndexError):
+                times.append(None)
+
+    offsets = []
+    offset = 0.0
+    for i, t in enumerate(times):
+        if i:
+            previous = times[i - 1]
+            step = t - previous if t is not None and previous is not None else None
+            offset += step if step is not None and 0 < step <= MAX_GAP else 1.0 / rate
+        offsets.append(offset)
+    return offsets, samples
+
+
+class ReplaySource:
+    """A loaded dataset plus its pacing. run() streams it; .stats describes the last run."""
+
+    def __init__(self, dataset, speed=1.0, rate=10.0, loop=False):
+        self.path = resolve_dataset(dataset)
+        self.name = os.path.basename(self.path)
+        self.speed = speed
+        self.rate = rate
+        self.loop = loop
+        self.offsets, self.samples = load_csv(self.path, rate)
+        self.duration = self.offsets[-1] + 1.0 / rate if self.offsets else 0.0
+        self.stats = {"samples": 0, "batches": 0, "loops": 0, "max_lag_ms": 0.0}
+
+    @classmethod
+    def from_spec(cls, spec, loop=True):
+        """"replay:<dataset>[@<speed>]" -> ReplaySource (looping by default, like a live board)."""
+        body = spec[len(REPLAY_PREFIX):] if spec.startswith(REPLAY_PREFIX) else spec
+        dataset, _, speed = body.partition("@")
+        return cls(dataset, parse_speed(speed), loop=loop)
+
+    def run(self, emit, stop=None, max_batch=256):
+        """
+        Calls emit(samples) with every sample that is due (oldest first; at
+        most max_batch per call) until the dataset ends (or forever with
+        loop) or `stop` is set. Returns the number of samples emitted.
+        """
+        n = len(self.samples)
+        stats = self.stats = {"samples": 0, "batches": 0, "loops": 0, "max_lag_ms": 0.0}
+        if n == 0:
+            return 0
+        while stop is None or not stop.is_set():
+            start = time.perf_counter()
+            i = 0
+            while i < n:
+                if stop is not None and stop.is_set():
+                    return stats["samples"]
+                if self.speed is None:
+                    j = min(n, i + max_batch)
+                else:
+                    position = (time.perf_counter() - start) * self.speed
+                    j = bisect.bisect_right(self.offsets, position, i, min(n, i + max_batch))
+                    if j == i:
+                        wait = min((self.offsets[i] - position) / self.speed, 0.1)
+                        if stop is not None:
+                            stop.wait(wait)
+                        else:
+                            time.sleep(wait)
+                        continue
+                    # Lag of the oldest sample in the batch behind its schedule
+                    lag = position - self.offsets[i]
+                    stats["max_lag_ms"] = max(stats["max_lag_ms"], 1000 * lag / self.speed)
+                emit(self.samples[i:j])
+                stats["samples"] += j - i
+                stats["batches"] += 1
+                i = j
+            stats["loops"] += 1
+            if not self.loop:
+                break
+        return stats["samples"]
+
+    def info(self):
+        return {
+            "dataset": self.name,
+            "speed": self.speed if self.speed is not None else "max",
+            "samples": len(self.samples),
+            "duration": round(self.duration, 3),
+            "loop": self.loop,
+            **self.stats
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    import threading
+
+    from sensors.virtual_port import VirtualSerialPort
+
+    args = sys.argv[1:]
+    dataset = args[0] if args else "fatigue_dataset"
+    speed = parse_speed(args[1] if len(args) > 1 else "1")
+    protocol = args[2] if len(args) > 2 else "text"
+    source = ReplaySource(dataset, speed, loop=True)
+    with VirtualSerialPort(protocol, rate=source.rate) as device:
+        print(f"Replaying {source.name} ({len(source.samples)} samples, {speed or 'max'}x) as a {protocol} Arduino at {device.port}. Ctrl+C to stop.")
+        stop = threading.Event()
+        try:
+            source.run(lambda samples: [device.write_sample(sample) for sample in samples], stop)
+        except KeyboardInterrupt:
+            stop.set()
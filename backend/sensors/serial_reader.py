@@ -3,6 +3,7 @@ Serial communication module for reading sensor data from Arduino.
 Handles connection, data parsing, and thread-safe state management.
 """
 import logging
+import os
 import serial
 import serial.tools.list_ports
 import threading
@@ -10,25 +11,33 @@ import time
 import math
 import traceback
 import random
-from collections import deque
+
+import numpy as np
 
 from config import get_config
+from sensors.framing import LineFramer, BinaryFramer, SAMPLE_STRUCT, FRAME_FIELDS, decode_frames, detect_protocol
+from sensors.parser import parse_raw_sensor_string
+from sensors.orientation import classify_head_position
+from sensors.store import SensorStore
+from sensors.replay import REPLAY_PREFIX, ReplaySource
 
 logger = logging.getLogger(__name__)
 config = get_config()
 
 # --- Global State ---
-sensor_lock = threading.Lock()
-
-latest_sensor_data = {
-    "temperature": None,
-    "ax": None, "ay": None, "az": None,
-    "gx": None, "gy": None, "gz": None,
-    "hr": None, "spo2": None,
-    "timestamp": None
-}
+# The single-port reader and the ingest endpoints write to the default store
+# (multi-port acquisition keeps one store per device, see sensors.acquisition)
+default_store = SensorStore("default")
 
-sensor_data_history = deque(maxlen=config.MAX_HISTORY)
+# Latest values: readers use sensor_state.current (lock-free, see sensors.state)
+sensor_state = default_store.state
+# Held by writers only (publish + history append stay in order)
+sensor_lock = default_store.lock
+sensor_data_history = default_store.history
+# Bumped with every published snapshot (see snapshot_cache)
+sensor_version = default_store.version
+# Fused head orientation, updated per IMU sample by publish_samples (under sensor_lock)
+orientation_filter = default_store.orientation
 
 head_position_data = {
     "position": "Center",
@@ -52,29 +61,6 @@ def generate_mock_sensor_data():
         "timestamp": int(time.time())
     }
 
-def parse_raw_sensor_string(raw: str):
-    """Parse comma-separated sensor data string into dictionary"""
-    parts = [p.strip() for p in raw.split(',') if p.strip()]
-    parsed = {}
-    for p in parts:
-        if ':' not in p:
-            continue
-        k, v = p.split(':', 1)
-        k, v = k.lower(), v.strip()
-        try:
-            if k in ("t", "temperature"):
-                parsed["temperature"] = float(v)
-            elif k in ("hr", "bpm", "heart_rate"):
-                parsed["hr"] = float(v)
-            elif k in ("spo2", "sp02"):
-                parsed["spo2"] = float(v)
-            elif k in ("ax", "ay", "az", "gx", "gy", "gz"):
-                parsed[k] = float(v)
-        except ValueError:
-            logger.debug(f"Failed to parse sensor value: {k}={v}")
-            continue
-    return parsed
-
 
 def find_arduino_port():
     """Auto-detect Arduino port, with fallback to configured port"""
@@ -82,8 +68,8 @@ def find_arduino_port():
         ports = [p.device for p in serial.tools.list_ports.comports()]
         logger.debug(f"Available ports: {ports}")
         
-        # Try configured port first
-        if config.ARDUINO_PORT in ports:
+        # Try configured port first (also device paths list_ports doesn't enumerate, e.g. a pty)
+        if config.ARDUINO_PORT in ports or (config.ARDUINO_PORT.startswith("/dev/") and os.path.exists(config.ARDUINO_PORT)):
             logger.info(f"Using configured port: {config.ARDUINO_PORT}")
             return config.ARDUINO_PORT
         
@@ -107,7 +93,11 @@ def find_arduino_port():
         return config.ARDUINO_PORT
 
 def calculate_head_position(ax, ay, az):
-    """Calculate head position angles from accelerometer values"""
+    """
+    Head position angles from a single accelerometer sample (no gyro, no
+    smoothing). The sensor path publishes the fused orientation instead
+    (sensors.orientation); this stays for one-off estimates.
+    """
     try:
         # PITCH (Up/Down) - Rotation around X-axis
         angle_x = math.degrees(math.atan2(ax, math.sqrt(ay**2 + az**2)))
@@ -118,59 +108,151 @@ def calculate_head_position(ax, ay, az):
         # ROLL (Tilt Left/Right) - Rotation around Z-axis
         angle_z = math.degrees(math.atan2(ay, az))
 
-        UP_THRESHOLD = 10
-        DOWN_THRESHOLD = -10
-        LEFT_THRESHOLD = -10
-        RIGHT_THRESHOLD = 10
+        return classify_head_position(angle_x, angle_y), angle_x, angle_y, angle_z
 
-        if angle_x > UP_THRESHOLD:
-            vertical = "Up"
-        elif angle_x < DOWN_THRESHOLD:
-            vertical = "Down"
-        else:
-            vertical = "Center"
+    except Exception as e:
+        logger.error(f"Head position calculation error: {e}", exc_info=True)
+        return "Unknown", 0.0, 0.0, 0.0
 
-        if angle_y > RIGHT_THRESHOLD:
-            horizontal = "Right"
-        elif angle_y < LEFT_THRESHOLD:
-            horizontal = "Left"
-        else:
-            horizontal = "Center"
+def update_head_position_data():
+    """Updates the global head_position_data from the published (fused) orientation."""
+    head_position = sensor_state.current.head_position
+    if head_position is None:
+        return head_position_data # Return existing or update to unknown?
+
+    head_position_data.update({key: head_position[key] for key in ("position", "angle_x", "angle_y", "angle_z", "timestamp")})
+    return head_position_data
+
+def publish_samples(samples, timestamps=None):
+    """Applies parsed samples to the default store (see SensorStore.publish)."""
+    default_store.publish(samples, timestamps)
+
+def read_lines_legacy(ser, publish=publish_samples, stop=None):
+    """Original loop: poll in_waiting every 10 ms, one readline() + print per line."""
+    while stop is None or not stop.is_set():
+        if ser.in_waiting > 0:
+            line = ser.readline().decode('utf-8', errors='ignore').strip()
+            if not line:
+                continue
+            
+            logger.debug(f"Raw data from Arduino: {line}")
+            print(f"arduino_data: {line}") # Explicit print for console visibility
             
-        if vertical == "Center" and horizontal == "Center":
-            position = "Center"
-        elif vertical != "Center" and horizontal == "Center":
-            position = vertical
-        elif horizontal != "Center" and vertical == "Center":
-            position = horizontal
+            parsed = parse_raw_sensor_string(line)
+            if not parsed:
+                continue
+
+            publish([parsed])
+        
+        # Prevent CPU hogging
+        time.sleep(0.01)
+
+# Consecutive undecodable lines / frames (with nothing decoded in between)
+# after which an auto-detected port goes back to protocol detection
+REDETECT_FAILURES = 50
+
+def _text_samples(framer, chunk):
+    """Chunk -> (samples, lines or garbage runs that didn't parse)."""
+    samples = []
+    failed = 0
+    dropped = framer.dropped
+    for raw in framer.feed(chunk):
+        line = raw.decode('utf-8', errors='ignore').strip()
+        if not line:
+            continue
+        if config.SERIAL_ECHO:
+            print(f"arduino_data: {line}")
+        parsed = parse_raw_sensor_string(line)
+        if parsed:
+            samples.append(parsed)
         else:
-            position = f"{vertical}-{horizontal}"
+            failed += 1
+    if framer.dropped != dropped:
+        failed += 1
+    return samples, failed
 
-        return position, angle_x, angle_y, angle_z
+def _binary_samples(framer, chunk):
+    """Chunk -> (samples, frames rejected for CRC or format)."""
+    errors = framer.crc_errors + framer.bad_frames
+    payloads = framer.feed(chunk)
+    failed = framer.crc_errors + framer.bad_frames - errors
+    if not payloads:
+        return [], failed
+    # float32 on the wire; rounded so 0.1 doesn't come out as 0.10000000149
+    if len(payloads) < 8:
+        # A few frames per read (the usual case): struct beats NumPy's per-call overhead
+        records = [
+            (record[1], [round(v, 4) for v in record[2:]])
+            for record in SAMPLE_STRUCT.iter_unpack(b"".join(payloads))
+        ]
+    else:
+        frames = decode_frames(payloads)
+        values = np.round(np.stack([frames[field] for field in FRAME_FIELDS], axis=1).astype(np.float64), 4)
+        records = zip(frames["tick"].tolist(), values.tolist())
 
-    except Exception as e:
-        logger.error(f"Head position calculation error: {e}", exc_info=True)
-        return "Unknown", 0.0, 0.0, 0.0
+    samples = []
+    for tick, row in records:
+        # NaN = field not fitted / not measured on this device
+        sample = {field: value for field, value in zip(FRAME_FIELDS, row) if value == value}
+        sample["tick"] = tick
+        if config.SERIAL_ECHO:
+            print(f"arduino_data: {sample}")
+        samples.append(sample)
+    return samples, failed
 
-def update_head_position_data():
-    """Updates the global head_position_data based on latest sensor values."""
-    ax = latest_sensor_data["ax"]
-    ay = latest_sensor_data["ay"]
-    az = latest_sensor_data["az"]
+def read_bulk(ser, publish=publish_samples, stop=None, protocol=None):
+    """
+    Blocking bulk reads: wait (up to the port timeout) for the first byte,
+    take everything the driver has buffered, split it into frames and
+    publish the batch with one lock hold. No polling sleep, so latency is
+    the driver's, and the per-read cost is shared by every frame in it.
 
-    if ax is None or ay is None or az is None:
-        return head_position_data # Return existing or update to unknown?
+    protocol: "text", "binary" or "auto" (default: config.SERIAL_PROTOCOL).
+    With "auto" the first bytes are buffered until detect_protocol()
+    recognizes one, then decoded with it; after REDETECT_FAILURES
+    undecodable lines / frames in a row, detection starts over.
+    """
+    protocol = protocol or config.SERIAL_PROTOCOL
+    pending = bytearray()
+    decode = framer = None
+    failures = 0
+    while stop is None or not stop.is_set():
+        chunk = ser.read(ser.in_waiting or 1)
+        if not chunk:
+            continue
+        waiting = ser.in_waiting
+        if waiting:
+            # The blocking read returned on the first byte; take the rest of the burst too
+            chunk += ser.read(waiting)
 
-    pos, ang_x, ang_y, ang_z = calculate_head_position(ax, ay, az)
+        if decode is None:
+            pending += chunk
+            detected = protocol if protocol != "auto" else detect_protocol(pending)
+            if detected is None:
+                if len(pending) > 4096:
+                    # Still undecided (noise, or a link that isn't a sensor board): keep only the tail
+                    del pending[:-512]
+                continue
+            logger.info(f"Serial protocol: {detected}")
+            if detected == "binary":
+                decode, framer = _binary_samples, BinaryFramer()
+            else:
+                decode, framer = _text_samples, LineFramer()
+            chunk, pending = bytes(pending), None
+            failures = 0
 
-    head_position_data.update({
-        "position": pos,
-        "angle_x": round(ang_x, 2),
-        "angle_y": round(ang_y, 2),
-        "angle_z": round(ang_z, 2),
-        "timestamp": int(time.time())
-    })
-    return head_position_data
+        samples, failed = decode(framer, chunk)
+        failures = 0 if samples else failures + failed
+        if protocol == "auto" and failures >= REDETECT_FAILURES:
+            logger.warning(f"Serial protocol: {failures} undecodable frames in a row, detecting again")
+            decode = framer = None
+            pending = bytearray()
+            continue
+        publish(samples)
+
+def read_lines_bulk(ser, publish=publish_samples, stop=None):
+    """Bulk reader for the text protocol (see read_bulk)."""
+    read_bulk(ser, publish, stop, protocol="text")
 
 def serial_reader():
     """Main serial reading loop with auto-reconnect and fallback to mock data"""
@@ -179,6 +261,17 @@ def serial_reader():
     using_mock_data = False
     MAX_CONNECTION_ATTEMPTS = 5
 
+    if config.ARDUINO_PORT.startswith(REPLAY_PREFIX):
+        # ARDUINO_PORT=replay:<dataset>[@speed]: a recorded dataset instead of the board
+        try:
+            source = ReplaySource.from_spec(config.ARDUINO_PORT)
+        except (OSError, ValueError) as e:
+            logger.error(f"[ERROR] Invalid replay source {config.ARDUINO_PORT}: {e}")
+            return
+        logger.info(f"Replaying {source.name} ({len(source.samples)} samples, speed {source.speed or 'max'})")
+        source.run(publish_samples)
+        return
+
     while True:
         # Auto-detect port on each reconnection attempt
         port = find_arduino_port()
@@ -196,10 +289,7 @@ def serial_reader():
         # Use mock data mode
         if using_mock_data and config.USE_MOCK_DATA:
             try:
-                mock_data = generate_mock_sensor_data()
-                with sensor_lock:
-                    latest_sensor_data.update(mock_data)
-                    sensor_data_history.append(latest_sensor_data.copy())
+                publish_samples([generate_mock_sensor_data()])
                 time.sleep(1)  # Poll at 1Hz for mock data
                 continue
             except Exception as e:
@@ -218,26 +308,10 @@ def serial_reader():
             time.sleep(2)  # Stabilize
             
             # Reading Loop
-            while True:
-                if ser.in_waiting > 0:
-                    line = ser.readline().decode('utf-8', errors='ignore').strip()
-                    if not line:
-                        continue
-                    
-                    logger.debug(f"Raw data from Arduino: {line}")
-                    print(f"arduino_data: {line}") # Explicit print for console visibility
-                    
-                    parsed = parse_raw_sensor_string(line)
-                    if not parsed:
-                        continue
-
-                    timestamp = int(time.time())
-                    with sensor_lock:
-                        latest_sensor_data.update({**parsed, "timestamp": timestamp})
-                        sensor_data_history.append(latest_sensor_data.copy())
-                
-                # Prevent CPU hogging
-                time.sleep(0.01)
+            if config.SERIAL_READ_MODE == "line":
+                read_lines_legacy(ser)
+            else:
+                read_bulk(ser)
 
         except (serial.SerialException, PermissionError) as e:
             connection_attempts += 1
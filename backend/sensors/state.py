@@ -0,0 +1,85 @@
+"""
+Latest sensor values as an immutable, atomically swapped snapshot.
+
+Writers (serial reader, ingest endpoints) build a new dict and publish it
+as a SensorSnapshot with the next sequence number. Publishing is a single
+reference assignment, so readers just take `state.current` and use it: no
+lock, no copy, and a consistent view of every field (ax/ay/az always come
+from the same write). Readers never block the event loop, and a
+high-rate writer never waits for a dashboard.
+
+A published snapshot's dict is shared by every reader: never modify it.
+"""
+import threading
+import time
+
+from snapshot_cache import VersionCounter
+
+
+class SensorSnapshot:
+    """
+    One published sensor state: .data (read-only by convention), .seq,
+    .published_at, .head_position (the fused IMU orientation payload, None
+    until IMU data arrived) and .cardio (heart rate / HRV statistics, see
+    sensors.cardio; None until HR data arrived).
+    """
+    __slots__ = ("data", "seq", "published_at", "head_position", "cardio")
+
+    def __init__(self, data, seq, published_at=None, head_position=None, cardio=None):
+        self.data = data
+        self.seq = seq
+        self.published_at = published_at
+        self.head_position = head_position
+        self.cardio = cardio
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def is_active(self, now, timeout):
+        """True if the last write is younger than `timeout` seconds and carried IMU data."""
+        timestamp = self.data.get("timestamp")
+        return timestamp is not None and (now - timestamp < timeout) and self.data.get("ax") is not None
+
+
+class SensorState:
+    """
+    Holder of the current SensorSnapshot. Writers serialize on .lock (so two
+    concurrent updates can't lose each other's fields); readers never take it.
+    .version is bumped with every publish and matches current.seq.
+    """
+
+    def __init__(self, initial):
+        self.lock = threading.Lock()
+        self.version = VersionCounter()
+        self._current = SensorSnapshot(dict(initial), self.version.value)
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def seq(self):
+        return self._current.seq
+
+    def publish(self, data, head_position=None, cardio=None):
+        """
+        Swaps in `data` (a new dict, not modified afterwards) as the current
+        snapshot. head_position / cardio None keep the previous ones. Caller
+        holds .lock.
+        """
+        current = self._current
+        if head_position is None:
+            head_position = current.head_position
+        if cardio is None:
+            cardio = current.cardio
+        snapshot = SensorSnapshot(data, self.version.bump(), time.time(), head_position, cardio)
+        self._current = snapshot
+        return snapshot
+
+    def update(self, fields):
+        """Publishes the current values merged with `fields`."""
+        with self.lock:
+            return self.publish({**self._current.data, **fields})
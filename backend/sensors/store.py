@@ -0,0 +1,95 @@
+"""
+Per-device sensor store: latest-value snapshot, history ring buffer,
+orientation filter and heart rate / HRV windows for one IMU / vitals board.
+
+The single-port reader writes to the module-level default store in
+sensors.serial_reader; the multi-port acquisition manager
+(sensors.acquisition) creates one store per attached device.
+"""
+import time
+
+from config import get_config
+from sensors.cardio import CardioMonitor
+from sensors.history import SensorHistory
+from sensors.orientation import OrientationFilter
+from sensors.parser import FIELDS
+from sensors.state import SensorState
+
+config = get_config()
+
+EMPTY_SAMPLE = {
+    "temperature": None,
+    "ax": None, "ay": None, "az": None,
+    "gx": None, "gy": None, "gz": None,
+    "hr": None, "spo2": None,
+    "timestamp": None
+}
+
+
+class SensorStore:
+    def __init__(self, device_id, history_capacity=None):
+        self.device_id = device_id
+        # Latest values: readers use .state.current (lock-free, see sensors.state)
+        self.state = SensorState(EMPTY_SAMPLE)
+        # Held by writers only (publish + history append stay in order)
+        self.lock = self.state.lock
+        self.history = SensorHistory(history_capacity or config.SENSOR_HISTORY_CAPACITY)
+        # Fused head orientation, updated per IMU sample (under .lock)
+        self.orientation = OrientationFilter(config.IMU_FILTER_TAU, config.IMU_YAW_RECENTER, config.IMU_GYRO_UNITS)
+        # Streaming HR / HRV statistics from beat intervals, raw PPG or HR readings (under .lock)
+        self.cardio = CardioMonitor(config.CARDIO_WINDOWS)
+
+    @property
+    def version(self):
+        """Bumped with every published snapshot (see snapshot_cache)."""
+        return self.state.version
+
+    def publish(self, samples, timestamps=None):
+        """
+        Applies parsed samples (oldest first): one orientation filter and
+        cardio step each, and for every sample carrying sensor FIELDS a
+        history row, then one new sensor snapshot holding the merged values,
+        the fused head position and the HRV stats. Heartbeat-only samples
+        (IBI / PPG lines) only feed the cardio windows: they add no history
+        row, and their keys never enter the snapshot's data. timestamps:
+        when each sample was read (history rows); default now. The
+        snapshot's "timestamp" is always the arrival time of the latest
+        sensor values, since it drives the staleness check.
+        """
+        if not samples:
+            return
+        now = time.time()
+        timestamp = int(now)
+        if timestamps is None:
+            read_times = [now] * len(samples)
+        else:
+            read_times = list(timestamps)
+        with self.lock:
+            data = None
+            for parsed, read_at in zip(samples, read_times):
+                values = {field: parsed[field] for field in FIELDS if field in parsed}
+                if not values:
+                    continue
+                if data is None:
+                    data = dict(self.state.current.data)
+                data.update(values)
+                data["timestamp"] = timestamp
+                self.history.append(data, read_at)
+            given = None if timestamps is None else read_times
+            head_position = cardio = None
+            if self.orientation.update_batch(samples, given, now):
+                head_position = self.orientation.head_position(timestamp)
+            if self.cardio.update_batch(samples, given, now):
+                cardio = self.cardio.stats(timestamp)
+            if data is None and cardio is None:
+                return # Only PPG samples that completed no beat
+            self.state.publish(data if data is not None else self.state.current.data, head_position, cardio)
+
+    def info(self):
+        current = self.state.current
+        return {
+            "device_id": self.device_id,
+            "seq": current.seq,
+            "last_sample": current.published_at,
+            "history": self.history.stats()
+        }
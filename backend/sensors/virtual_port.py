@@ -0,0 +1,136 @@
+"""
+Pseudo-terminal stand-in for the Arduino (POSIX only).
+
+VirtualSerialPort opens a pty pair: the backend (or any pyserial client)
+opens `.port` like a real device, while a writer thread plays firmware on
+the other end, emitting samples in the text or the binary protocol at a
+fixed rate.
+
+    python -m sensors.virtual_port [text|binary] [rate]   (from backend/)
+        Keeps a virtual Arduino running; start the server with
+        ARDUINO_PORT=<printed port> to read from it.
+
+tests/test_virtual_port.py streams both protocols through the bulk reader
+with it.
+"""
+import os
+import random
+import threading
+import time
+
+from sensors.framing import encode_sample_frame
+
+TEXT_KEYS = (
+    ("temperature", "T"), ("hr", "HR"), ("spo2", "SpO2"),
+    ("ax", "Ax"), ("ay", "Ay"), ("az", "Az"),
+    ("gx", "Gx"), ("gy", "Gy"), ("gz", "Gz")
+)
+
+
+def encode_text_line(sample):
+    """Sample dict -> firmware-style text line ("T:36.50, HR:72.00, ...\\r\\n")."""
+    return (", ".join(f"{key}:{sample[field]:.2f}" for field, key in TEXT_KEYS if field in sample) + "\r\n").encode()
+
+
+def random_sample():
+    return {
+        "temperature": round(36.5 + random.uniform(-0.5, 0.5), 2),
+        "hr": float(random.randint(60, 100)),
+        "spo2": round(random.uniform(95, 99.5), 2),
+        "ax": round(random.uniform(-5, 5), 2),
+        "ay": round(random.uniform(-5, 5), 2),
+        "az": round(random.uniform(8, 10), 2),
+        "gx": round(random.uniform(-2, 2), 2),
+        "gy": round(random.uniform(-2, 2), 2),
+        "gz": round(random.uniform(-2, 2), 2)
+    }
+
+
+class VirtualSerialPort:
+    """
+    A pty pair playing a sensor board. source() -> sample dict (random by
+    default); every sample written is kept in .sent when record=True.
+    """
+
+    def __init__(self, protocol="text", rate=100, source=None, record=False):
+        import tty
+
+        self.protocol = protocol
+        self.rate = rate
+        self.source = source or random_sample
+        self.sent = [] if record else None
+        self.count = 0
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave) # No echo / line discipline: bytes pass through untouched
+        self.port = os.ttyname(self._slave)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def encode(self, sample, tick):
+        if self.protocol == "binary":
+            return encode_sample_frame(sample, tick)
+        return encode_text_line(sample)
+
+    def write_sample(self, sample=None):
+        sample = sample if sample is not None else self.source()
+        tick = int(1000 * self.count / self.rate) if self.rate else self.count
+        os.write(self._master, self.encode(sample, tick))
+        self.count += 1
+        if self.sent is not None:
+            self.sent.append(sample)
+        return sample
+
+    def start(self, limit=None):
+        """Writes samples at `rate` Hz on a background thread (up to `limit` samples)."""
+        self._thread = threading.Thread(target=self._run, args=(limit,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, limit):
+        start = time.perf_counter()
+        while not self._stop.is_set() and (limit is None or self.count < limit):
+            due = int((time.perf_counter() - start) * self.rate) - self.count
+            if limit is not None:
+                due = min(due, limit - self.count)
+            try:
+                for _ in range(due):
+                    self.write_sample()
+            except OSError:
+                break # Port closed
+            time.sleep(0.001)
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        self._stop.set()
+        self.wait(1)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    protocol = sys.argv[1] if len(sys.argv) > 1 else "text"
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with VirtualSerialPort(protocol, rate) as device:
+        print(f"Virtual {protocol} Arduino at {device.port} ({rate:g} Hz). Ctrl+C to stop.")
+        device.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,141 @@
+"""
+Response serializers for REST and WebSocket payloads.
+
+Sensor, vision and ML output carries NumPy scalars and arrays (EMA
+probabilities, argmax results, landmark-derived floats). Instead of
+converting them field by field before FastAPI's encoder walks the dict
+again, payloads are encoded in one pass by:
+
+- JSON: orjson with native NumPy support when installed, else the stdlib
+  encoder with a .tolist() fallback.
+- MessagePack: negotiated with "Accept: application/msgpack" (REST) or
+  "?format=msgpack" (WebSockets). NumPy values go through a default hook
+  (ormsgpack, when installed, encodes them natively).
+
+Both backends are optional; JSON always works.
+"""
+import json
+
+from fastapi.responses import Response
+
+from config import get_config
+
+config = get_config()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ormsgpack
+except ImportError:
+    ormsgpack = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _to_builtin(obj):
+    # NumPy scalars / arrays (and anything else exposing tolist)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class Serializer:
+    """name, media_type, binary (WebSocket frame type) and dumps(value) -> bytes."""
+
+    def __init__(self, name, media_type, dumps, binary):
+        self.name = name
+        self.media_type = media_type
+        self.dumps = dumps
+        self.binary = binary
+
+    def __repr__(self):
+        return f"Serializer({self.name!r})"
+
+
+def _stdlib_json_dumps(value):
+    return json.dumps(value, default=_to_builtin, separators=(",", ":")).encode("utf-8")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(value):
+        return orjson.dumps(value, default=_to_builtin, option=_ORJSON_OPTIONS)
+else:
+    _orjson_dumps = None
+
+if ormsgpack is not None:
+    def _msgpack_dumps(value):
+        return ormsgpack.packb(
+            value, default=_to_builtin,
+            option=ormsgpack.OPT_SERIALIZE_NUMPY | ormsgpack.OPT_NON_STR_KEYS
+        )
+elif msgpack is not None:
+    def _msgpack_dumps(value):
+        return msgpack.packb(value, default=_to_builtin, use_bin_type=True)
+else:
+    _msgpack_dumps = None
+
+
+def _json_serializer(backend):
+    if backend == "json" or _orjson_dumps is None:
+        return Serializer("json", "application/json", _stdlib_json_dumps, binary=False)
+    return Serializer("json", "application/json", _orjson_dumps, binary=False)
+
+
+# JSON_BACKEND=json forces the stdlib encoder (e.g. to compare output)
+JSON = _json_serializer(config.JSON_BACKEND)
+MSGPACK = Serializer("msgpack", "application/msgpack", _msgpack_dumps, binary=True) if _msgpack_dumps else None
+
+_MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def loads(data):
+    """JSON bytes / str -> value (orjson when installed). Raises ValueError on bad input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_json(value):
+    """Compact JSON text of `value` (NumPy-aware)."""
+    return JSON.dumps(value).decode("utf-8")
+
+
+def get_serializer(name):
+    """'json' / 'msgpack' (query-string style) -> Serializer; unknown or unavailable -> JSON."""
+    if name and name.lower() == "msgpack" and MSGPACK is not None:
+        return MSGPACK
+    return JSON
+
+
+def negotiate(accept=None, fmt=None):
+    """
+    Picks the serializer for a request: an explicit `fmt` ("json" /
+    "msgpack") wins, else the first MessagePack type in the Accept header,
+    else JSON.
+    """
+    if fmt:
+        return get_serializer(fmt)
+    if accept and MSGPACK is not None:
+        for part in accept.split(","):
+            if part.split(";")[0].strip().lower() in _MSGPACK_TYPES:
+                return MSGPACK
+    return JSON
+
+
+def serialized_response(request, value, status_code=200, headers=None):
+    """Response with `value` encoded in the format the request asked for."""
+    serializer = negotiate(request.headers.get("accept"), request.query_params.get("format"))
+    return Response(
+        content=serializer.dumps(value),
+        status_code=status_code,
+        media_type=serializer.media_type,
+        headers={**(headers or {}), "Vary": "Accept"}
+    )
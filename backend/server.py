@@ -1,21 +1,32 @@
 import logging
+import json
+import os
 import time
-import base64
-import cv2
-import numpy as np
 import asyncio
-import threading
+from typing import Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
 from config import get_config
-from cv.perclos import process_face_mesh, perclos_data, reset_eye_calibration
-from cv.head_pose import cv_head_angles, cv_angles_lock
-from sensors.serial_reader import start_serial_thread, latest_sensor_data, sensor_data_history, head_position_data, calculate_head_position, sensor_lock, parse_raw_sensor_string
+from cv.frame_protocol import negotiate_mode, split_binary_frame
+from cv.pipeline import analyze_frame
+from cv.executor import VisionExecutor, LoopLagMonitor
+from cv.worker_pool import FaceMeshWorkerPool, FaceMeshPoolBusy
+from cv.frame_scheduler import FrameScheduler
+from sensors.serial_reader import start_serial_thread, default_store, sensor_data_history, head_position_data, publish_samples, parse_raw_sensor_string
+from sensors.acquisition import AcquisitionManager
 from ml.ml_engine import MLEngine
+from sessions import SessionManager, SessionLimitError, DEFAULT_SESSION_ID
+from stream import StreamHub, parse_topics
+from snapshot_cache import SnapshotCache
+from sensors.history import to_records
+from sensors.parser import FIELDS as SENSOR_FIELDS
+from sensors.ingest import IngestError, decode_body, parse_batch
+from sensors.cardio import EMPTY_STATS as EMPTY_CARDIO_STATS
+from serializers import get_serializer, negotiate, serialized_response
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
@@ -23,20 +34,79 @@ logger = logging.getLogger("FastAPI")
 
 config = get_config()
 
-# Global ML Engine
+# Shared ML model (each session gets its own MLEngine around it for temporal state)
 ml_engine = None
-ml_lock = threading.Lock()
-last_ml_time = 0
-cached_prediction = {"status": "Waiting...", "confidence": 0.0}
 ML_INTERVAL = config.ML_INTERVAL
 
+def _new_session_engine():
+    if ml_engine is None:
+        return None
+    return MLEngine(model_path=config.MODEL_PATH, model=ml_engine.model)
+
+def _release_session_resources(session):
+    snapshot_cache.discard(session.id)
+    acquisition.remove_replay(session.id)
+    if face_mesh_pool:
+        face_mesh_pool.release(session.id)
+
+# Combined payload per session, rebuilt only when its inputs change
+snapshot_cache = SnapshotCache()
+
+# Per-device sensor stores, see _sensor_store_for: every board in multi-seat
+# mode (SENSOR_MULTI_PORT=1, port scanning), plus per-session dataset replays
+acquisition = AcquisitionManager()
+
+# Per-driver state (vision, head pose calibration, ML temporal state)
+session_manager = SessionManager(
+    engine_factory=_new_session_engine,
+    idle_timeout=config.SESSION_IDLE_TIMEOUT,
+    max_sessions=config.MAX_SESSIONS,
+    on_remove=_release_session_resources
+)
+
+# Off-loop execution for decode / FaceMesh / ML
+vision_executor = VisionExecutor(mode=config.VISION_EXECUTOR, max_workers=config.VISION_WORKERS)
+loop_monitor = LoopLagMonitor(interval=config.LOOP_LAG_INTERVAL)
+
+# Optional multi-process FaceMesh pool (session-pinned workers)
+face_mesh_pool = None
+if config.FACE_MESH_WORKERS > 0:
+    face_mesh_pool = FaceMeshWorkerPool(
+        num_workers=config.FACE_MESH_WORKERS,
+        queue_size=config.FACE_MESH_QUEUE_SIZE,
+        mirror_pixels=config.VISION_MIRROR_PIXELS
+    )
+
+# Push fan-out for dashboards: one snapshot per watched session per tick
+async def _stream_snapshot(session_id):
+    session = session_manager.get(session_id)
+    if session is None:
+        return None
+    return await get_combined_snapshot(session)
+
+stream_hub = StreamHub(
+    _stream_snapshot,
+    interval=config.STREAM_INTERVAL,
+    send_timeout=config.STREAM_SEND_TIMEOUT,
+    max_subscribers=config.STREAM_MAX_SUBSCRIBERS
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting FastAPI Server...")
     
-    # Initialize Serial Thread
-    start_serial_thread()
+    # Initialize Serial Thread (or one reader per board in multi-seat mode)
+    if config.SENSOR_MULTI_PORT:
+        acquisition.start()
+    else:
+        start_serial_thread()
+
+    # Initialize Vision Executor + Event Loop Lag Probe
+    vision_executor.start()
+    loop_monitor.start()
+    if face_mesh_pool:
+        face_mesh_pool.start()
     
     # Initialize ML Engine
     global ml_engine
@@ -45,11 +115,28 @@ async def lifespan(app: FastAPI):
         logger.info("✅ ML Engine Initialized")
     except Exception as e:
         logger.error(f"❌ Failed to initialize ML Engine: {e}")
+
+    # Legacy clients (no session id) share the default session
+    session_manager.get_or_create(DEFAULT_SESSION_ID)
+    eviction_task = asyncio.create_task(_evict_idle_sessions())
+    stream_hub.start()
     
     yield
     
     # Shutdown
     logger.info("🛑 Stopping FastAPI Server...")
+    eviction_task.cancel()
+    await stream_hub.stop()
+    await loop_monitor.stop()
+    acquisition.stop()
+    if face_mesh_pool:
+        face_mesh_pool.shutdown()
+    vision_executor.shutdown()
+
+async def _evict_idle_sessions():
+    while True:
+        await asyncio.sleep(config.SESSION_EVICT_INTERVAL)
+        session_manager.evict_idle()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -60,6 +147,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 class IngestRequest(BaseModel):
@@ -77,182 +165,439 @@ async def health_check():
         "service": "fatiguered-backend-fastapi"
     }
 
+@app.get("/api/metrics")
+async def metrics(request: Request):
+    return serialized_response(request, {
+        "event_loop": loop_monitor.stats(),
+        "vision_executor": vision_executor.stats(),
+        "face_mesh_pool": face_mesh_pool.stats() if face_mesh_pool else None,
+        "sessions": len(session_manager),
+        "stream": stream_hub.stats(),
+        "snapshot_cache": snapshot_cache.stats(),
+        "sensor_history": sensor_data_history.stats(),
+        "sensor_devices": acquisition.stats(),
+        "timestamp": int(time.time())
+    })
+
+# --- SESSIONS ---
+def _resolve_session(session_id):
+    """Looks up a session for REST requests; no id means the default session."""
+    session = session_manager.get(session_id or DEFAULT_SESSION_ID)
+    if session is not None:
+        session.touch()
+    return session
+
+def _session_not_found(session_id):
+    return JSONResponse(status_code=404, content={"error": f"Unknown session: {session_id}"})
+
+@app.get("/api/sessions")
+async def list_sessions(request: Request):
+    return serialized_response(request, [session.info() for session in session_manager.list()])
+
+@app.post("/api/sessions")
+async def create_session(session_id: Optional[str] = None):
+    try:
+        session = session_manager.create(session_id)
+    except KeyError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    except SessionLimitError as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    return session.info()
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if session_id == DEFAULT_SESSION_ID:
+        return JSONResponse(status_code=400, content={"error": "The default session cannot be removed"})
+    if session_manager.remove(session_id) is None:
+        return _session_not_found(session_id)
+    return {"status": "removed", "session_id": session_id}
+
+@app.post("/api/sessions/{session_id}/replay")
+async def start_session_replay(session_id: str, dataset: str = "fatigue_dataset", speed: str = "1"):
+    """
+    Feeds the session's sensor data from a recorded dataset (sensors.replay)
+    instead of the board: fatigue_dataset, nthu or fatigue_debug (or a
+    bundled file name); speed 1 (real time), N (N x) or "max".
+    """
+    if session_manager.get(session_id) is None:
+        return _session_not_found(session_id)
+    if session_id == DEFAULT_SESSION_ID or default_store.device_id == session_id:
+        return JSONResponse(status_code=400, content={"error": "Use ARDUINO_PORT=replay:... to replay into the default session"})
+    if os.path.basename(dataset) != dataset:
+        return JSONResponse(status_code=400, content={"error": "dataset must be a name, not a path"})
+    try:
+        store = await vision_executor.run_blocking(acquisition.add_replay, session_id, f"{dataset}@{speed}")
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid speed: {e}"})
+    return {"status": "replaying", "session_id": session_id, "device": store.info()}
+
+@app.delete("/api/sessions/{session_id}/replay")
+async def stop_session_replay(session_id: str):
+    if not acquisition.remove_replay(session_id):
+        return JSONResponse(status_code=404, content={"error": f"No replay running for session {session_id}"})
+    return {"status": "stopped", "session_id": session_id}
+
 # --- WEB SOCKET ENDPOINT ---
 @app.websocket("/ws/detect")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    logger.info("WebSocket Client Connected")
-    # --- OPTIMIZATION: FRAME SKIPPING ---
-    frame_counter = 0
-    PROCESS_EVERY_N_FRAMES = 3  # Analyze only 1 out of 3 frames (reduces load by ~66%)
+    mode, subprotocol = negotiate_mode(
+        websocket.scope.get("subprotocols"),
+        websocket.query_params.get("mode")
+    )
+    # One session per device: ?device_id=... (or ?session_id=...). Clients that
+    # send neither share the default session, like before sessions existed.
+    session_id = (
+        websocket.query_params.get("device_id")
+        or websocket.query_params.get("session_id")
+        or DEFAULT_SESSION_ID
+    )
+    try:
+        session = session_manager.get_or_create(session_id)
+    except SessionLimitError as e:
+        logger.warning(f"Rejecting WebSocket: {e}")
+        await websocket.close(code=1013) # Try Again Later
+        return
+
+    # Reply encoding: ?format=msgpack for binary MessagePack replies, JSON text otherwise
+    serializer = get_serializer(websocket.query_params.get("format"))
+
+    await websocket.accept(subprotocol=subprotocol)
+    session.connections += 1
+    session.touch()
+    logger.info(f"WebSocket Client Connected (mode: {mode}, session: {session_id})")
+    # --- OPTIMIZATION: LATEST-FRAME-WINS SCHEDULING ---
+    # Frames that arrive while one is being analyzed replace each other; only
+    # the freshest is processed, at up to VISION_TARGET_FPS.
+    last_processed = {"frame": None}
+
+    async def process_frame(payload):
+        # --- PROCESS FRAME (Decode + FaceMesh, then Perclos + Head Pose) ---
+        # Runs off the event loop so it keeps serving other clients
+        roi_hint = session.face_roi if config.VISION_ROI_TRACKING else None
+        try:
+            if face_mesh_pool:
+                result = await face_mesh_pool.analyze(session.id, payload, roi_hint)
+            else:
+                result = await vision_executor.run(
+                    analyze_frame, payload, None, roi_hint, config.VISION_MIRROR_PIXELS
+                )
+        except FaceMeshPoolBusy:
+            return False # Counted as dropped by the scheduler
+
+        if result is not None:
+            last_processed["frame"] = result["frame"]
+            # Temporal state belongs to this connection's session
+            await vision_executor.run_blocking(session.process_detection, result)
+        return True
+
+    scheduler = FrameScheduler(process_frame, target_fps=config.VISION_TARGET_FPS)
+    session.scheduler = scheduler
+    scheduler.start()
     
     try:
         while True:
-            # Receive frame data
-            data = await websocket.receive_json()
-            
-            if "image_data" not in data:
-                continue
+            # Receive frame data (binary or legacy JSON, whatever the client sends)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                payload = message["bytes"]
+                # Header is cheap to read without decoding the image
+                frame_meta, _ = split_binary_frame(payload)
+            else:
+                data = json.loads(message.get("text") or "{}")
+                if "image_data" not in data:
+                    continue
+                payload = data["image_data"]
+                frame_meta = None
 
-            frame_counter += 1
-            should_process = (frame_counter % PROCESS_EVERY_N_FRAMES == 0)
-
-            if should_process:
-                # Decode Image only when needed
-                try:
-                    base64_string = data['image_data'].split(',')[1]
-                    frame_bytes = base64.b64decode(base64_string)
-                    np_arr = np.frombuffer(frame_bytes, np.uint8)
-                    frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-                    
-                    if frame is not None:
-                        frame = cv2.flip(frame, 1)
-                        # --- PROCESS FRAME (Perclos + Head Pose) ---
-                        # This function updates global perclos_data internally
-                        process_face_mesh(frame)
-                        
-                except Exception as e:
-                    logger.error(f"Error processing frame in WS: {e}")
+            session.touch()
+            scheduler.submit(payload)
             
             # --- COMBINE DATA FOR RESPONSE ---
-            # Even if we skipped vision processing, we return the latest Sensor Data + cached Vision Data
-            response_data = await get_combined_data_internal()
+            # Return the latest Sensor Data + latest Vision Data (from the freshest processed frame)
+            snapshot = await get_combined_snapshot(session)
+            extra = {"scheduler": scheduler.stats()}
+            if frame_meta is not None:
+                # Echo the client's frame id / capture time so it can measure round-trip latency
+                extra["frame"] = {**frame_meta, "last_processed": last_processed["frame"]}
             
-            # Send back processed data
-            await websocket.send_json(response_data)
+            # Send back processed data (cached JSON + the per-connection fields)
+            if serializer.binary:
+                await websocket.send_bytes(snapshot.encode_with(serializer, **extra))
+            else:
+                await websocket.send_text(snapshot.text_with(**extra))
                 
     except WebSocketDisconnect:
-        logger.info("WebSocket Client Disconnected")
+        logger.info(f"WebSocket Client Disconnected (session: {session_id})")
     except Exception as e:
         logger.error(f"WebSocket Error: {e}")
+    finally:
+        await scheduler.stop()
+        session.connections -= 1
+        session.touch()
+
+@app.websocket("/ws/stream")
+async def stream_endpoint(websocket: WebSocket):
+    """
+    Dashboard push channel. Query: ?session_id= (or device_id, default
+    session otherwise) and ?topics=sensor,perclos,head_position,prediction,hrv
+    (all by default), ?format=msgpack for binary MessagePack frames instead
+    of JSON text. A text message {"topics": [...], "session_id": ...}
+    changes the subscription on the fly.
+    """
+    params = websocket.query_params
+    session_id = params.get("session_id") or params.get("device_id") or DEFAULT_SESSION_ID
+    if stream_hub.is_full:
+        logger.warning("Rejecting stream subscriber: hub is full")
+        await websocket.close(code=1013) # Try Again Later
+        return
+
+    await websocket.accept()
+    subscriber = stream_hub.subscribe(
+        websocket, session_id, parse_topics(params.get("topics")), get_serializer(params.get("format"))
+    )
+    if subscriber is None:
+        await websocket.close(code=1013)
+        return
+    logger.info(f"Stream subscriber connected (session: {session_id}, topics: {','.join(subscriber.topics)})")
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                data = json.loads(message.get("text") or "{}")
+            except ValueError:
+                continue
+            if "topics" in data:
+                subscriber.topics = parse_topics(data["topics"])
+            if data.get("session_id"):
+                subscriber.session_id = data["session_id"]
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the hub already closed a stalled subscriber
+        pass
+    finally:
+        await stream_hub.unsubscribe(subscriber)
+        logger.info(f"Stream subscriber disconnected (session: {subscriber.session_id})")
 
 # --- INTERNAL HELPER ---
-async def get_combined_data_internal():
-    global last_ml_time, cached_prediction
-    
-    hp = {
-        "position": "Unknown",
-        "angle_x": 0.0,
-        "angle_y": 0.0,
-        "angle_z": 0.0,
-        "timestamp": int(time.time()),
-        "source": "None"
+def _default_sensor_store():
+    """
+    The store read when no device is named: the default store, unless there
+    is exactly one device (board or bridge; session replays don't count) and
+    either multi-seat mode is on or no local board has fed the default store
+    (e.g. a single remote bridge).
+    """
+    devices = acquisition.device_stores()
+    if len(devices) == 1 and (config.SENSOR_MULTI_PORT or default_store.state.current.seq == 0):
+        return next(iter(devices.values()))
+    return default_store
+
+def _sensor_store_for(session):
+    """
+    The SensorStore a session reads: the device (board, replay or bridge)
+    with the session's id; the default session reads _default_sensor_store().
+    Otherwise the default store.
+    """
+    store = acquisition.get(session.id)
+    if store is not None:
+        return store
+    if session.id == DEFAULT_SESSION_ID:
+        return _default_sensor_store()
+    return default_store
+
+def _resolve_sensor_store(device_id):
+    """?device_id= on the sensor endpoints -> store, or None if unknown. No id: _default_sensor_store()."""
+    if not device_id:
+        return _default_sensor_store()
+    if device_id == default_store.device_id:
+        return default_store
+    return acquisition.get(device_id)
+
+def _run_ml_prediction(session, hp):
+    """Rate-limited ML inference for one session. Blocking; call through the vision executor."""
+    sensor = _sensor_store_for(session).state.current
+    safe_sensor = {
+        "hr": sensor.get("hr") or 0.0,
+        "temperature": sensor.get("temperature") or 0.0,
+        "timestamp": sensor.get("timestamp") or time.time()
     }
-    
-    current_time = time.time()
-    
+    return session.predict(safe_sensor, hp, ML_INTERVAL)
+
+def _build_combined_data(session, sensor, sensor_active):
+    """Assembles the combined payload from a sensor snapshot and the session state. No side effects (no ML)."""
     # SENSOR / HEAD POSE LOGIC
-    with sensor_lock:
-        sensor_active = (
-            latest_sensor_data.get("timestamp") is not None and 
-            (current_time - latest_sensor_data["timestamp"] < config.SENSOR_TIMEOUT) and
-            latest_sensor_data.get("ax") is not None
-        )
+    # The snapshot's dict is immutable once published: shared, not copied
+    sensor_data_snap = sensor.data
+
+    if sensor_active and sensor.head_position is not None:
+        # Fused orientation, computed per IMU sample by the sensor path
+        hp = sensor.head_position
+    else:
+        cv_head_angles = session.head_pose.snapshot()
+        c_pitch = cv_head_angles["pitch"]
+        c_yaw = cv_head_angles["yaw"]
+        c_roll = cv_head_angles["roll"]
         
-        if sensor_active:
-            pos, ang_x, ang_y, ang_z = calculate_head_position(
-                latest_sensor_data["ax"],
-                latest_sensor_data["ay"],
-                latest_sensor_data["az"]
-            )
-            hp = {
-                "position": pos,
-                "angle_x": round(ang_x, 2),
-                "angle_y": round(ang_y, 2),
-                "angle_z": round(ang_z, 2),
-                "timestamp": int(time.time()),
-                "source": "Sensor"
-            }
-
-    if not sensor_active:
-        with cv_angles_lock:
-            c_pitch = cv_head_angles["pitch"]
-            c_yaw = cv_head_angles["yaw"]
-            c_roll = cv_head_angles["roll"]
-            
-            v_label = ""
-            if c_pitch > 10: v_label = "Down"
-            elif c_pitch < -10: v_label = "Up"
-            
-            h_label = ""
-            if c_yaw > 10: h_label = "Right"
-            elif c_yaw < -10: h_label = "Left"
-            
-            pos_label = f"{v_label} {h_label}".strip()
-            if not pos_label: pos_label = "Center"
-
-            hp = {
-                "position": pos_label,
-                "angle_x": round(c_pitch, 2),
-                "angle_y": round(c_yaw, 2),
-                "angle_z": round(c_roll, 2),
-                "timestamp": int(time.time()),
-                "source": "Vision (Fallback)",
-                "calibrated": cv_head_angles.get("is_calibrated", False)
-            }
-
-    # ML PREDICTION
-    prediction_result = cached_prediction
+        v_label = ""
+        if c_pitch > 10: v_label = "Down"
+        elif c_pitch < -10: v_label = "Up"
+        
+        h_label = ""
+        if c_yaw > 10: h_label = "Right"
+        elif c_yaw < -10: h_label = "Left"
+        
+        pos_label = f"{v_label} {h_label}".strip()
+        if not pos_label: pos_label = "Center"
+
+        hp = {
+            "position": pos_label,
+            "angle_x": round(c_pitch, 2),
+            "angle_y": round(c_yaw, 2),
+            "angle_z": round(c_roll, 2),
+            "timestamp": int(time.time()),
+            "source": "Vision (Fallback)",
+            "calibrated": cv_head_angles.get("is_calibrated", False)
+        }
+
+    # Copied: the vision state keeps updating its dict in place
+    perclos_data = dict(session.perclos_data)
     is_calibrating = perclos_data.get("is_calibrating", False)
-    
+    prediction_result = session.cached_prediction
     if is_calibrating:
         prediction_result = {"status": "Initializing...", "confidence": 0.0}
-    
-    # Check ML Interval
-    if (current_time - last_ml_time) > ML_INTERVAL and not is_calibrating and ml_engine:
-        with ml_lock:
-             if (time.time() - last_ml_time) > ML_INTERVAL:
-                with sensor_lock:
-                    safe_sensor = {
-                        "hr": latest_sensor_data.get("hr") or 0.0,
-                        "temperature": latest_sensor_data.get("temperature") or 0.0,
-                        "timestamp": latest_sensor_data.get("timestamp") or time.time()
-                    }
-                
-                prediction_result = ml_engine.predict(safe_sensor, {
-                    **perclos_data,
-                    "head_angle_x": hp["angle_x"],
-                    "head_angle_y": hp["angle_y"]
-                })
-                cached_prediction = prediction_result
-                last_ml_time = time.time()
-
-    with sensor_lock:
-        sensor_data_snap = latest_sensor_data.copy()
 
     return {
         "sensor": sensor_data_snap,
         "perclos": perclos_data,
         "head_position": hp,
         "prediction": prediction_result,
+        "hrv": sensor.cardio, # Streaming HR / HRV windows (sensors.cardio), None before any HR data
         "server_time": int(time.time()),
         "system_status": "Initializing" if is_calibrating else "Active"
     }
 
+def _cached_snapshot(session):
+    # The sensor snapshot is taken once (its seq is the key); the session
+    # version is read before building, so a frame racing the build changes
+    # the key and is picked up by the next call
+    # (seqs are process-wide, so switching stores changes the key too)
+    sensor = _sensor_store_for(session).state.current
+    sensor_active = sensor.is_active(time.time(), config.SENSOR_TIMEOUT)
+    key = (sensor.seq, session.version.value, sensor_active)
+    return snapshot_cache.get(session.id, key, lambda: _build_combined_data(session, sensor, sensor_active))
+
+async def get_combined_snapshot(session):
+    """
+    The session's CombinedSnapshot (see snapshot_cache): rebuilt and
+    re-encoded only when sensor data, the session's vision / prediction
+    state or the head pose source changed since the last call.
+    """
+    snapshot = _cached_snapshot(session)
+
+    # ML PREDICTION (Check ML Interval)
+    due = (time.time() - session.last_ml_time) > ML_INTERVAL
+    if due and session.ml_engine and snapshot.data["system_status"] != "Initializing":
+        # Inference runs on the executor's thread pool, never on the event loop.
+        # A new prediction bumps the session version, so this rebuilds.
+        await vision_executor.run_blocking(_run_ml_prediction, session, snapshot.data["head_position"])
+        snapshot = _cached_snapshot(session)
+    return snapshot
+
+async def get_combined_data_internal(session):
+    """Combined payload dict. Shared with other readers through the cache: do not modify it."""
+    return (await get_combined_snapshot(session)).data
+
 # --- REST ENDPOINTS (Legacy/Polling) ---
 @app.get("/api/combined_data")
-async def get_combined_data():
-    return await get_combined_data_internal()
+async def get_combined_data(request: Request, session_id: Optional[str] = None):
+    session = _resolve_session(session_id)
+    if session is None:
+        return _session_not_found(session_id)
+    snapshot = await get_combined_snapshot(session)
+    serializer = negotiate(request.headers.get("accept"), request.query_params.get("format"))
+    # Pollers revalidate with If-None-Match and get a 304 while nothing changed
+    headers = {"ETag": snapshot.etag_for(serializer), "Cache-Control": "no-cache", "Vary": "Accept"}
+    if snapshot.matches(request.headers.get("if-none-match"), serializer):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body_for(serializer), media_type=serializer.media_type, headers=headers)
+
+def _device_not_found(device_id):
+    return JSONResponse(status_code=404, content={"error": f"Unknown device: {device_id}"})
 
 @app.get("/api/sensor_data")
-async def get_sensor_data():
-    with sensor_lock:
-        data = latest_sensor_data.copy()
-    return data
+async def get_sensor_data(request: Request, device_id: Optional[str] = None):
+    store = _resolve_sensor_store(device_id)
+    if store is None:
+        return _device_not_found(device_id)
+    return serialized_response(request, store.state.current.data)
+
+@app.get("/api/sensor_data/hrv")
+async def get_sensor_hrv(request: Request, device_id: Optional[str] = None):
+    """
+    Heart rate / HRV over each CARDIO_WINDOWS length: mean HR, and SDNN /
+    RMSSD when the firmware sends beat intervals (IBI) or raw PPG. Same
+    payload as the "hrv" stream topic.
+    """
+    store = _resolve_sensor_store(device_id)
+    if store is None:
+        return _device_not_found(device_id)
+    return serialized_response(request, store.state.current.cardio or EMPTY_CARDIO_STATS)
+
+@app.get("/api/devices")
+async def list_devices(request: Request):
+    """Sensor stores: every board / replay device seen, plus the default store outside multi-seat mode."""
+    devices = acquisition.info()
+    if not config.SENSOR_MULTI_PORT:
+        devices.insert(0, default_store.info())
+    return serialized_response(request, devices)
 
 @app.get("/api/sensor_data/history")
-async def get_sensor_data_history():
-    return list(sensor_data_history)
+async def get_sensor_data_history(
+    request: Request,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    fields: Optional[str] = None,
+    step: Optional[float] = None,
+    limit: Optional[int] = None,
+    device_id: Optional[str] = None
+):
+    """
+    Sensor samples, oldest first. since / until: epoch seconds; fields:
+    comma-separated subset (all by default); step: seconds per averaged
+    bucket; limit: newest N rows. With no range the last MAX_HISTORY
+    samples are returned, like before. device_id: a multi-seat board.
+    """
+    store = _resolve_sensor_store(device_id)
+    if store is None:
+        return _device_not_found(device_id)
+    selected = None
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in SENSOR_FIELDS]
+        if unknown:
+            return JSONResponse(status_code=400, content={"error": f"Unknown fields: {', '.join(unknown)}"})
+    if step is not None and step <= 0:
+        return JSONResponse(status_code=400, content={"error": "step must be positive"})
+    if limit is not None and limit < 0:
+        return JSONResponse(status_code=400, content={"error": "limit must be >= 0"})
+    if limit is None and since is None and until is None:
+        limit = config.MAX_HISTORY
+    columns = store.history.query(since, until, selected, step, limit)
+    return serialized_response(request, to_records(columns))
 
 @app.post("/api/reset_calibration")
-async def reset_calibration_endpoint():
+async def reset_calibration_endpoint(session_id: Optional[str] = None):
     try:
-        with ml_lock:
-            if ml_engine:
-                ml_engine.reset_calibration()
-            reset_eye_calibration()
-            with cv_angles_lock:
-                 cv_head_angles["is_calibrated"] = False
+        session = _resolve_session(session_id)
+        if session is None:
+            return _session_not_found(session_id)
+        session.reset_calibration()
         return {"message": "Calibration reset successfully", "status": "OK"}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -266,10 +611,7 @@ async def ingest_sensor_data(item: IngestRequest):
         
         parsed = parse_raw_sensor_string(raw_string)
         if parsed:
-            timestamp = int(time.time())
-            with sensor_lock:
-                latest_sensor_data.update({**parsed, "timestamp": timestamp})
-                sensor_data_history.append(latest_sensor_data.copy())
+            publish_samples([parsed])
             return {"status": "received", "data": parsed}
         else:
             return {"status": "ignored", "reason": "parsing failed"}
@@ -277,6 +619,38 @@ async def ingest_sensor_data(item: IngestRequest):
         logger.error(f"Error ingesting: {e}")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+def _ingest_batch(body, content_encoding):
+    """Decode + parse + publish one uploaded batch. Blocking; call through the executor."""
+    data = decode_body(body, content_encoding, config.INGEST_MAX_BYTES)
+    device_id, samples, timestamps, received = parse_batch(data, config.INGEST_MAX_LINES)
+    if not device_id or device_id == default_store.device_id:
+        store = default_store
+    else:
+        store = acquisition.ingest_store(device_id, config.INGEST_MAX_DEVICES)
+        if store is None:
+            raise IngestError(f"Too many sensor devices (max {config.INGEST_MAX_DEVICES})", 403)
+    store.publish(samples, timestamps)
+    return received, len(samples)
+
+@app.post("/api/sensor_data/ingest/batch")
+async def ingest_sensor_batch(request: Request):
+    """
+    Many serial lines per request (see sensors.ingest): JSON
+    {"device_id": ..., "lines": [[timestamp, raw_line], ...]}, optionally
+    gzip-encoded. The lines go to device_id's store (default store if absent).
+    """
+    body = await request.body()
+    try:
+        received, accepted = await vision_executor.run_blocking(
+            _ingest_batch, body, request.headers.get("content-encoding")
+        )
+    except IngestError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except Exception as e:
+        logger.error(f"Error ingesting batch: {e}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return {"status": "received", "received": received, "accepted": accepted}
+
 if __name__ == "__main__":
     import uvicorn
     # Use 'server:app' if running via command line, but here we run app directly
@@ -0,0 +1,218 @@
+"""
+Per-driver sessions.
+
+A Session owns everything that used to be module-global per process:
+PERCLOS / eye calibration (VisionState), head pose calibration
+(HeadPoseTracker) and the ML engine's temporal state (EMA, hysteresis,
+feature window). Sessions are keyed by device id (or any client-chosen id)
+so one backend can monitor many cabins at once without their state mixing.
+
+The "default" session wraps the legacy module-level state, so clients that
+don't send an id keep the old single-driver behaviour.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from cv.perclos import VisionState, default_vision_state
+from cv.head_pose import HeadPoseTracker, default_head_pose
+from snapshot_cache import VersionCounter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a new session would exceed the configured maximum."""
+
+
+class Session:
+    def __init__(self, session_id, ml_engine=None, vision=None, head_pose=None):
+        self.id = session_id
+        self.head_pose = head_pose if head_pose is not None else HeadPoseTracker()
+        self.vision = vision if vision is not None else VisionState(head_pose=self.head_pose)
+
+        # ML temporal state (EMA, hysteresis, feature window) lives in the engine
+        self.ml_engine = ml_engine
+        self.ml_lock = threading.Lock()
+        self.last_ml_time = 0
+        self.cached_prediction = {"status": "Waiting...", "confidence": 0.0}
+
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.connections = 0 # Open WebSockets bound to this session
+        self.scheduler = None # FrameScheduler of the latest /ws/detect connection
+        self.face_roi = None # Face box hint for the next frame (see cv.face_roi)
+        # Bumped after every change to vision / head pose / prediction state (see snapshot_cache)
+        self.version = VersionCounter()
+
+    @property
+    def perclos_data(self):
+        return self.vision.perclos_data
+
+    def touch(self):
+        self.last_seen = time.time()
+
+    def is_idle(self, timeout, now=None):
+        now = time.time() if now is None else now
+        return self.connections == 0 and (now - self.last_seen) > timeout
+
+    def process_detection(self, detection):
+        """Applies one analyze_frame() result to this session's vision state."""
+        self.touch()
+        self.face_roi = detection.get("roi")
+        try:
+            return self.vision.process_landmarks(detection["landmarks"], detection["width"], detection["height"])
+        finally:
+            self.version.bump()
+
+    def reset_calibration(self):
+        with self.ml_lock:
+            if self.ml_engine:
+                self.ml_engine.reset_calibration()
+        # Under the lock process_detection() updates vision and head pose with,
+        # so a reset never lands in the middle of a frame
+        with self.vision.lock:
+            self.vision.reset_calibration()
+            self.head_pose.reset()
+        self.version.bump()
+
+    def predict(self, sensor_data, head_position, interval):
+        """
+        Rate-limited ML inference for this session (at most once per `interval`).
+        Blocking; call it through the vision executor.
+        """
+        with self.ml_lock:
+            if self.ml_engine is None or (time.time() - self.last_ml_time) <= interval:
+                return self.cached_prediction
+
+            self.cached_prediction = self.ml_engine.predict(sensor_data, {
+                **self.vision.perclos_data,
+                "head_angle_x": head_position["angle_x"],
+                "head_angle_y": head_position["angle_y"]
+            })
+            self.last_ml_time = time.time()
+            self.version.bump()
+            return self.cached_prediction
+
+    def info(self):
+        return {
+            "session_id": self.id,
+            "created_at": int(self.created_at),
+            "last_seen": int(self.last_seen),
+            "connections": self.connections,
+            "status": self.vision.perclos_data.get("status"),
+            "prediction": self.cached_prediction.get("status"),
+            "frames": self.scheduler.stats() if self.scheduler else None,
+            "head_pose": self.head_pose.solver.stats()
+        }
+
+
+class SessionManager:
+    """
+    Thread-safe registry of sessions with create / lookup / idle eviction.
+
+    engine_factory() builds the MLEngine for each new session (sharing the
+    loaded model); it may be None when ML is unavailable. on_remove(session)
+    is called after a session is removed or evicted.
+    """
+
+    def __init__(self, engine_factory=None, idle_timeout=300, max_sessions=64, on_remove=None):
+        self.engine_factory = engine_factory
+        self.on_remove = on_remove
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _new_engine(self):
+        if self.engine_factory is None:
+            return None
+        try:
+            return self.engine_factory()
+        except Exception as e:
+            logger.error(f"Failed to create ML engine for session: {e}")
+            return None
+
+    def create(self, session_id=None):
+        """Creates a session (random id if none given). Raises KeyError if the id is taken."""
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            if session_id in self._sessions:
+                raise KeyError(f"Session already exists: {session_id}")
+            evicted = []
+            if len(self._sessions) >= self.max_sessions:
+                evicted = self._evict_idle_locked(time.time())
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(f"Session limit reached ({self.max_sessions})")
+
+            if session_id == DEFAULT_SESSION_ID:
+                # Legacy single-driver state, shared with module-level callers
+                session = Session(session_id, self._new_engine(), vision=default_vision_state, head_pose=default_head_pose)
+            else:
+                session = Session(session_id, self._new_engine())
+            self._sessions[session_id] = session
+
+        self._notify_removed(evicted)
+        logger.info(f"Session created: {session_id}")
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id):
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        try:
+            return self.create(session_id)
+        except KeyError:
+            # Lost a race with another connection using the same id
+            return self.get(session_id)
+
+    def remove(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            logger.info(f"Session removed: {session_id}")
+            self._notify_removed([session])
+        return session
+
+    def evict_idle(self, now=None):
+        """Drops sessions with no open connection that haven't been seen for idle_timeout. Returns evicted ids."""
+        with self._lock:
+            evicted = self._evict_idle_locked(time.time() if now is None else now)
+        self._notify_removed(evicted)
+        return [session.id for session in evicted]
+
+    def _evict_idle_locked(self, now):
+        evicted = [
+            s for sid, s in self._sessions.items()
+            if sid != DEFAULT_SESSION_ID and s.is_idle(self.idle_timeout, now)
+        ]
+        for session in evicted:
+            del self._sessions[session.id]
+            logger.info(f"Session evicted (idle): {session.id}")
+        return evicted
+
+    def _notify_removed(self, sessions):
+        if self.on_remove is None:
+            return
+        for session in sessions:
+            try:
+                self.on_remove(session)
+            except Exception as e:
+                logger.error(f"Session cleanup failed for {session.id}: {e}")
+
+    def list(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
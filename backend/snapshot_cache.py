@@ -0,0 +1,127 @@
+"""
+Versioned combined-snapshot cache.
+
+The combined payload (sensor + perclos + head position + prediction) used
+to be rebuilt and JSON-encoded on every REST poll and WebSocket reply. Now
+the state it is built from carries version counters: sensor data (bumped by
+every reader/ingest write) and each session (bumped on every processed
+frame, calibration reset and new prediction). A session's snapshot is
+rebuilt only when one of those versions, or the sensor/vision source
+switch, changes. Until then every consumer gets the same dict plus its
+serialized bytes, and REST clients can revalidate with If-None-Match
+against the snapshot's ETag and get a 304.
+"""
+import itertools
+import threading
+import time
+import uuid
+
+from serializers import JSON, encode_json
+from stream import TOPICS
+
+
+class VersionCounter:
+    """
+    Change counter for a piece of shared state. Writers call bump() after
+    changing the state; readers compare .value. Values come from one
+    process-wide sequence, so concurrent bumps can never settle on a value
+    a reader has already seen.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value = next(VersionCounter._ids)
+        return self.value
+
+
+# Versions restart with the process; the prefix keeps ETags from before a restart from matching
+_ETAG_PREFIX = uuid.uuid4().hex[:8]
+
+
+class CombinedSnapshot:
+    """One built snapshot: the dict, its JSON text/bytes, per-topic JSON and an ETag."""
+    _versions = itertools.count(1)
+
+    def __init__(self, key, data):
+        self.key = key
+        self.version = next(CombinedSnapshot._versions)
+        self.etag = f'"{_ETAG_PREFIX}-{self.version}"'
+        self.data = data
+        self.body = JSON.dumps(data)
+        self.text = self.body.decode("utf-8")
+        self.topics = {topic: encode_json(data.get(topic)) for topic in TOPICS}
+        self.built_at = time.time()
+        self._bodies = {JSON.name: self.body} # Other formats are encoded on first request
+
+    def body_for(self, serializer):
+        """The snapshot encoded with `serializer` (once per format)."""
+        body = self._bodies.get(serializer.name)
+        if body is None:
+            body = self._bodies[serializer.name] = serializer.dumps(self.data)
+        return body
+
+    def etag_for(self, serializer):
+        if serializer is JSON:
+            return self.etag
+        return f'{self.etag[:-1]}-{serializer.name}"'
+
+    def text_with(self, **fields):
+        """The cached JSON text with extra top-level fields appended (no re-encoding of the rest)."""
+        if not fields:
+            return self.text
+        extra = "".join(f',"{name}":{encode_json(value)}' for name, value in fields.items())
+        return self.text[:-1] + extra + "}"
+
+    def encode_with(self, serializer, **fields):
+        """Like text_with() for any serializer: str for JSON, bytes for binary formats."""
+        if serializer is JSON:
+            return self.text_with(**fields)
+        return serializer.dumps({**self.data, **fields})
+
+    def matches(self, if_none_match, serializer=JSON):
+        """True if an If-None-Match header value names this snapshot (in that format)."""
+        if not if_none_match:
+            return False
+        etag = self.etag_for(serializer)
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class SnapshotCache:
+    """Latest CombinedSnapshot per session id, rebuilt only when its key changes."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, session_id, key, build):
+        """
+        Returns the cached snapshot if it was built for `key`, else calls
+        build() -> dict and caches the result. Read the versions that make
+        up `key` before building, so a change racing the build bumps the
+        key again and is picked up next time.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+
+        entry = CombinedSnapshot(key, build())
+        with self._lock:
+            self._entries[session_id] = entry
+            self.builds += 1
+        return entry
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds}
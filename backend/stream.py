@@ -0,0 +1,252 @@
+"""
+Push-based fan-out for dashboards (/ws/stream).
+
+Instead of every open dashboard polling /combined_data, a single publisher
+task fetches each watched session's cached combined snapshot once per tick
+(topics already serialized, see snapshot_cache) and hands it to all
+subscribers of that session that have not received that version yet.
+Subscribers pick topics (sensor, perclos, head_position, prediction, hrv)
+and a session.
+
+Publishing never waits on a client: each subscriber has one "latest
+message" slot drained by its own sender task. A subscriber that is still
+sending when the next tick arrives has the older message replaced
+(coalesced); one whose send takes longer than send_timeout is
+disconnected.
+"""
+import asyncio
+import logging
+import time
+
+from serializers import JSON, encode_json
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ("sensor", "perclos", "head_position", "prediction", "hrv")
+
+
+def parse_topics(value):
+    """Comma-separated string or list -> tuple of known topics (all if empty)."""
+    if not value:
+        return TOPICS
+    if isinstance(value, str):
+        value = value.split(",")
+    topics = tuple(t for t in TOPICS if t in {v.strip() for v in value})
+    return topics or TOPICS
+
+
+class StreamSubscriber:
+    def __init__(self, websocket, session_id, topics=TOPICS, send_timeout=2.0, serializer=JSON):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.topics = topics
+        self.send_timeout = send_timeout
+        self.serializer = serializer # Binary serializers are sent as bytes frames
+
+        self._pending = None
+        self.last_sent = None # (session, topics, snapshot version) of the last message offered
+        self._wake = asyncio.Event()
+        self._task = None
+        self.closed = False
+
+        # Stats
+        self.sent = 0
+        self.coalesced = 0
+        self.connected_at = time.time()
+
+    def offer(self, message):
+        """Queues a message without blocking; replaces one that was not sent yet."""
+        if self.closed:
+            return
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = message
+        self._wake.set()
+
+    def start(self, on_close):
+        self._task = asyncio.get_running_loop().create_task(self._run(on_close))
+
+    async def stop(self):
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, on_close):
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+                message, self._pending = self._pending, None
+                if message is None:
+                    continue
+                send = self.websocket.send_bytes if isinstance(message, bytes) else self.websocket.send_text
+                await asyncio.wait_for(send(message), self.send_timeout)
+                self.sent += 1
+        except asyncio.TimeoutError:
+            logger.warning(f"Stream subscriber too slow (>{self.send_timeout}s per message); disconnecting")
+            await on_close(self, code=1008)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Stream subscriber send failed: {e}")
+            await on_close(self, code=1011)
+
+    def stats(self):
+        return {
+            "session_id": self.session_id,
+            "topics": list(self.topics),
+            "format": self.serializer.name,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "connected_for": round(time.time() - self.connected_at, 1)
+        }
+
+
+class StreamHub:
+    """
+    snapshot_fn(session_id) -> awaitable snapshot_cache.CombinedSnapshot,
+    or None when the session does not exist (nothing is sent that tick).
+    A subscriber is sent a snapshot version only once; ticks where its
+    session did not change send nothing.
+    """
+
+    def __init__(self, snapshot_fn, interval=0.5, send_timeout=2.0, max_subscribers=256):
+        self.snapshot_fn = snapshot_fn
+        self.interval = interval
+        self.send_timeout = send_timeout
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._task = None
+        self.seq = 0
+        self.ticks = 0
+        self.unchanged = 0
+        self.disconnected = 0
+        self.publish_ms = 0.0
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    @property
+    def is_full(self):
+        return len(self._subscribers) >= self.max_subscribers
+
+    # --- Subscribers ---
+    def subscribe(self, websocket, session_id, topics=TOPICS, serializer=JSON):
+        """Registers a WebSocket. Returns None when the hub is full."""
+        if self.is_full:
+            return None
+        subscriber = StreamSubscriber(websocket, session_id, topics, self.send_timeout, serializer)
+        self._subscribers.add(subscriber)
+        subscriber.start(self._drop)
+        return subscriber
+
+    async def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+        await subscriber.stop()
+
+    async def _drop(self, subscriber, code):
+        """Disconnects a subscriber whose sender failed or stalled."""
+        subscriber.closed = True
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            self.disconnected += 1
+        try:
+            # A stalled client may not take the close frame either
+            await asyncio.wait_for(subscriber.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    # --- Publisher ---
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscriber in list(self._subscribers):
+            await self.unsubscribe(subscriber)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                await self.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stream publish failed: {e}")
+            elapsed = loop.time() - started
+            self.publish_ms = round(1000 * elapsed, 2)
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+
+    async def publish(self):
+        """One tick: one snapshot per watched session, offered to every subscriber that has not seen it."""
+        by_session = {}
+        for subscriber in self._subscribers:
+            if not subscriber.closed:
+                by_session.setdefault(subscriber.session_id, []).append(subscriber)
+        if not by_session:
+            return
+        self.ticks += 1
+
+        for session_id, subscribers in by_session.items():
+            snapshot = await self.snapshot_fn(session_id)
+            if snapshot is None:
+                continue
+            header = header_text = None
+            messages = {} # (format, topic set) -> message, shared by subscribers asking the same thing
+            for subscriber in subscribers:
+                sent = (session_id, subscriber.topics, snapshot.version)
+                if subscriber.last_sent == sent:
+                    self.unchanged += 1
+                    continue
+                if header is None:
+                    self.seq += 1
+                    header = {
+                        "type": "snapshot",
+                        "seq": self.seq,
+                        "version": snapshot.version,
+                        "session_id": session_id,
+                        "server_time": snapshot.data.get("server_time"),
+                        "system_status": snapshot.data.get("system_status")
+                    }
+                serializer = subscriber.serializer
+                message_key = (serializer.name, subscriber.topics)
+                message = messages.get(message_key)
+                if message is None:
+                    if serializer is JSON:
+                        # Topics are encoded once per snapshot by the cache;
+                        # the header is left open so they can be appended
+                        if header_text is None:
+                            header_text = encode_json(header)[:-1]
+                        fields = "".join(f',"{topic}":{snapshot.topics[topic]}' for topic in subscriber.topics)
+                        message = header_text + fields + "}"
+                    else:
+                        message = serializer.dumps({**header, **{t: snapshot.data.get(t) for t in subscriber.topics}})
+                    messages[message_key] = message
+                subscriber.last_sent = sent
+                subscriber.offer(message)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "ticks": self.ticks,
+            "seq": self.seq,
+            "unchanged": self.unchanged,
+            "disconnected": self.disconnected,
+            "coalesced": sum(s.coalesced for s in self._subscribers),
+            "publish_ms": self.publish_ms,
+            "interval": self.interval
+        }
@@ -12,6 +12,7 @@ import base64
 import threading
 import serial
 import serial.tools.list_ports
+from sensors.parser import parse_raw_sensor_string
 
 print("[DIAGNOSTIC] Environment OK ✅")
 
@@ -45,28 +46,6 @@ perclos_data = {
     "timestamp": int(time.time())
 }
 
-def parse_raw_sensor_string(raw: str):
-
-    parts = [p.strip() for p in raw.split(',') if p.strip()]
-    parsed = {}
-    for p in parts:
-        if ':' not in p:
-            continue
-        k, v = p.split(':', 1)
-        k, v = k.lower(), v.strip()
-        try:
-            if k in ("t", "temperature"):
-                parsed["temperature"] = float(v)
-            elif k in ("hr", "bpm", "heart_rate"):
-                parsed["hr"] = float(v)
-            elif k in ("spo2", "sp02"):
-                parsed["spo2"] = float(v)
-            elif k in ("ax", "ay", "az", "gx", "gy", "gz"):
-                parsed[k] = float(v)
-        except ValueError:
-            continue
-    return parsed
-
 
 def find_arduino_port():
     ports = list(serial.tools.list_ports.comports())
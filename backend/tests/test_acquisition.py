@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from sensors.acquisition import AcquisitionManager, parse_port_spec
+from sensors.virtual_port import VirtualSerialPort
+
+pytest.importorskip("tty") # Virtual boards are POSIX ptys
+
+
+def seat_source(seat):
+    # Each board reports its own seat number as the heart rate
+    def source():
+        return {"temperature": 36.5, "hr": float(seat), "spo2": 98.0,
+                "ax": 0.0, "ay": 0.0, "az": 9.8, "gx": 0.0, "gy": 0.0, "gz": 0.0}
+    return source
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def test_parse_port_spec():
+    assert parse_port_spec("seat1=/dev/ttyUSB0, /dev/ttyACM1,,") == {"/dev/ttyUSB0": "seat1", "/dev/ttyACM1": None}
+
+
+def test_boards_route_to_their_own_stores_across_hot_plug(rate=200):
+    """
+    Three virtual boards (one binary), then one unplugged and a fourth
+    plugged in: every store sees only its own board's samples, and attach /
+    detach are noticed without a restart.
+    """
+    ports = {}
+    manager = AcquisitionManager(scan=lambda: {device_id: device.port for device_id, device in ports.items()},
+                                 interval=0.2, settle=0.1)
+
+    def plug(seat, protocol="text"):
+        ports[f"seat{seat}"] = VirtualSerialPort(protocol, rate, source=seat_source(seat)).start()
+
+    def samples(seat):
+        store = manager.get(f"seat{seat}")
+        return store.history.query(fields=["hr"])["hr"].tolist() if store else []
+
+    try:
+        for seat, protocol in ((1, "text"), (2, "text"), (3, "binary")):
+            plug(seat, protocol)
+        manager.start()
+        assert wait_for(lambda: all(len(samples(seat)) > 20 for seat in (1, 2, 3)))
+        for seat in (1, 2, 3):
+            assert set(samples(seat)) == {seat}
+
+        ports.pop("seat2").close() # Unplug
+        plug(4) # Hot-plug
+        assert wait_for(lambda: sorted(manager.connected()) == ["seat1", "seat3", "seat4"] and len(samples(4)) > 20)
+        assert set(samples(4)) == {4}
+        assert manager.stats()["attached"] == 4 and manager.stats()["detached"] == 1
+        assert manager.get("seat2") is not None # The store outlives its reader
+    finally:
+        manager.stop()
+        for device in ports.values():
+            device.close()
+
+
+def test_ingest_store_is_created_once_and_capped():
+    manager = AcquisitionManager(scan=dict)
+    store = manager.ingest_store("bridge-a", max_devices=2)
+    assert manager.ingest_store("bridge-a", max_devices=2) is store
+    assert manager.get("bridge-a") is store
+    assert manager.ingest_store("bridge-b", max_devices=2) is not None
+    assert manager.ingest_store("bridge-c", max_devices=2) is None
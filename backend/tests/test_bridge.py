@@ -0,0 +1,165 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import bridge
+from sensors.virtual_port import VirtualSerialPort, encode_text_line
+
+pytest.importorskip("tty") # The virtual Arduino is a POSIX pty
+
+
+@pytest.fixture
+def backend():
+    """Local stand-in for the batch endpoint; .status is what it answers (200 stores the lines)."""
+
+    class StandIn(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            status = server.status
+            if status == 200:
+                server.received.extend(line for _, line in json.loads(gzip.decompress(body))["lines"])
+                server.requests += 1
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"status":"received"}' if status == 200 else b'{"error":"stand-in"}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.status = 200
+    server.received = []
+    server.requests = 0
+    server.endpoint = f"http://127.0.0.1:{server.server_address[1]}/api/sensor_data/ingest/batch"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fast_bridge(monkeypatch):
+    monkeypatch.setattr(bridge, "BATCH_INTERVAL", 0.25)
+    monkeypatch.setattr(bridge, "RETRY_MAX", 1.0)
+    monkeypatch.setattr(bridge, "QUEUE_MAX_BATCHES", 4)
+
+
+@pytest.mark.parametrize("status, retry", [(200, None), (503, True), (429, True), (408, True), (404, False), (415, False)])
+def test_upload_status_classification(backend, status, retry):
+    backend.status = status
+    with requests.Session() as session:
+        if retry is False:
+            with pytest.raises(bridge.BatchRejected) as error:
+                bridge.upload_batch(session, [[1.0, "HR:72"]], backend.endpoint)
+            assert error.value.status_code == status
+        elif retry:
+            assert bridge.upload_batch(session, [[1.0, "HR:72"]], backend.endpoint) is None
+        else:
+            assert bridge.upload_batch(session, [[1.0, "HR:72"]], backend.endpoint) > 0
+
+
+def run_bridge(backend, tmp_path, samples, rate, during=None):
+    """Bridges `samples` lines from a virtual Arduino; during(elapsed) runs while they stream."""
+    with VirtualSerialPort("text", rate, record=True) as device:
+        stop = threading.Event()
+        result = {}
+        runner = threading.Thread(
+            target=lambda: result.update(bridge.bridge(device.port, backend.endpoint, stop, str(tmp_path))),
+            daemon=True
+        )
+        runner.start()
+        time.sleep(2.5) # The bridge waits 2 s for the board to reset
+        device.start(limit=samples)
+        if during:
+            during()
+        device.wait()
+        time.sleep(1.0)
+        stop.set()
+        runner.join(bridge.UPLOAD_TIMEOUT * 2)
+        expected = [encode_text_line(sample).decode().strip() for sample in device.sent]
+    return expected, result
+
+
+def test_outage_delivers_every_line_once_in_order(backend, tmp_path):
+    def outage():
+        time.sleep(1.0)
+        backend.status = 503
+        time.sleep(2.5)
+        backend.status = 200
+
+    expected, stats = run_bridge(backend, tmp_path, samples=1500, rate=300, during=outage)
+    assert backend.received == expected
+    assert stats["upload_failures"] > 0 and stats["lines_spooled"] > 0
+
+
+@pytest.mark.parametrize("status", [400, 413])
+def test_rejected_batches_are_dropped_not_retried(backend, tmp_path, status):
+    def reject():
+        time.sleep(1.0)
+        backend.status = status
+        time.sleep(1.0)
+        backend.status = 200
+
+    expected, stats = run_bridge(backend, tmp_path, samples=900, rate=300, during=reject)
+    assert stats["batches_rejected"] > 0 and stats["upload_failures"] == 0
+    assert len(backend.received) + stats["lines_rejected"] == len(expected)
+    # Whatever was accepted arrived once, in order, and nothing after the rejections was held up
+    remaining = iter(expected)
+    assert all(line in remaining for line in backend.received)
+    assert backend.received[-1] == expected[-1]
+
+
+def spooled(tmp_path, *records):
+    (tmp_path / "spool.jsonl").write_bytes(b"".join(records))
+    return bridge.BatchSpool(str(tmp_path))
+
+
+def test_partial_last_record_is_truncated_on_open(tmp_path):
+    spool = spooled(tmp_path, b'[[1.0,"HR:70"]]\n', b'[[2.0,"HR:7')
+    assert spool.pending == len(b'[[1.0,"HR:70"]]\n')
+    spool.append([[3.0, "HR:72"]])
+    lines, offset = spool.read()
+    assert lines == [[1.0, "HR:70"], [3.0, "HR:72"]]
+    spool.commit(offset)
+    assert spool.pending == 0 and spool.corrupt == 0
+    spool.close()
+
+
+def test_corrupt_records_are_skipped(tmp_path):
+    spool = spooled(tmp_path, b'[[1.0,"HR:70"]]\n', b'\x00\x00garbage\n', b'{"not":"a batch"}\n', b'[[2.0,"HR:71"]]\n')
+    lines, offset = spool.read()
+    assert lines == [[1.0, "HR:70"], [2.0, "HR:71"]] and spool.corrupt == 2
+    spool.commit(offset)
+    assert spool.pending == 0
+    spool.close()
+
+    # Nothing but corrupt records: the spool moves past them instead of stalling
+    spool = spooled(tmp_path, b'garbage\n')
+    assert spool.read() == ([], None)
+    assert spool.pending == 0 and spool.corrupt == 1
+    spool.close()
+
+
+def test_uploader_survives_an_error_and_drains_the_spool(backend, tmp_path, monkeypatch):
+    spool = spooled(tmp_path, b'[[1.0,"HR:70"]]\n', b'[[2.0,"HR:7')
+    failures = iter([RuntimeError("stand-in crash")])
+    upload = bridge.upload_batch
+
+    def flaky_upload(*args):
+        for error in failures:
+            raise error
+        return upload(*args)
+
+    monkeypatch.setattr(bridge, "upload_batch", flaky_upload)
+    monkeypatch.setattr(bridge, "RETRY_MIN", 0.05)
+    forwarder = bridge.StoreAndForward(backend.endpoint, spool).start()
+    forwarder.put([[3.0, "HR:72"]])
+    assert forwarder.flush(5)
+    forwarder.close()
+    assert backend.received == ["HR:70", "HR:72"]
+    assert forwarder.stats["uploader_errors"] == 1
@@ -0,0 +1,102 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from sensors.cardio import CardioMonitor, SlidingWindow
+
+
+def synthetic_rr(count, seed=1):
+    """~70 BPM RR intervals (ms) with respiratory sinus arrhythmia and noise."""
+    rng = random.Random(seed)
+    rr = []
+    t = 0.0
+    for _ in range(count):
+        rr.append(857 + 40 * math.sin(2 * math.pi * t / 4.0) + rng.gauss(0, 15))
+        t += rr[-1] / 1000.0
+    return rr
+
+
+def test_sliding_window_matches_exact_statistics():
+    window = SlidingWindow(60)
+    rng = np.random.default_rng(0)
+    entries = []
+    previous = None
+    for i in range(3000):
+        t, value = i * 0.8, float(rng.normal(850, 40))
+        diff_sq = (value - previous) ** 2 if previous is not None else None
+        window.push(t, value, diff_sq)
+        entries.append((t, value))
+        previous = value
+        if i >= 2 and (i % 97 == 0 or i == 2999):
+            values = np.array([v for s, v in entries if s > t - 60])
+            assert len(window) == len(values)
+            assert window.mean == pytest.approx(values.mean())
+            assert window.sd == pytest.approx(values.std(ddof=1))
+            assert window.rms_diff == pytest.approx(np.sqrt(np.mean(np.diff(values) ** 2)))
+
+
+def test_intervals_give_sdnn_rmssd_and_hr():
+    rr = synthetic_rr(400)
+    monitor = CardioMonitor((30, 300))
+    for i, interval in enumerate(rr):
+        monitor.add_interval(interval, i * 0.86)
+    short, long = monitor.stats(123.0)["windows"]
+    beat_times = np.cumsum(rr) / 1000.0
+    in_window = np.array(rr)[beat_times > beat_times[-1] - 300]
+    assert long["beats"] == len(in_window)
+    assert long["sdnn"] == pytest.approx(np.std(in_window, ddof=1), abs=0.01)
+    assert long["rmssd"] == pytest.approx(np.sqrt(np.mean(np.diff(in_window) ** 2)), abs=0.01)
+    assert long["hr_mean"] == pytest.approx(60000 / in_window.mean(), abs=0.1)
+    assert short["beats"] < long["beats"]
+
+
+def test_artifacts_are_rejected():
+    monitor = CardioMonitor((60,))
+    for i, rr in enumerate([800, 810, 1600, 805, 100, 795, 2500]):
+        monitor.add_interval(rr, i * 0.8)
+    stats = monitor.stats()
+    # 1600 (missed beat), 805 (too far from it), 100 and 2500 (implausible); 795 restarts the sequence
+    assert stats["beats"] == 3 and stats["rejected"] == 4
+    assert stats["windows"][0]["rmssd"] == pytest.approx(10.0)
+
+
+def test_hr_readings_are_sampled_once_per_second():
+    monitor = CardioMonitor((30,))
+    samples = [{"hr": 70.0 + (i % 2)} for i in range(50)] + [{"hr": 0.0}]
+    assert monitor.update_batch(samples, [i * 0.1 for i in range(51)])
+    stats = monitor.stats()
+    assert stats["source"] == "hr" and stats["windows"][0]["readings"] == 5
+    assert stats["windows"][0]["hr_mean"] == 70.0
+
+
+def test_beat_intervals_take_over_from_hr_readings():
+    monitor = CardioMonitor((30,))
+    monitor.update_batch([{"hr": 72.0}], [0.0])
+    assert monitor.update_batch([{"ibi": 800.0}, {"ibi": 810.0}, {"ibi": 790.0}], [1.0, 1.8, 2.6])
+    stats = monitor.stats()
+    assert stats["source"] == "ibi" and stats["beats"] == 3
+    assert stats["windows"][0]["hr_mean"] == pytest.approx(60000 / 800, abs=0.1)
+
+
+def test_pulse_detection_on_raw_ppg():
+    rr = synthetic_rr(600)
+    rate = 100
+    beats = np.cumsum(rr) / 1000.0
+    times = np.arange(0, beats[-1], 1.0 / rate)
+    signal = 512 + 30 * np.sin(2 * np.pi * times / 20) + np.random.default_rng(1).normal(0, 2, len(times))
+    for beat in beats:
+        phase = times - beat
+        # Systolic peak plus a smaller dicrotic wave
+        signal += 40 * np.exp(-(phase / 0.06) ** 2) + 15 * np.exp(-((phase - 0.3) / 0.08) ** 2)
+
+    monitor = CardioMonitor((300,))
+    monitor.update_batch([{"ppg": float(v)} for v in signal], times.tolist())
+    stats = monitor.stats()
+    window = stats["windows"][0]
+    true = rr[-window["beats"]:]
+    assert stats["source"] == "ppg"
+    assert monitor.accepted + monitor.rejected == pytest.approx(len(rr), rel=0.05)
+    assert window["mean_rr"] == pytest.approx(np.mean(true), rel=0.01)
+    assert window["sdnn"] == pytest.approx(np.std(true, ddof=1), rel=0.15)
@@ -0,0 +1,106 @@
+import asyncio
+import operator
+import threading
+import time
+
+import pytest
+
+from cv.executor import EXECUTOR_PROCESS, LoopLagMonitor, VisionExecutor
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        VisionExecutor("gpu")
+
+
+def test_work_runs_off_the_loop_and_is_counted():
+    executor = VisionExecutor(max_workers=2)
+    executor.start()
+
+    async def main():
+        loop_thread = threading.current_thread()
+        worker_thread = await executor.run(threading.current_thread)
+        assert worker_thread is not loop_thread
+        assert await executor.run_blocking(operator.add, 2, 3) == 5
+        # Both workers busy at once: the loop keeps running while they sleep
+        start = time.perf_counter()
+        await asyncio.gather(executor.run(time.sleep, 0.2), executor.run(time.sleep, 0.2))
+        assert time.perf_counter() - start < 0.35
+
+    try:
+        run(main())
+        stats = executor.stats()
+        assert stats["completed"] == 4 and stats["failed"] == 0 and stats["in_flight"] == 0
+        assert stats["mode"] == "thread" and stats["last_task_ms"] >= 150
+    finally:
+        executor.shutdown()
+
+
+def test_errors_propagate_and_are_counted():
+    executor = VisionExecutor()
+    executor.start()
+    try:
+        with pytest.raises(ZeroDivisionError):
+            run(executor.run(operator.truediv, 1, 0))
+        assert executor.stats()["failed"] == 1 and executor.stats()["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_process_pool_runs_picklable_work():
+    executor = VisionExecutor(EXECUTOR_PROCESS, max_workers=1)
+    executor.start()
+    try:
+        assert run(executor.run(operator.mul, 6, 7)) == 42
+        # run_blocking stays in-process
+        assert run(executor.run_blocking(threading.current_thread)).name.startswith("vision")
+    finally:
+        executor.shutdown()
+
+
+def test_shutdown_rejects_new_work():
+    executor = VisionExecutor()
+    with pytest.raises(RuntimeError):
+        run(executor.run(operator.add, 1, 2)) # Not started
+    executor.start()
+    executor.start() # Idempotent
+    executor.shutdown()
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        run(executor.run_blocking(operator.add, 1, 2))
+
+
+def test_loop_lag_monitor_sees_a_blocked_loop():
+    monitor = LoopLagMonitor(interval=0.02)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        quiet = monitor.stats()
+        time.sleep(0.2) # Blocks the loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return quiet
+
+    quiet = run(main())
+    assert quiet["samples"] > 0 and quiet["max_ms"] < 100
+    stats = monitor.stats()
+    assert stats["max_ms"] >= 150 and stats["p99_ms"] >= 150
+    assert stats["samples"] > quiet["samples"]
+    assert monitor._task is None
+
+
+def test_loop_lag_window_is_bounded():
+    monitor = LoopLagMonitor(interval=0.001, window=5)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    run(main())
+    assert monitor.stats()["samples"] == 5
@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from cv.face_roi import (
+    FACE_MIN_PX, choose_decode_scale, crop_to_box, face_box_from_landmarks, full_frame_size,
+    map_landmarks_to_frame, mirror_box, padded_box
+)
+from cv.landmark_metrics import _GATHER
+from cv.pipeline import MIRROR_PAIRS, analyze_frame, mirror_landmarks
+
+
+def jpeg(width, height):
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+class StubMesh:
+    """FaceMesh stand-in: answers from `faces` (landmarks normalized to its input, or None) and records input sizes."""
+
+    def __init__(self, *faces):
+        self.faces = list(faces)
+        self.inputs = []
+
+    def process(self, frame):
+        self.inputs.append(frame.shape[1::-1])
+        face = self.faces.pop(0)
+        return SimpleNamespace(multi_face_landmarks=[face.copy()] if face is not None else None)
+
+
+def face(x0, y0, x1, y1, count=468):
+    """`count` landmarks spread over the box (x0, y0, x1, y1)."""
+    t = np.linspace(0, 1, count)
+    return np.column_stack([x0 + (x1 - x0) * t, y0 + (y1 - y0) * t[::-1], np.full(count, -0.05)])
+
+
+def test_choose_decode_scale():
+    assert choose_decode_scale(None) == 1
+    hint = {"box": (0.2, 0.1, 0.8, 0.9), "width": 1920, "height": 1080}
+    assert choose_decode_scale(hint) == 4 # 0.6 * 1080 px / 4 >= FACE_MIN_PX
+    hint["width"] = hint["height"] = 4 * FACE_MIN_PX
+    assert choose_decode_scale(hint) == 2
+    hint["box"] = (0.4, 0.4, 0.6, 0.6)
+    assert choose_decode_scale(hint) == 1
+
+
+def test_boxes():
+    assert padded_box((0.4, 0.4, 0.6, 0.6), 0.5) == pytest.approx((0.3, 0.3, 0.7, 0.7))
+    assert padded_box((0.0, 0.1, 0.9, 1.0), 0.5) == pytest.approx((0.0, 0.0, 1.0, 1.0))
+    assert mirror_box(mirror_box((0.1, 0.2, 0.3, 0.4))) == pytest.approx((0.1, 0.2, 0.3, 0.4))
+    assert mirror_box((0.1, 0.2, 0.3, 0.4)) == pytest.approx((0.7, 0.2, 0.9, 0.4))
+    assert face_box_from_landmarks(face(0.2, 0.3, 0.5, 0.7)) == pytest.approx((0.2, 0.3, 0.5, 0.7))
+
+
+def test_crop_is_a_view_and_degenerate_boxes_keep_the_frame():
+    frame = np.zeros((480, 640, 3), np.uint8)
+    roi, offset = crop_to_box(frame, (0.25, 0.5, 0.75, 1.0))
+    assert roi.shape == (240, 320, 3) and offset == (160, 240)
+    assert np.shares_memory(roi, frame)
+    assert crop_to_box(frame, (0.5, 0.5, 0.51, 0.51)) == (frame, (0, 0))
+
+
+def test_landmarks_map_back_to_the_same_pixels():
+    frame_size, offset, roi_size = (640, 480), (160, 120), (320, 240)
+    pixels = np.array([[10.0, 20.0], [319.0, 239.0], [0.0, 0.0]])
+    points = np.column_stack([pixels[:, 0] / roi_size[0], pixels[:, 1] / roi_size[1], [0.1, -0.2, 0.0]])
+    mapped = map_landmarks_to_frame(points.copy(), offset, roi_size, frame_size)
+    assert np.allclose(mapped[:, 0] * frame_size[0], pixels[:, 0] + offset[0])
+    assert np.allclose(mapped[:, 1] * frame_size[1], pixels[:, 1] + offset[1])
+    assert np.allclose(mapped[:, 2], points[:, 2] * 0.5) # z follows the width scale
+
+
+def test_full_frame_size_under_reduced_decode():
+    hint = {"width": 641, "height": 481}
+    assert full_frame_size((641, 481), 1, None) == (641, 481)
+    assert full_frame_size((321, 241), 2, hint) == (641, 481)
+    assert full_frame_size((161, 121), 4, hint) == (641, 481)
+    assert full_frame_size((320, 240), 2, hint) is None # Resolution changed
+
+
+@pytest.mark.parametrize("mirror_pixels", [True, False])
+def test_full_frame_search_without_a_hint(mirror_pixels):
+    mesh = StubMesh(face(0.2, 0.3, 0.5, 0.7))
+    result = analyze_frame(jpeg(641, 481), mesh, mirror_pixels=mirror_pixels)
+    assert mesh.inputs == [(641, 481)]
+    assert (result["width"], result["height"]) == (641, 481)
+    roi = result["roi"]
+    # The stand-in answers in its input's coordinates: already mirrored when the pixels were flipped
+    assert roi["box"] == pytest.approx((0.2, 0.3, 0.5, 0.7) if mirror_pixels else (0.5, 0.3, 0.8, 0.7))
+    assert roi["scale"] == 1 and not roi["cropped"]
+
+
+def test_landmark_mirroring_covers_every_metric_landmark():
+    swapped = {index for pair in MIRROR_PAIRS for index in pair}
+    midline = {1, 13, 14, 152} # Nose tip, inner lips, chin
+    assert set(_GATHER.tolist()) <= swapped | midline
+    points = face(0.2, 0.3, 0.5, 0.7)
+    mirrored = mirror_landmarks(points.copy())
+    for a, b in MIRROR_PAIRS:
+        assert mirrored[a, 0] == pytest.approx(1.0 - points[b, 0]) and mirrored[a, 1] == points[b, 1]
+    assert np.allclose(mirror_landmarks(mirrored), points)
+
+
+def test_tracked_face_is_searched_in_a_reduced_crop():
+    hint = {"box": (0.3, 0.1, 0.9, 0.9), "width": 1281, "height": 961, "scale": 1, "cropped": False}
+    mesh = StubMesh(face(0.0, 0.0, 1.0, 1.0))
+    result = analyze_frame(jpeg(1281, 961), mesh, hint)
+    assert (result["width"], result["height"]) == (1281, 961) # Not 4 * 321 x 4 * 241
+    assert result["roi"]["scale"] == 4 and result["roi"]["cropped"]
+    assert len(mesh.inputs) == 1 and mesh.inputs[0] < (321, 241)
+    # The crop's corners land on the padded (mirrored back) hint box
+    x0, y0, x1, y1 = result["roi"]["box"]
+    px0, py0, px1, py1 = padded_box(hint["box"])
+    assert (x0, y0, x1, y1) == pytest.approx((px0, py0, px1, py1), abs=4 / 321)
+
+
+def test_lost_face_costs_one_crop_attempt_then_the_full_frame():
+    hint = {"box": (0.3, 0.1, 0.9, 0.9), "width": 1281, "height": 961, "scale": 1, "cropped": False}
+    mesh = StubMesh(None, face(0.2, 0.3, 0.5, 0.7))
+    result = analyze_frame(jpeg(1281, 961), mesh, hint)
+    assert len(mesh.inputs) == 2 and mesh.inputs[1] == (321, 241)
+    assert not result["roi"]["cropped"]
+
+    mesh = StubMesh(None, None)
+    result = analyze_frame(jpeg(1281, 961), mesh, hint)
+    assert len(mesh.inputs) == 2 and result["landmarks"] is None and result["roi"] is None
+
+
+def test_resolution_change_decodes_again_at_full_size():
+    hint = {"box": (0.3, 0.1, 0.9, 0.9), "width": 1920, "height": 1080, "scale": 1, "cropped": False}
+    mesh = StubMesh(face(0.2, 0.3, 0.5, 0.7))
+    result = analyze_frame(jpeg(1281, 961), mesh, hint)
+    assert mesh.inputs == [(1281, 961)]
+    assert (result["width"], result["height"]) == (1281, 961) and result["roi"]["scale"] == 1
@@ -0,0 +1,66 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from cv.frame_protocol import (
+    FRAME_HEADER, MODE_BINARY, MODE_JSON, RGB_DECODE, SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON,
+    decode_frame_payload, negotiate_mode, pack_frame_header, rgb_decode_flags, split_binary_frame
+)
+
+FRAME = np.random.default_rng(0).integers(0, 255, (48, 64, 3), dtype=np.uint8)
+JPEG = cv2.imencode(".jpg", FRAME)[1].tobytes()
+
+
+def test_header_round_trip():
+    message = pack_frame_header(7, 1.7e12 + 0.5) + JPEG
+    meta, image = split_binary_frame(message)
+    assert meta == {"frame_id": 7, "capture_ts": 1.7e12 + 0.5}
+    assert isinstance(image, memoryview) and image.tobytes() == JPEG
+    assert FRAME_HEADER.size == 16
+    assert split_binary_frame(pack_frame_header(2 ** 32 + 3, 0))[0]["frame_id"] == 3 # Wraps
+
+
+def test_bare_images_have_no_header():
+    meta, image = split_binary_frame(JPEG)
+    assert meta is None and image.tobytes() == JPEG
+    webp = b"RIFF" + bytes(20)
+    assert split_binary_frame(webp)[0] is None
+
+
+@pytest.mark.parametrize("message", [b"FTG1" + bytes(8), b"FTG", b"", b"FTG2" + bytes(12) + JPEG])
+def test_short_or_bad_magic_header_is_not_a_frame_header(message):
+    meta, image = split_binary_frame(message)
+    assert meta is None and image.tobytes() == message
+
+
+def test_decode_binary_and_data_url_payloads():
+    frame, meta = decode_frame_payload(pack_frame_header(1, 2.0) + JPEG)
+    assert frame.shape == FRAME.shape and meta["frame_id"] == 1
+    url = "data:image/jpeg;base64," + base64.b64encode(JPEG).decode()
+    frame, meta = decode_frame_payload(url)
+    assert frame.shape == FRAME.shape and meta is None
+    assert decode_frame_payload(b"")[0] is None
+    assert decode_frame_payload(pack_frame_header(1, 2.0))[0] is None # Header, no image
+    assert decode_frame_payload(b"FTG1" + bytes(8))[0] is None # Truncated header: undecodable
+
+
+@pytest.mark.skipif(not RGB_DECODE, reason="OpenCV can't decode to RGB")
+@pytest.mark.parametrize("flags", [cv2.IMREAD_COLOR, cv2.IMREAD_REDUCED_COLOR_2])
+def test_rgb_decode_matches_bgr_plus_cvtcolor(flags):
+    rgb, _ = decode_frame_payload(JPEG, rgb_decode_flags(flags))
+    bgr, _ = decode_frame_payload(JPEG, flags)
+    np.testing.assert_array_equal(rgb, cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+
+
+@pytest.mark.parametrize("offered, query, expected", [
+    ([SUBPROTOCOL_BINARY], None, (MODE_BINARY, SUBPROTOCOL_BINARY)),
+    ([SUBPROTOCOL_JSON], "binary", (MODE_JSON, SUBPROTOCOL_JSON)), # The subprotocol wins over ?mode=
+    (["chat", SUBPROTOCOL_JSON, SUBPROTOCOL_BINARY], None, (MODE_JSON, SUBPROTOCOL_JSON)), # First supported offer
+    (["chat"], "BINARY", (MODE_BINARY, None)),
+    (None, None, (MODE_JSON, None)),
+    ([], "json", (MODE_JSON, None)),
+])
+def test_subprotocol_selection(offered, query, expected):
+    assert negotiate_mode(offered, query) == expected
@@ -0,0 +1,107 @@
+import asyncio
+
+from cv.frame_scheduler import FrameScheduler
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle(scheduler, timeout=2.0):
+    """Waits until every received frame is accounted for."""
+    async def drained():
+        while scheduler.processed + scheduler.dropped + scheduler.failed < scheduler.received or scheduler.in_flight:
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(drained(), timeout)
+
+
+def test_burst_keeps_only_the_latest_frame():
+    seen = []
+
+    async def process(payload):
+        seen.append(payload)
+        return True
+
+    async def main():
+        scheduler = FrameScheduler(process, target_fps=0)
+        for i in range(5):
+            scheduler.submit(i)
+        scheduler.start()
+        await settle(scheduler)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = run(main())
+    assert seen == [4]
+    assert scheduler.stats()["received"] == 5
+    assert scheduler.processed == 1 and scheduler.dropped == 4 and scheduler.failed == 0
+
+
+def test_frames_arriving_while_busy_are_replaced():
+    seen = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def process(payload):
+            seen.append(payload)
+            if payload == "first":
+                await release.wait()
+            return True
+
+        scheduler = FrameScheduler(process, target_fps=0)
+        scheduler.start()
+        scheduler.submit("first")
+        while not scheduler.in_flight:
+            await asyncio.sleep(0.005)
+        for payload in ("a", "b", "c"):
+            scheduler.submit(payload)
+        release.set()
+        await settle(scheduler)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = run(main())
+    assert seen == ["first", "c"]
+    assert scheduler.processed == 2 and scheduler.dropped == 2
+
+
+def test_declined_frames_are_dropped_and_errors_failed():
+    outcomes = iter([True, False, ValueError("bad frame"), True])
+
+    async def process(payload):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def main():
+        scheduler = FrameScheduler(process, target_fps=0)
+        scheduler.start()
+        for i in range(4):
+            scheduler.submit(i)
+            await settle(scheduler)
+        await scheduler.stop()
+        return scheduler
+
+    stats = run(main()).stats()
+    assert (stats["received"], stats["processed"], stats["dropped"], stats["failed"]) == (4, 2, 1, 1)
+
+
+def test_rate_follows_the_slower_of_target_and_latency():
+    async def main():
+        async def process(payload):
+            await asyncio.sleep(0.05)
+            return True
+
+        scheduler = FrameScheduler(process, target_fps=100, latency_alpha=1.0)
+        assert scheduler.interval == 0.01
+        scheduler.start()
+        scheduler.submit(0)
+        await settle(scheduler)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = run(main())
+    assert scheduler.interval >= 0.045 # Pipeline latency, not the 10 ms target
+    assert scheduler.stats()["max_fps"] <= 22
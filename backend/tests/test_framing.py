@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from sensors.framing import (
+    BinaryFramer, LineFramer, cobs_decode, cobs_encode, decode_frames, detect_protocol, encode_sample_frame
+)
+from sensors.virtual_port import encode_text_line, random_sample
+
+
+def binary_stream(count, seed=0):
+    random.seed(seed)
+    return b"".join(encode_sample_frame(random_sample(), tick) for tick in range(count))
+
+
+def text_stream(count, seed=0):
+    random.seed(seed)
+    return b"".join(encode_text_line(random_sample()) for _ in range(count))
+
+
+def first_decision(data):
+    """Feeds `data` byte by byte, as slow reads would; returns (protocol, bytes needed)."""
+    for n in range(1, len(data) + 1):
+        detected = detect_protocol(data[:n])
+        if detected is not None:
+            return detected, n
+    return None, len(data)
+
+
+@pytest.mark.parametrize("data", [b"", b"\x00" * 10, bytes(range(1, 256)), b"\xff\x00\x05abc\x00"])
+def test_cobs_round_trip(data):
+    assert cobs_decode(cobs_encode(data)) == data
+    assert b"\x00" not in cobs_encode(data)
+
+
+def test_binary_framer_resynchronizes_after_corruption():
+    frames = [encode_sample_frame(random_sample(), tick) for tick in range(6)]
+    corrupted = bytearray(frames[2])
+    corrupted[10] ^= 0xFF
+    framer = BinaryFramer()
+    payloads = framer.feed(b"".join(frames[:2]) + bytes(corrupted) + b"".join(frames[3:]))
+    assert decode_frames(payloads)["tick"].tolist() == [0, 1, 3, 4, 5]
+    assert framer.crc_errors + framer.bad_frames == 1
+
+
+def test_line_framer_keeps_partial_lines():
+    framer = LineFramer()
+    assert framer.feed(b"T:36.5, H") == []
+    assert framer.feed(b"R:72\r\nT:36") == [b"T:36.5, HR:72\r"]
+
+
+def test_detection_from_a_random_byte_offset():
+    """
+    A port opened mid-stream starts at an arbitrary byte. Binary frames
+    contain stray 0x0A bytes, which used to lock such a port into text mode.
+    """
+    binary, text = binary_stream(200), text_stream(200)
+    rng = random.Random(1)
+    for _ in range(300):
+        detected, needed = first_decision(binary[rng.randrange(len(binary) // 2):])
+        assert detected == "binary"
+        assert needed <= 2 * 47 # Within the first complete frame after the offset
+    for _ in range(100):
+        detected, _ = first_decision(text[rng.randrange(len(text) // 2):])
+        assert detected == "text"
+
+
+def test_noise_stays_undecided():
+    noise = bytes(random.Random(2).randrange(1, 256) for _ in range(4096)).replace(b"\n", b"")
+    assert detect_protocol(noise) is None
+    assert detect_protocol(b"boot\nready\nAT OK\nready\n") is None
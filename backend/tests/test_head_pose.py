@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+from cv.head_pose import MODEL_POINTS, HeadPoseSolver
+
+W, H = 640, 480
+CAMERA = np.array([[W, 0, W / 2], [0, W, H / 2], [0, 0, 1]], dtype="double")
+
+
+def project(pitch, yaw, roll=0.0):
+    """Image points of MODEL_POINTS for a head rotated by the given angles (degrees)."""
+    rmat = cv2.Rodrigues(np.radians([pitch, 0.0, 0.0]))[0] @ cv2.Rodrigues(np.radians([0.0, yaw, 0.0]))[0] \
+        @ cv2.Rodrigues(np.radians([0.0, 0.0, roll]))[0]
+    rvec = cv2.Rodrigues(rmat)[0]
+    points, _ = cv2.projectPoints(MODEL_POINTS, rvec, np.array([0.0, 0.0, 2000.0]), CAMERA, np.zeros((4, 1)))
+    return points.reshape(6, 2)
+
+
+def cold_solve(points):
+    _, rvec, _ = cv2.solvePnP(MODEL_POINTS, points, CAMERA, np.zeros((4, 1)), flags=cv2.SOLVEPNP_ITERATIVE)
+    return cv2.RQDecomp3x3(cv2.Rodrigues(rvec)[0])[0]
+
+
+def angle_diff(a, b):
+    # RQDecomp3x3 may report the same rotation as +179 or -181
+    return np.abs((np.subtract(a, b) + 180) % 360 - 180).max()
+
+
+def test_warm_solves_match_cold_solves():
+    solver = HeadPoseSolver(epsilon=0.0, calibration={})
+    for t in range(60):
+        points = project(10 * np.sin(t / 10), 20 * np.sin(t / 15), 5 * np.sin(t / 7))
+        assert angle_diff(solver.solve(points, W, H), cold_solve(points)) < 0.01
+    assert solver.solves == 60 and solver.skips == 0
+
+
+def test_still_head_skips_the_solve():
+    solver = HeadPoseSolver(epsilon=0.5, calibration={})
+    points = project(5, -10)
+    first = solver.solve(points, W, H)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        assert solver.solve(points + rng.uniform(-0.2, 0.2, points.shape), W, H) == first
+    assert solver.solves == 1 and solver.skips == 20
+
+
+def test_frame_size_change_forces_a_solve():
+    solver = HeadPoseSolver(epsilon=0.5, calibration={})
+    points = project(0, 15)
+    solver.solve(points, W, H)
+    solver.solve(points, W // 2, H // 2)
+    assert solver.solves == 2
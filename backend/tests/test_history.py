@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+import pytest
+
+from sensors.history import SensorHistory, to_records
+
+
+def filled(capacity, timestamps):
+    history = SensorHistory(capacity)
+    for t in timestamps:
+        history.append({"hr": float(t), "temperature": 36.5}, t)
+    return history
+
+
+def test_range_query_across_the_ring_wrap():
+    history = filled(8, range(20))
+    assert len(history) == 8
+    assert history.query()["timestamp"].tolist() == list(range(12, 20))
+    rows = history.query(since=13, until=17, fields=["hr"])
+    assert rows["timestamp"].tolist() == [13, 14, 15, 16, 17]
+    assert rows["hr"].tolist() == [13, 14, 15, 16, 17]
+    assert set(rows) == {"timestamp", "hr"}
+
+
+def test_limit_keeps_the_newest_rows():
+    history = filled(16, range(10))
+    assert history.query(limit=3)["timestamp"].tolist() == [7, 8, 9]
+    assert len(history.query(limit=0)["timestamp"]) == 0
+    with pytest.raises(ValueError):
+        history.query(limit=-1)
+
+
+def test_out_of_order_timestamps_are_clamped():
+    history = filled(8, [10, 11, 5, 12, 3, 13])
+    rows = history.query(fields=["hr"])
+    assert rows["timestamp"].tolist() == [10, 11, 11, 12, 12, 13]
+    assert rows["hr"].tolist() == [10, 11, 5, 12, 3, 13] # Arrival order
+    assert history.query(since=12)["hr"].tolist() == [12, 3, 13]
+    assert history.stats()["clamped"] == 2
+
+
+def test_out_of_order_timestamps_across_the_ring_wrap():
+    rng = np.random.default_rng(0)
+    timestamps = np.cumsum(rng.uniform(-0.5, 1.0, 200))
+    history = filled(64, timestamps)
+    stored = history.query()["timestamp"]
+    assert (np.diff(stored) >= 0).all()
+    since, until = stored[10], stored[40]
+    rows = history.query(since=since, until=until)["timestamp"]
+    assert rows.tolist() == [t for t in stored if since <= t <= until]
+
+
+def test_downsampling_averages_buckets_ignoring_missing_values():
+    history = SensorHistory(16)
+    history.append({"hr": 60.0}, 0.1)
+    history.append({"hr": 70.0}, 0.6)
+    history.append({}, 0.9)
+    history.append({"hr": 80.0}, 1.2)
+    rows = history.query(fields=["hr", "spo2"], step=1.0)
+    assert rows["timestamp"].tolist() == [0.0, 1.0]
+    assert rows["hr"].tolist() == [65.0, 80.0]
+    assert np.isnan(rows["spo2"]).all()
+
+
+def test_records_use_none_for_missing_values():
+    history = SensorHistory(4)
+    history.append({"temperature": 36.6}, 1.0)
+    (record,) = history.tail(1)
+    assert record["temperature"] == 36.6 and record["hr"] is None and record["timestamp"] == 1.0
+    assert to_records({}) == []
+
+
+def test_clear_resets_the_clamp():
+    history = filled(4, [100, 101])
+    history.clear()
+    history.append({"hr": 1.0}, 5)
+    assert history.query()["timestamp"].tolist() == [5]
+    assert not math.isnan(history.query()["hr"][0])
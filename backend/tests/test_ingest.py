@@ -0,0 +1,45 @@
+import gzip
+import json
+
+import pytest
+
+from sensors.ingest import IngestError, decode_body, parse_batch
+
+
+def batch(**payload):
+    return json.dumps(payload).encode("utf-8")
+
+
+def test_parse_batch_returns_device_and_samples():
+    data = batch(device_id="seat1", lines=[[1.5, "T:36.5, HR:72"], "HR:80", [2.0, "noise"], 42])
+    device_id, samples, timestamps, received = parse_batch(data)
+    assert device_id == "seat1"
+    assert samples == [{"temperature": 36.5, "hr": 72.0}, {"hr": 80.0}]
+    assert timestamps[0] == 1.5 and isinstance(timestamps[1], float)
+    assert received == 4
+
+
+def test_missing_device_id_is_none():
+    assert parse_batch(batch(lines=[]))[0] is None
+    assert parse_batch(batch(device_id="", lines=[]))[0] is None
+
+
+@pytest.mark.parametrize("data, status", [
+    (b"{not json", 400),
+    (batch(rows=[]), 400),
+    (batch(device_id=7, lines=[]), 400),
+    (batch(device_id="x" * 500, lines=[]), 400),
+    (batch(lines=["HR:1"] * 11), 413)
+])
+def test_rejected_batches(data, status):
+    with pytest.raises(IngestError) as error:
+        parse_batch(data, max_lines=10)
+    assert error.value.status_code == status
+
+
+def test_gzip_body_is_capped_after_decompression():
+    body = batch(lines=["HR:72"] * 1000)
+    assert decode_body(gzip.compress(body), "gzip") == body
+    with pytest.raises(IngestError) as error:
+        decode_body(gzip.compress(body), "gzip", max_bytes=len(body) - 1)
+    assert error.value.status_code == 413
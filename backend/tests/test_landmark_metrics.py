@@ -0,0 +1,65 @@
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from mediapipe.framework.formats import landmark_pb2
+
+from cv.landmark_metrics import (
+    LEFT_EYE, MOUTH_INNER, NOSE_TIP, PNP_POINTS, RIGHT_EYE, compute_metrics, landmarks_to_array, stack_landmarks
+)
+
+W, H = 640, 480
+
+
+def random_points(seed):
+    return np.random.default_rng(seed).random((468, 3))
+
+
+def reference(points):
+    """The per-landmark list / math.dist computation the array engine replaced."""
+    pixels = [(x * W, y * H) for x, y, _ in points]
+
+    def ear(indices):
+        eye = [pixels[i] for i in indices]
+        return (math.dist(eye[1], eye[5]) + math.dist(eye[2], eye[4])) / (2.0 * math.dist(eye[0], eye[3]))
+
+    mouth = [pixels[i] for i in MOUTH_INNER]
+    return ear(LEFT_EYE), ear(RIGHT_EYE), math.dist(mouth[0], mouth[1]) / math.dist(mouth[2], mouth[3])
+
+
+def test_metrics_match_scalar_reference():
+    points = random_points(0)
+    left, right, mar = reference(points)
+    metrics = compute_metrics(points, W, H)
+    assert metrics.left_ear == pytest.approx(left)
+    assert metrics.right_ear == pytest.approx(right)
+    assert metrics.ear == pytest.approx((left + right) / 2)
+    assert metrics.mar == pytest.approx(mar)
+    np.testing.assert_allclose(metrics.nose, points[NOSE_TIP, :2])
+    np.testing.assert_allclose(metrics.image_points, points[PNP_POINTS, :2] * (W, H))
+
+
+def test_batched_metrics_match_per_frame():
+    frames = [random_points(seed) for seed in range(5)]
+    batch = compute_metrics(stack_landmarks(frames), W, H)
+    for i, points in enumerate(frames):
+        single = compute_metrics(points, W, H)
+        assert batch.ear[i] == pytest.approx(single.ear)
+        assert batch.mar[i] == pytest.approx(single.mar)
+
+
+def test_degenerate_eye_gives_zero_ratio():
+    points = random_points(1)
+    points[LEFT_EYE[3]] = points[LEFT_EYE[0]] # Zero-width eye
+    assert compute_metrics(points, W, H).left_ear == 0.0
+
+
+def test_landmark_list_and_sequence_conversion_agree():
+    points = random_points(2).astype(np.float32).astype(np.float64)
+    proto = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in points:
+        proto.landmark.add(x=x, y=y, z=z)
+    np.testing.assert_array_equal(landmarks_to_array(proto), points)
+    per_field = [SimpleNamespace(x=x, y=y, z=z) for x, y, z in points]
+    np.testing.assert_array_equal(landmarks_to_array(per_field), points)
@@ -0,0 +1,86 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from ml.ml_engine import FEATURE_NAMES, MLEngine
+
+
+def training_data(columns=FEATURE_NAMES, rows=600):
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(rng.normal(0, 10, (rows, len(columns))), columns=list(columns))
+    y = (X["perclos"] > 5).astype(int) + (X["ear_mean"] > 5).astype(int)
+    return X, y
+
+
+def feature_rows(count=50):
+    return np.random.default_rng(1).normal(0, 10, (count, len(FEATURE_NAMES)))
+
+
+def expected_proba(model, row):
+    names = list(model.feature_names_in_)
+    return model.predict_proba(pd.DataFrame(row[None, [FEATURE_NAMES.index(n) for n in names]], columns=names))[0]
+
+
+@pytest.mark.parametrize("forest", [RandomForestClassifier, ExtraTreesClassifier])
+def test_forest_path_matches_model_predict_proba(forest):
+    model = forest(n_estimators=25, max_depth=8, random_state=0).fit(*training_data())
+    engine = MLEngine(model=model)
+    assert engine._trees is not None
+    for row in feature_rows():
+        assert np.allclose(engine.predict_proba(row[None, :]), expected_proba(model, row))
+
+
+def test_model_column_order_is_followed():
+    X, y = training_data(FEATURE_NAMES[::-1])
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    engine = MLEngine(model=model)
+    assert engine._trees is not None
+    for row in feature_rows():
+        assert np.allclose(engine.predict_proba(row[None, :]), expected_proba(model, row))
+
+
+def test_other_models_use_predict_proba_with_named_input():
+    model = LogisticRegression(max_iter=1000).fit(*training_data())
+    engine = MLEngine(model=model)
+    assert engine._trees is None
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for row in feature_rows():
+            assert np.allclose(engine.predict_proba(row[None, :]), expected_proba(model, row))
+
+
+def test_forest_failing_the_parity_check_falls_back(capsys):
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(*training_data())
+    # A model whose predict_proba does more than average its trees
+    forest_proba = model.predict_proba
+    model.predict_proba = lambda X: forest_proba(X)[:, ::-1]
+    engine = MLEngine(model=model)
+    assert engine._trees is None
+    assert "fast path disabled" in capsys.readouterr().out
+    row = feature_rows(1)[0]
+    assert np.allclose(engine.predict_proba(row[None, :]), expected_proba(model, row))
+
+
+def test_predict_emits_no_warnings():
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(*training_data())
+    engine = MLEngine(model=model)
+    vision = {"status": "Active", "ear": 0.3, "mar": 0.1, "closed_frames": 0, "perclos": 12.0,
+              "head_angle_x": 3.0, "head_angle_y": -2.0}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for _ in range(30):
+            result = engine.predict({"hr": 72.0, "temperature": 36.6}, vision)
+    assert result["status"] in ("Alert", "Drowsy", "Fatigued")
+    assert np.isclose(sum(result["raw_probs"]), 1.0, atol=0.02)
+
+
+def test_mismatched_features_leave_no_model(capsys):
+    X, y = training_data()
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X.rename(columns={"perclos": "blinks"}), y)
+    engine = MLEngine(model=model)
+    assert engine.model is None
+    assert engine.predict({}, {"status": "Active"})["status"] == "Unknown"
@@ -0,0 +1,73 @@
+import math
+import random
+
+import pytest
+
+from sensors.orientation import OrientationFilter, classify_head_position, spread_read_times
+
+G = 9.80665
+
+
+def still_stream(pitch_deg, samples, noise=0.3, bias=(0.02, -0.01, 0.03), seed=0):
+    rng = random.Random(seed)
+    pitch = math.radians(pitch_deg)
+    return [{
+        "ax": -G * math.sin(pitch) + rng.gauss(0, noise),
+        "ay": rng.gauss(0, noise),
+        "az": G * math.cos(pitch) + rng.gauss(0, noise),
+        "gx": bias[0] + rng.gauss(0, 0.01), "gy": bias[1] + rng.gauss(0, 0.01), "gz": bias[2] + rng.gauss(0, 0.01)
+    } for _ in range(samples)]
+
+
+def test_still_biased_imu_settles_on_the_true_pitch(rate=200):
+    stream = still_stream(15, 60 * rate)
+    fused = OrientationFilter()
+    angles = []
+    for i, sample in enumerate(stream):
+        fused.update_sample(sample, i / rate)
+        angles.append(fused.angles())
+    settled = [a[0] for a in angles[len(angles) // 2:]]
+    raw = [math.degrees(math.atan2(s["ax"], math.hypot(s["ay"], s["az"]))) for s in stream[len(stream) // 2:]]
+    mean = sum(settled) / len(settled)
+    spread = math.sqrt(sum((v - mean) ** 2 for v in settled) / len(settled))
+    raw_mean = sum(raw) / len(raw)
+    raw_spread = math.sqrt(sum((v - raw_mean) ** 2 for v in raw) / len(raw))
+    assert mean == pytest.approx(-15, abs=0.5)
+    assert spread < raw_spread / 3
+    # Integrating the 0.03 rad/s z bias for 60 s would give ~100 deg; it is learned / recentered instead
+    assert abs(angles[-1][1]) < 5
+
+
+def test_gyro_rotation_is_integrated():
+    fused = OrientationFilter(tau=1e6, yaw_recenter=0) # Gyro only
+    rate = 100
+    for i in range(rate + 1): # 1 s turning at 0.5 rad/s about z
+        fused.update_sample({"ax": 0.0, "ay": 0.0, "az": G, "gx": 0.0, "gy": 0.0, "gz": 0.5}, i / rate)
+    assert fused.angles()[1] == pytest.approx(math.degrees(0.5), abs=0.5)
+
+
+def test_device_ticks_set_dt_and_wrap():
+    fused = OrientationFilter(tau=1e6, yaw_recenter=0)
+    sample = {"ax": 0.0, "ay": 0.0, "az": G, "gx": 0.0, "gy": 0.0, "gz": 1.0}
+    fused.update_sample({**sample, "tick": 0xFFFFFF00}, 0.0)
+    fused.update_sample({**sample, "tick": 0x100}, 0.0) # 512 ms later, across the wrap; read times equal
+    assert fused.angles()[1] == pytest.approx(math.degrees(0.512), abs=0.1)
+
+
+def test_samples_without_accelerometer_are_ignored():
+    fused = OrientationFilter()
+    assert not fused.update_batch([{"hr": 70.0}], [0.0])
+    assert fused.samples == 0
+
+
+def test_classify_head_position():
+    assert classify_head_position(0, 0) == "Center"
+    assert classify_head_position(15, 0) == "Up"
+    assert classify_head_position(-15, 15) == "Down-Right"
+    assert classify_head_position(0, -15) == "Left"
+
+
+def test_spread_read_times():
+    assert spread_read_times(None, 10.0, 2) == [10.0, 10.0]
+    assert spread_read_times(9.0, 10.0, 4) == [9.25, 9.5, 9.75, 10.0]
+    assert spread_read_times(5.0, 10.0, 2) == [10.0, 10.0] # Gap too long
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+
+from sensors.parser import FIELDS, SensorLineParser
+
+LINE = "T:36.50, HR:72, SpO2:98.0, Ax:0.12, Ay:-0.40, Az:9.79, Gx:0.01, Gy:-0.02, Gz:0.00"
+EXPECTED = {"temperature": 36.5, "hr": 72.0, "spo2": 98.0, "ax": 0.12, "ay": -0.4, "az": 9.79,
+            "gx": 0.01, "gy": -0.02, "gz": 0.0}
+
+
+def test_first_line_learns_the_layout():
+    parser = SensorLineParser()
+    assert parser.parse(LINE) == EXPECTED
+    assert (parser.fast, parser.slow) == (0, 1)
+    assert parser.parse(LINE) == EXPECTED
+    assert parser.fast == 1
+
+
+def test_aliases_and_bad_values_fall_back_to_the_general_path():
+    parser = SensorLineParser()
+    parser.parse(LINE)
+    assert parser.parse("temperature:36.6, BPM:80, sp02:97") == {"temperature": 36.6, "hr": 80.0, "spo2": 97.0}
+    bad = parser.parse(LINE.replace("HR:72", "HR:--"))
+    assert "hr" not in bad and bad["temperature"] == 36.5
+    assert parser.parse("garbage") == {}
+
+
+def test_beat_interval_lines_do_not_become_the_layout():
+    parser = SensorLineParser()
+    assert parser.parse("IBI:812") == {"ibi": 812.0}
+    assert parser.parse(LINE) == EXPECTED
+    assert parser.parse(LINE) == EXPECTED
+    assert parser.fast == 1
+
+
+def test_parse_lines_matches_parse():
+    lines = [LINE, LINE.replace("72", "75"), "T:36.7, HR:x", "noise", "IBI:800", LINE]
+    reference = SensorLineParser()
+    expected = [reference.parse(line) for line in lines]
+    out = SensorLineParser().parse_lines(lines)
+    assert out.dtype.names == FIELDS
+    for row, parsed in zip(out, expected):
+        for field in FIELDS:
+            value = row[field]
+            if field in parsed:
+                assert value == parsed[field]
+            else:
+                assert math.isnan(value)
+
+
+def test_parse_lines_with_a_bad_value_only_loses_that_field():
+    lines = [LINE] * 3 + [LINE.replace("SpO2:98.0", "SpO2:?")]
+    out = SensorLineParser().parse_lines(lines)
+    assert np.isnan(out["spo2"][3]) and out["hr"][3] == 72.0
+    assert (out["spo2"][:3] == 98.0).all()
+
+
+def test_parse_lines_learns_the_layout_past_a_partial_first_line():
+    lines = ["garbage", LINE[LINE.index("Ay:"):], LINE, LINE.replace("72", "75"), LINE]
+    parser = SensorLineParser()
+    out = parser.parse_lines(lines)
+    assert all(math.isnan(out[field][0]) for field in FIELDS)
+    assert out["ay"][1] == EXPECTED["ay"] and math.isnan(out["hr"][1])
+    assert out["hr"].tolist()[2:] == [72.0, 75.0, 72.0]
+    assert parser.fast == 2
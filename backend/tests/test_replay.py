@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from sensors.replay import ReplaySource, load_csv, parse_speed, resolve_dataset
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = tmp_path / "recording.csv"
+    rows = ["timestamp,temp,HR,acc_x,label"]
+    # 0.5 s steps, one gap longer than MAX_GAP and one clock jump backwards
+    for t, hr in ((100.0, 70), (100.5, 71), (101.0, 72), (200.0, 73), (150.0, 74), (150.5, "")):
+        rows.append(f"{t},36.5,{hr},0.1,x")
+    rows.append("151.0,,,,x") # No sensor values: skipped
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+def test_load_csv_maps_columns_and_timing(recording):
+    offsets, samples = load_csv(recording, rate=10.0)
+    assert samples[0] == {"temperature": 36.5, "hr": 70.0, "ax": 0.1}
+    assert "hr" not in samples[5] and len(samples) == 6
+    # Gaps and backward jumps advance at the nominal rate
+    assert offsets == pytest.approx([0.0, 0.5, 1.0, 1.1, 1.2, 1.7])
+
+
+def test_parse_speed():
+    assert parse_speed("10x") == 10.0
+    assert parse_speed("") == 1.0
+    assert parse_speed("max") is None and parse_speed("0") is None and parse_speed("inf") is None
+
+
+def test_unknown_dataset():
+    with pytest.raises(FileNotFoundError):
+        resolve_dataset("no_such_dataset")
+
+
+def test_max_speed_replay_is_deterministic(recording):
+    runs = []
+    for _ in range(2):
+        emitted = []
+        source = ReplaySource(recording, speed=None)
+        assert source.run(emitted.extend, max_batch=4) == 6
+        assert source.stats["batches"] == 2
+        runs.append(emitted)
+    assert runs[0] == runs[1] == load_csv(recording)[1]
+
+
+def test_paced_replay_follows_the_schedule(recording):
+    source = ReplaySource(recording, speed=10.0) # 1.7 s of recording in 0.17 s
+    emitted = []
+    start = time.perf_counter()
+    source.run(lambda samples: emitted.append((time.perf_counter() - start, len(samples))))
+    assert sum(count for _, count in emitted) == 6
+    assert emitted[-1][0] == pytest.approx(0.17, abs=0.05)
+    assert source.stats["max_lag_ms"] < 50
+
+
+def test_loop_until_stopped(recording):
+    source = ReplaySource.from_spec(f"replay:{recording}@max")
+    stop = threading.Event()
+    count = []
+
+    def emit(samples):
+        count.append(len(samples))
+        if len(count) >= 10:
+            stop.set()
+
+    source.run(emit, stop)
+    assert source.loop and source.stats["loops"] >= 2
@@ -0,0 +1,81 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.rolling import RollingStats, rolling_features
+
+
+def test_matches_recompute_over_a_long_run():
+    rng = np.random.default_rng(0)
+    data = np.column_stack([rng.normal(0.3, 0.03, 5000), rng.normal(72, 4, 5000), rng.normal(1e4, 1, 5000)])
+    stats = RollingStats(("ear", "hr", "offset"), 20)
+    history = deque(maxlen=20)
+    for row in data.tolist():
+        stats.add(row)
+        history.append(row)
+        assert len(stats) == len(history)
+        matrix = np.array(history)
+        assert np.allclose(stats.means(), matrix.mean(axis=0), rtol=0, atol=1e-9)
+        assert np.allclose(stats.stds(), matrix.std(axis=0), rtol=0, atol=1e-7)
+    assert stats.mean("hr") == pytest.approx(data[-20:, 1].mean())
+
+
+@pytest.mark.parametrize("window", [1, 5, 20])
+def test_rolling_features_match_pandas(window):
+    rng = np.random.default_rng(1)
+    data = rng.normal(0, 5, (300, 4))
+    data[rng.random(data.shape) < 0.1] = np.nan
+    means, stds = rolling_features(data, window)
+    frame = pd.DataFrame(data).rolling(window, min_periods=1)
+    assert np.allclose(means, frame.mean().to_numpy(), equal_nan=True)
+    assert np.allclose(stds, frame.std().to_numpy(), equal_nan=True)
+
+
+def test_missing_values_are_not_counted():
+    stats = RollingStats(("a", "b"), 3)
+    for row in ([1.0, math.nan], [2.0, math.nan], [3.0, 4.0]):
+        stats.add(row)
+    assert stats.count("a") == 3 and stats.count("b") == 1
+    assert stats.mean("b") == 4.0 and stats.std("b") == 0.0
+    stats.add([math.nan, math.nan])
+    stats.add([math.nan, math.nan])
+    stats.add([math.nan, math.nan])
+    assert stats.count("a") == 0
+    assert math.isnan(stats.mean("a")) and math.isnan(stats.std("a"))
+
+
+def test_sample_std_needs_two_values():
+    stats = RollingStats(1, 5, ddof=1)
+    stats.add([2.0])
+    assert math.isnan(stats.std(0))
+    stats.add([4.0])
+    assert stats.std(0) == pytest.approx(math.sqrt(2))
+
+
+def test_valid_mean_skips_readings_at_or_below_the_bound():
+    stats = RollingStats(("hr", "ear"), 4, valid_min={"hr": 0})
+    assert stats.valid_mean("hr", 75.0) == 75.0
+    for hr in (70.0, 0.0, 80.0, 0.0):
+        stats.add([hr, 0.3])
+    assert stats.valid_count("hr") == 2
+    assert stats.valid_mean("hr") == 75.0
+    assert stats.mean("hr") == 37.5
+    for _ in range(4):
+        stats.add([0.0, 0.3])
+    assert stats.valid_count("hr") == 0
+    assert stats.valid_mean("hr", 75.0) == 75.0
+
+
+def test_clear_empties_the_window():
+    stats = RollingStats(2, 3, valid_min={0: 0})
+    for i in range(10):
+        stats.add([i + 1.0, -i])
+    stats.clear()
+    assert len(stats) == 0
+    assert all(math.isnan(m) for m in stats.means())
+    assert stats.valid_mean(0) is None
+    stats.add([5.0, 1.0])
+    assert stats.means() == [5.0, 1.0] and stats.stds() == [0.0, 0.0]
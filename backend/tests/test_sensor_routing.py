@@ -0,0 +1,43 @@
+import pytest
+
+import server
+from sensors.acquisition import AcquisitionManager
+from sensors.store import SensorStore
+from sessions import DEFAULT_SESSION_ID
+
+
+@pytest.fixture
+def acquisition(monkeypatch, tmp_path):
+    manager = AcquisitionManager(scan=dict, settle=0)
+    monkeypatch.setattr(server, "acquisition", manager)
+    # A default store no local board has fed
+    monkeypatch.setattr(server, "default_store", SensorStore(server.default_store.device_id))
+    recording = tmp_path / "recording.csv"
+    recording.write_text("timestamp,temp,HR\n" + "".join(f"{t},36.5,70\n" for t in range(20)))
+    manager.recording = str(recording)
+    yield manager
+    manager.stop()
+
+
+class Session:
+    def __init__(self, session_id):
+        self.id = session_id
+
+
+def test_a_session_replay_is_not_the_default_store(acquisition):
+    replay = acquisition.add_replay("driverX", acquisition.recording)
+    default_session = Session(DEFAULT_SESSION_ID)
+    assert server._sensor_store_for(default_session) is server.default_store
+    assert server._resolve_sensor_store(None) is server.default_store
+    assert server._sensor_store_for(Session("driverX")) is replay
+    assert server._resolve_sensor_store("driverX") is replay
+
+
+def test_a_single_bridge_stays_the_default_store_next_to_replays(acquisition):
+    bridge = acquisition.ingest_store("cab1")
+    assert server._resolve_sensor_store(None) is bridge
+    acquisition.add_replay("driverX", acquisition.recording)
+    assert server._sensor_store_for(Session(DEFAULT_SESSION_ID)) is bridge
+    assert server._resolve_sensor_store(None) is bridge
+    acquisition.remove_replay("driverX")
+    assert server._resolve_sensor_store(None) is bridge
@@ -0,0 +1,95 @@
+import random
+import threading
+
+import pytest
+
+from sensors.framing import encode_sample_frame
+from sensors.serial_reader import REDETECT_FAILURES, read_bulk
+from sensors.virtual_port import encode_text_line
+
+SAMPLES = [
+    {"temperature": 36.5 + i / 100, "hr": 60.0 + i, "spo2": 98.0, "ax": 0.1, "ay": -0.2, "az": 9.8,
+     "gx": 0.01, "gy": 0.02, "gz": -0.03}
+    for i in range(50)
+]
+
+
+class FakeSerial:
+    """Serves `data` in reads of `chunk` bytes, then stops the reader."""
+
+    def __init__(self, data, chunk, stop):
+        self.data = data
+        self.chunk = chunk
+        self.stop = stop
+        self.position = 0
+
+    @property
+    def in_waiting(self):
+        return 0 # One read per chunk, so frames get split across reads
+
+    def read(self, size=1):
+        if self.position >= len(self.data):
+            self.stop.set()
+            return b""
+        chunk = self.data[self.position:self.position + self.chunk]
+        self.position += len(chunk)
+        return chunk
+
+
+def read_all(data, protocol, chunk=7):
+    stop = threading.Event()
+    received = []
+    read_bulk(FakeSerial(data, chunk, stop), received.extend, stop, protocol)
+    return received
+
+
+def assert_samples_equal(received, sent):
+    assert len(received) == len(sent)
+    for got, expected in zip(received, sent):
+        for field, value in expected.items():
+            assert got[field] == pytest.approx(value, abs=1e-3)
+
+
+def test_text_lines_split_across_reads():
+    data = b"".join(encode_text_line(sample) for sample in SAMPLES)
+    assert_samples_equal(read_all(data, "text"), SAMPLES)
+
+
+def test_binary_frames_split_across_reads():
+    data = b"".join(encode_sample_frame(sample, tick) for tick, sample in enumerate(SAMPLES))
+    received = read_all(data, "binary")
+    assert_samples_equal(received, SAMPLES)
+    assert [sample["tick"] for sample in received] == list(range(len(SAMPLES)))
+
+
+def test_binary_bursts_use_the_batch_decoder():
+    # >= 8 frames in one read take the NumPy path, fewer the struct path
+    data = b"".join(encode_sample_frame(sample, tick) for tick, sample in enumerate(SAMPLES))
+    assert_samples_equal(read_all(data, "binary", chunk=len(data)), SAMPLES)
+
+
+@pytest.mark.parametrize("protocol", ["text", "binary"])
+def test_auto_detection_from_a_random_byte_offset(protocol):
+    encode = encode_text_line if protocol == "text" else (lambda sample: encode_sample_frame(sample, 0))
+    frames = [encode(sample) for sample in SAMPLES]
+    data = b"".join(frames)
+    rng = random.Random(0)
+    for _ in range(40):
+        offset = rng.randrange(len(frames[0]) * 5)
+        received = read_all(data[offset:], "auto", chunk=rng.randrange(1, 64))
+        # Everything from the first complete frame after the offset (plus, in
+        # text, whatever fields the partial first line still carries)
+        expected = SAMPLES[-(-offset // len(frames[0])):]
+        assert len(received) - len(expected) in ((0, 1) if protocol == "text" else (0,))
+        assert_samples_equal(received[len(received) - len(expected):], expected)
+
+
+def test_auto_detection_starts_over_when_the_stream_changes():
+    # A board reflashed from text to binary firmware while the port stays open
+    text = b"".join(encode_text_line(sample) for sample in SAMPLES[:10])
+    binary = b"".join(encode_sample_frame(sample, tick) for tick, sample in enumerate(SAMPLES * 3))
+    received = read_all(text + binary, "auto")
+    assert_samples_equal(received[:10], SAMPLES[:10])
+    binary_received = [sample for sample in received if "tick" in sample]
+    assert len(binary_received) >= len(SAMPLES) * 3 - REDETECT_FAILURES
+    assert binary_received[-1]["tick"] == len(SAMPLES) * 3 - 1
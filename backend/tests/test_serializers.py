@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from serializers import JSON, MSGPACK, _stdlib_json_dumps, encode_json, get_serializer, loads, negotiate
+
+PAYLOAD = {
+    "perclos": {"perclos": np.float64(12.5), "closed_frames": np.int64(3), "status": "Alert"},
+    "prediction": {"confidence": np.float32(0.75), "raw_probs": np.array([0.7, 0.2, 0.1])},
+    "flag": None
+}
+EXPECTED = {
+    "perclos": {"perclos": 12.5, "closed_frames": 3, "status": "Alert"},
+    "prediction": {"confidence": 0.75, "raw_probs": [0.7, 0.2, 0.1]},
+    "flag": None
+}
+
+
+def test_json_encodes_numpy_values():
+    assert json.loads(JSON.dumps(PAYLOAD)) == EXPECTED
+    assert json.loads(_stdlib_json_dumps(PAYLOAD)) == EXPECTED
+    assert loads(encode_json(PAYLOAD)) == EXPECTED
+
+
+def test_unserializable_value_raises():
+    with pytest.raises(TypeError):
+        _stdlib_json_dumps({"value": object()})
+
+
+@pytest.mark.skipif(MSGPACK is None, reason="no MessagePack backend installed")
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    assert msgpack.unpackb(MSGPACK.dumps(PAYLOAD), raw=False) == EXPECTED
+
+
+def test_negotiation():
+    assert negotiate() is JSON
+    assert negotiate("text/html, application/json") is JSON
+    assert negotiate(fmt="json", accept="application/msgpack") is JSON
+    expected = MSGPACK or JSON
+    assert negotiate("application/x-msgpack;q=0.9") is expected
+    assert negotiate(fmt="msgpack") is expected
+    assert get_serializer("unknown") is JSON
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from sessions import DEFAULT_SESSION_ID, Session, SessionLimitError, SessionManager
+
+
+def test_create_and_lookup():
+    manager = SessionManager()
+    session = manager.create("cab1")
+    assert manager.get("cab1") is session and "cab1" in manager and len(manager) == 1
+    with pytest.raises(KeyError):
+        manager.create("cab1")
+    assert manager.get_or_create("cab1") is session
+    assert manager.get_or_create("cab2") is not session and len(manager) == 2
+    assert len(manager.create().id) == 32 # Random id
+    assert manager.remove("cab1") is session and manager.get("cab1") is None
+
+
+def test_sessions_get_their_own_state_and_engine():
+    engines = []
+    manager = SessionManager(engine_factory=lambda: engines.append(object()) or engines[-1])
+    first, second = manager.create("a"), manager.create("b")
+    assert first.ml_engine is engines[0] and second.ml_engine is engines[1]
+    assert first.vision is not second.vision and first.head_pose is not second.head_pose
+    assert first.vision.head_pose is first.head_pose
+
+
+def test_a_failing_engine_factory_leaves_the_session_without_ml():
+    def factory():
+        raise RuntimeError("no model")
+
+    session = SessionManager(engine_factory=factory).create("a")
+    assert session.ml_engine is None
+    assert session.predict({}, {"angle_x": 0, "angle_y": 0}, 0)["status"] == "Waiting..."
+
+
+def test_idle_eviction_spares_connected_and_default_sessions():
+    removed = []
+    manager = SessionManager(idle_timeout=60, on_remove=removed.append)
+    idle, connected, default = manager.create("idle"), manager.create("connected"), manager.create(DEFAULT_SESSION_ID)
+    connected.connections = 1
+    now = time.time()
+    assert manager.evict_idle(now + 30) == []
+    assert manager.evict_idle(now + 120) == ["idle"]
+    assert removed == [idle]
+    assert manager.get("connected") is connected and manager.get(DEFAULT_SESSION_ID) is default
+
+
+def test_session_cap_evicts_idle_sessions_first():
+    manager = SessionManager(idle_timeout=60, max_sessions=2)
+    old, busy = manager.create("old"), manager.create("busy")
+    busy.connections = 1
+    with pytest.raises(SessionLimitError):
+        manager.create("new")
+    old.last_seen -= 120
+    assert manager.create("new").id == "new"
+    assert manager.get("old") is None and len(manager) == 2
+
+
+def test_on_remove_errors_do_not_break_removal():
+    def cleanup(session):
+        raise RuntimeError("cleanup failed")
+
+    manager = SessionManager(on_remove=cleanup)
+    manager.create("a")
+    assert manager.remove("a").id == "a" and "a" not in manager
+
+
+def test_reset_waits_for_the_frame_in_progress():
+    session = Session("a")
+    session.head_pose.calibration_counter = 5
+    before = session.version.value
+    done = threading.Event()
+    with session.vision.lock: # A frame being processed
+        threading.Thread(target=lambda: (session.reset_calibration(), done.set()), daemon=True).start()
+        assert not done.wait(0.2)
+        assert session.head_pose.calibration_counter == 5
+    assert done.wait(2)
+    assert session.head_pose.calibration_counter == 0 and session.vision.is_calibrating_eyes
+    assert session.version.value > before
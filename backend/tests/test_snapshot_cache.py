@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from sensors.acquisition import AcquisitionManager
+from sensors.store import SensorStore
+from serializers import JSON, MSGPACK, Serializer
+from sessions import SessionManager
+from snapshot_cache import _ETAG_PREFIX, SnapshotCache, VersionCounter
+
+BINARY = Serializer("stand-in", "application/x-stand-in", lambda value: b"", binary=True)
+
+
+def test_version_counters_share_one_sequence():
+    a, b = VersionCounter(), VersionCounter()
+    assert a.value == b.value == 0
+    first = a.bump()
+    second = b.bump()
+    assert a.value == first and second > first
+    assert a.bump() > second # Never returns to a value a reader may have seen
+
+
+def test_snapshot_is_rebuilt_only_when_the_key_changes():
+    cache = SnapshotCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"sensor": {"hr": 70 + len(builds)}}
+
+    first = cache.get("s1", (1, 1), build)
+    assert cache.get("s1", (1, 1), build) is first
+    second = cache.get("s1", (1, 2), build)
+    assert second is not first and second.data == {"sensor": {"hr": 72}}
+    assert cache.stats() == {"entries": 1, "hits": 1, "builds": 2}
+
+    cache.get("s2", (1, 2), build)
+    assert cache.stats()["entries"] == 2
+    cache.discard("s1")
+    assert cache.get("s1", (1, 2), build) is not second
+    assert cache.stats() == {"entries": 2, "hits": 1, "builds": 4}
+
+
+def test_etag_generation():
+    cache = SnapshotCache()
+    first = cache.get("s1", 1, lambda: {"a": 1})
+    second = cache.get("s1", 2, lambda: {"a": 1})
+    assert first.etag.startswith(f'"{_ETAG_PREFIX}-') and first.etag.endswith('"')
+    assert first.etag != second.etag # Same content, new version
+    assert json.loads(first.body) == {"a": 1} and first.text == first.body.decode()
+    assert first.etag_for(JSON) == first.etag
+    assert first.etag_for(BINARY) == f'{first.etag[:-1]}-stand-in"'
+
+
+def test_if_none_match():
+    snapshot = SnapshotCache().get("s1", 1, lambda: {"a": 1})
+    etag = snapshot.etag
+    assert snapshot.matches(etag)
+    assert snapshot.matches(f"W/{etag}")
+    assert snapshot.matches(f'"other", {etag}')
+    assert snapshot.matches("*")
+    assert not snapshot.matches(None) and not snapshot.matches("")
+    assert not snapshot.matches('"other"')
+    assert not snapshot.matches(etag, BINARY) # Per-format tags
+    assert snapshot.matches(snapshot.etag_for(BINARY), BINARY)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The REST app with a fresh session registry, cache and sensor store (no startup tasks)."""
+    manager = AcquisitionManager(scan=dict, settle=0)
+    monkeypatch.setattr(server, "acquisition", manager)
+    monkeypatch.setattr(server, "default_store", SensorStore(server.default_store.device_id))
+    monkeypatch.setattr(server, "session_manager", SessionManager())
+    monkeypatch.setattr(server, "snapshot_cache", SnapshotCache())
+    server.session_manager.create("driverA")
+    yield TestClient(server.app)
+    manager.stop()
+
+
+def test_combined_data_revalidates_with_304(client):
+    url = "/api/combined_data?session_id=driverA"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    # Nothing changed: 304 with the same tag and no body
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag and again.content == b""
+    assert server.snapshot_cache.stats()["builds"] == 1
+
+    # A session change (frame, reset, prediction) gives a new snapshot and tag
+    server.session_manager.get("driverA").version.bump()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["perclos"] == first.json()["perclos"]
+
+
+@pytest.mark.skipif(MSGPACK is None, reason="no MessagePack backend installed")
+def test_combined_data_etag_is_per_format(client):
+    url = "/api/combined_data?session_id=driverA"
+    json_etag = client.get(url).headers["etag"]
+    packed = client.get(url, headers={"Accept": MSGPACK.media_type, "If-None-Match": json_etag})
+    assert packed.status_code == 200 and packed.headers["etag"] != json_etag
+    assert client.get(url, headers={"Accept": MSGPACK.media_type, "If-None-Match": packed.headers["etag"]}).status_code == 304
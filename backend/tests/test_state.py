@@ -0,0 +1,50 @@
+import threading
+
+from sensors.state import SensorState
+
+
+def test_publish_swaps_in_a_new_snapshot():
+    state = SensorState({"hr": 70.0})
+    before = state.current
+    with state.lock:
+        after = state.publish({"hr": 72.0, "timestamp": 100})
+    assert state.current is after and after.seq > before.seq and after.seq == state.seq
+    assert before["hr"] == 70.0 and after["hr"] == 72.0 # Old readers keep their view
+    assert state.version.value == after.seq
+
+
+def test_head_position_and_cardio_carry_over_until_replaced():
+    state = SensorState({})
+    with state.lock:
+        state.publish({"hr": 70.0}, head_position={"position": "Center"}, cardio={"beats": 3})
+        state.publish({"hr": 71.0})
+    assert state.current.head_position == {"position": "Center"}
+    assert state.current.cardio == {"beats": 3}
+    with state.lock:
+        state.publish({"hr": 72.0}, cardio={"beats": 4})
+    assert state.current.cardio == {"beats": 4} and state.current.head_position == {"position": "Center"}
+
+
+def test_is_active_needs_recent_imu_data():
+    state = SensorState({"hr": 70.0, "timestamp": 100})
+    assert not state.current.is_active(101, 2.0)
+    state.update({"ax": 0.1})
+    assert state.current.is_active(101, 2.0)
+    assert not state.current.is_active(103, 2.0)
+
+
+def test_concurrent_updates_keep_every_field():
+    state = SensorState({})
+    seqs = []
+
+    def writer(field):
+        for i in range(2000):
+            seqs.append(state.update({field: float(i)}).seq)
+
+    threads = [threading.Thread(target=writer, args=(field,)) for field in ("ax", "ay", "az")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state.current.data == {"ax": 1999.0, "ay": 1999.0, "az": 1999.0}
+    assert len(set(seqs)) == 6000 and state.seq == max(seqs)
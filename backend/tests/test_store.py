@@ -0,0 +1,40 @@
+from sensors.store import SensorStore
+
+VITALS = {"temperature": 36.6, "hr": 72.0, "spo2": 98.0, "ax": 0.1, "ay": 0.0, "az": 9.8}
+
+
+def test_vital_samples_add_history_rows_and_snapshot_values():
+    store = SensorStore("test", history_capacity=64)
+    store.publish([VITALS, {**VITALS, "hr": 74.0}], [10.0, 10.5])
+    assert len(store.history) == 2
+    data = store.state.current.data
+    assert data["hr"] == 74.0 and data["timestamp"] is not None
+
+
+def test_heartbeat_lines_only_feed_the_cardio_windows():
+    store = SensorStore("test", history_capacity=64)
+    store.publish([VITALS], [10.0])
+    before = store.state.current
+    store.publish([{"ibi": 800.0}, {"ibi": 810.0}, {"ppg": 512.0}], [10.8, 11.6, 11.7])
+    after = store.state.current
+    assert len(store.history) == 1 # No stale copies of the last vitals row
+    assert after.data is before.data
+    assert "ibi" not in after.data and "ppg" not in after.data
+    assert after.cardio["beats"] == 2 and after.seq > before.seq
+
+
+def test_mixed_lines_keep_heartbeat_keys_out_of_the_payload():
+    store = SensorStore("test", history_capacity=64)
+    store.publish([{**VITALS, "ibi": 800.0, "ppg": 500.0, "tick": 1234}], [10.0])
+    data = store.state.current.data
+    assert len(store.history) == 1 and data["hr"] == 72.0
+    assert not {"ibi", "ppg", "tick"} & set(data)
+    assert store.state.current.cardio["beats"] == 1
+
+
+def test_ppg_samples_without_a_beat_publish_nothing():
+    store = SensorStore("test", history_capacity=64)
+    store.publish([VITALS], [10.0])
+    seq = store.state.seq
+    store.publish([{"ppg": 512.0}, {"ppg": 513.0}], [10.01, 10.02])
+    assert store.state.seq == seq and len(store.history) == 1
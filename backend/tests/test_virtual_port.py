@@ -0,0 +1,30 @@
+import threading
+import time
+
+import pytest
+import serial
+
+from sensors.serial_reader import read_bulk
+from sensors.virtual_port import VirtualSerialPort
+
+pytest.importorskip("tty") # POSIX ptys only
+
+
+@pytest.mark.parametrize("protocol", ["text", "binary"])
+def test_every_sample_round_trips_with_auto_detection(protocol, samples=1000, rate=500):
+    with VirtualSerialPort(protocol, rate, record=True) as device:
+        ser = serial.Serial(device.port, timeout=0.1)
+        received = []
+        stop = threading.Event()
+        reader = threading.Thread(target=read_bulk, args=(ser, received.extend, stop, "auto"), daemon=True)
+        reader.start()
+        device.start(limit=samples).wait()
+        time.sleep(0.3)
+        stop.set()
+        reader.join(1)
+        ser.close()
+
+    assert len(received) == len(device.sent) == samples
+    for sent, got in zip(device.sent, received):
+        for field, value in sent.items():
+            assert got[field] == pytest.approx(value, abs=1e-3)
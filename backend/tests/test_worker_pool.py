@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+import pytest
+
+from cv.worker_pool import FaceMeshWorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = FaceMeshWorkerPool(num_workers=2, queue_size=4)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture(scope="module")
+def blank_jpeg():
+    ok, buf = cv2.imencode(".jpg", np.zeros((120, 160, 3), np.uint8))
+    assert ok
+    return buf.tobytes()
+
+
+def test_not_running_refuses_frames():
+    with pytest.raises(RuntimeError):
+        FaceMeshWorkerPool(num_workers=1).submit("a", b"")
+
+
+def test_session_sticks_to_one_worker(pool, blank_jpeg):
+    first = pool.assign("a")
+    assert pool.assign("b") != first # Least-loaded worker
+    assert pool.assign("a") == first
+
+    for _ in range(3):
+        result = pool.submit("a", blank_jpeg).result(timeout=60)
+        assert result["landmarks"] is None and (result["width"], result["height"]) == (160, 120)
+    completed = {w["worker"]: w["completed"] for w in pool.stats()["workers"]}
+    assert completed == {first: 3, 1 - first: 0}
+
+    pool.release("a")
+    assert pool.stats()["sessions"] == 1
+    assert pool.assign("c") == first # Freed slot is reused
+
+
+def test_undecodable_frame_resolves_to_none(pool):
+    assert pool.submit("a", b"not an image").result(timeout=60) is None
+
+
+def test_dead_worker_is_restarted_with_its_sessions(pool, blank_jpeg):
+    index = pool.assign("a")
+    worker = pool._workers[index]
+    old_pid = worker.process.pid
+
+    # A frame still queued on the dying worker fails instead of hanging
+    stranded = Future()
+    worker.pending[-1] = stranded
+    worker.process.kill()
+    worker.process.join(5)
+
+    deadline = time.monotonic() + 10
+    while pool._workers[index] is worker and time.monotonic() < deadline:
+        time.sleep(0.1) # The result reader checks workers about once a second
+    replacement = pool._workers[index]
+    assert replacement is not worker
+    assert replacement.process.is_alive() and replacement.process.pid != old_pid
+    with pytest.raises(RuntimeError, match="died"):
+        stranded.result(timeout=1)
+
+    # The session stays pinned and the new worker serves it
+    assert pool.assign("a") == index and "a" in replacement.sessions
+    assert pool.submit("a", blank_jpeg).result(timeout=60)["landmarks"] is None
+    assert replacement.stats()["completed"] == 1
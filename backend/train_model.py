@@ -5,6 +5,7 @@ import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
+from ml.rolling import rolling_features
 
 # 1. SETUP
 DATA_FILE = "fatigue_dataset.csv"
@@ -23,9 +24,15 @@ df = df.sort_values(by=['session_id', 'timestamp'])
 
 base_features = ['ear', 'mar', 'head_pitch', 'head_yaw', 'hr', 'temperature']
 
-for col in base_features:
-    df[f'{col}_mean'] = df.groupby('session_id')[col].transform(lambda x: x.rolling(window=WINDOW_SIZE, min_periods=1).mean())
-    df[f'{col}_std'] = df.groupby('session_id')[col].transform(lambda x: x.rolling(window=WINDOW_SIZE, min_periods=1).std())
+# Same incremental window statistics as live inference (MLEngine), per session
+values = df[base_features].to_numpy(dtype=np.float64)
+means = np.empty_like(values)
+stds = np.empty_like(values)
+for rows in df.groupby('session_id', sort=False).indices.values():
+    means[rows], stds[rows] = rolling_features(values[rows], WINDOW_SIZE)
+for i, col in enumerate(base_features):
+    df[f'{col}_mean'] = means[:, i]
+    df[f'{col}_std'] = stds[:, i]
 
 df = df.fillna(0)
 
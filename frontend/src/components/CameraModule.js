@@ -32,7 +32,9 @@ export default function CameraModule() {
         const wsUrl = API_BASE.replace(/^http/, 'ws') + '/ws/detect';
         console.log("Connecting to WS:", wsUrl);
         
-        const socket = new WebSocket(wsUrl);
+        // Binary frame protocol: raw JPEG bytes + 16-byte header (magic, frame id, capture time)
+        const socket = new WebSocket(wsUrl, ["fatigue.binary.v1"]);
+        socket.binaryType = "arraybuffer";
         wsRef.current = socket;
 
         socket.onopen = () => {
@@ -70,6 +72,21 @@ export default function CameraModule() {
       }
     }
 
+    let frameId = 0;
+
+    // Header layout must match backend/cv/frame_protocol.py (little-endian "<4sId")
+    const buildFrameHeader = (id, captureTs) => {
+       const header = new ArrayBuffer(16);
+       const view = new DataView(header);
+       view.setUint8(0, 0x46); // F
+       view.setUint8(1, 0x54); // T
+       view.setUint8(2, 0x47); // G
+       view.setUint8(3, 0x31); // 1
+       view.setUint32(4, id >>> 0, true);
+       view.setFloat64(8, captureTs, true);
+       return header;
+    };
+
     const startSendingFrames = () => {
        const sendLoop = () => {
           if (!videoRef.current || !canvasRef.current || !wsRef.current) {
@@ -88,11 +105,14 @@ export default function CameraModule() {
              
              ctx.drawImage(videoRef.current, 0, 0, canvas.width, canvas.height);
              
-             // Compress to JPEG 0.5
-             const imageData = canvas.toDataURL("image/jpeg", 0.5);
-             
-             // Send
-             wsRef.current.send(JSON.stringify({ image_data: imageData }));
+             // Compress to JPEG 0.5 and send raw bytes (no base64 / JSON overhead)
+             const socket = wsRef.current;
+             const header = buildFrameHeader(frameId++, Date.now());
+             canvas.toBlob((blob) => {
+                if (blob && socket.readyState === WebSocket.OPEN) {
+                   socket.send(new Blob([header, blob]));
+                }
+             }, "image/jpeg", 0.5);
           }
 
           // Throttle to ~30FPS or just use animation frame
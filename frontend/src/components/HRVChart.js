@@ -9,49 +9,39 @@ import {
   ResponsiveContainer
 } from "recharts";
 import { useTheme } from "../context/ThemeContext";
+import { useFatigueContext } from "../context/FatigueContext";
 import "./Css/HRVChart.css";
 
+// Shortest HRV window pushed with the combined snapshot (backend sensors.cardio):
+// SDNN from beat intervals when the board sends them, else the SD of the HR readings
+const hrvReading = (hrv) => {
+  const shortest = hrv?.windows?.[0];
+  if (shortest?.sdnn != null) return { value: shortest.sdnn, unit: "ms (SDNN)" };
+  if (shortest?.hr_sd != null) return { value: shortest.hr_sd, unit: "bpm (HR SD)" };
+  return null;
+};
+
 export default function HRVChart() {
+  const { fullData } = useFatigueContext();
   const [hrvHistory, setHrvHistory] = useState([]);
-  const [rawHrBuffer, setRawHrBuffer] = useState([]);
+  const [unit, setUnit] = useState("ms (SDNN)");
   const { isDarkMode } = useTheme();
+  const serverTime = fullData?.server_time;
+  const hrv = fullData?.hrv;
 
+  // One point per second of server time (the stream pushes more often)
   useEffect(() => {
-    const fetchHR = async () => {
-      try {
-        const res = await fetch("http://127.0.0.1:5000/combined_data");
-        const data = await res.json();
-        
-        const currentHr = data.sensor?.hr || 0;
-
-        let newBuffer = [...rawHrBuffer, currentHr];
-        if (newBuffer.length > 20) newBuffer.shift(); 
-        setRawHrBuffer(newBuffer);
-
-        const validReadings = newBuffer.filter(h => h > 40 && h < 200);
-        
-        let sdnn = 0;
-        if (validReadings.length > 2) {
-            const mean = validReadings.reduce((sum, val) => sum + val, 0) / validReadings.length;
-            const variance = validReadings.reduce((sum, val) => sum + Math.pow(val - mean, 2), 0) / validReadings.length;
-            sdnn = Math.sqrt(variance);
-        }
-
-        setHrvHistory(prev => {
-           const time = prev.length > 0 ? prev[prev.length-1].time + 1 : 0;
-           const newData = [...prev, { time, value: sdnn }];
-           if (newData.length > 30) newData.shift();
-           return newData;
-        });
-
-      } catch (err) {
-        console.error("HRV Fetch Error", err);
-      }
-    };
-
-    const interval = setInterval(fetchHR, 1000); 
-    return () => clearInterval(interval);
-  }, [rawHrBuffer]);
+    const reading = hrvReading(hrv);
+    if (!reading || serverTime == null) return;
+    setUnit(reading.unit);
+    setHrvHistory(prev => {
+      if (prev.length > 0 && prev[prev.length - 1].serverTime === serverTime) return prev;
+      const time = prev.length > 0 ? prev[prev.length - 1].time + 1 : 0;
+      const newData = [...prev, { time, serverTime, value: reading.value }];
+      if (newData.length > 30) newData.shift();
+      return newData;
+    });
+  }, [hrv, serverTime]);
 
   return (
     <div className="hrv-container">
@@ -71,7 +61,7 @@ export default function HRVChart() {
              axisLine={false}
           />
           <YAxis 
-            domain={[0, 20]} 
+            domain={[0, 'auto']} 
             hide={true}
           />
           <Tooltip 
@@ -82,7 +72,7 @@ export default function HRVChart() {
                 fontSize: '12px',
                 color: isDarkMode ? '#f1f5f9' : '#0f172a'
              }}
-             formatter={(val) => [`${val.toFixed(1)}`, 'HRV (SDNN)']}
+             formatter={(val) => [`${val.toFixed(1)}`, `HRV ${unit}`]}
              labelStyle={{display: 'none'}}
              cursor={{ stroke: '#8b5cf6', strokeWidth: 1, strokeDasharray: '4 4' }}
           />
@@ -102,7 +92,7 @@ export default function HRVChart() {
           <div className="hrv-value">
              {hrvHistory.length > 0 ? hrvHistory[hrvHistory.length-1].value.toFixed(1) : "--"}
           </div>
-          <div className="hrv-label">ms (SDNN)</div>
+          <div className="hrv-label">{unit}</div>
       </div>
     </div>
   );
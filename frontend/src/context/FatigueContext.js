@@ -3,6 +3,13 @@ import { API_BASE } from '../api';
 
 const FatigueContext = createContext();
 
+// Fallback polling while /ws/stream is down (ms); doubles per failed request
+const POLL_INTERVAL = 2000;
+const POLL_MAX_INTERVAL = 30000;
+// /ws/stream reconnect delay (ms); doubles per failed attempt
+const RECONNECT_MIN = 1000;
+const RECONNECT_MAX = 30000;
+
 export const useFatigueContext = () => {
     return useContext(FatigueContext);
 };
@@ -51,9 +58,18 @@ export const FatigueProvider = ({ children }) => {
 
     }, [fullData]);
 
-    // ---------------- POLLING LOOP ----------------
+    // ---------------- PUSH STREAM (Polling Fallback) ----------------
+    // The backend pushes the combined snapshot over /ws/stream; polling only
+    // runs while that socket is down, at POLL_INTERVAL and slower while the
+    // backend keeps failing. Reconnects back off the same way.
     useEffect(() => {
         let isMounted = true;
+        let socket = null;
+        let polling = false;
+        let pollTimer = null;
+        let pollDelay = POLL_INTERVAL;
+        let reconnectTimer = null;
+        let reconnectDelay = RECONNECT_MIN;
 
         const fetchData = async () => {
             try {
@@ -73,20 +89,71 @@ export const FatigueProvider = ({ children }) => {
                     const richData = { ...json, status: "Active" };
                     setFullData(richData);
                 }
+                return true;
             } catch (error) {
                 console.error("[FatigueContext] Fetch Error:", error);
                 if (isMounted) {
                      setFullData(prev => prev ? ({ ...prev, status: "Offline" }) : null);
                 }
+                return false;
             }
         };
 
-        // Poll at 500ms (2Hz) - Good balance for Head Pose smoothness & Data Freshness
-        const interval = setInterval(fetchData, 500); 
+        // One request at a time; the next is scheduled once this one is done
+        const poll = async () => {
+            const ok = await fetchData();
+            if (!isMounted || !polling) return;
+            pollDelay = ok ? POLL_INTERVAL : Math.min(pollDelay * 2, POLL_MAX_INTERVAL);
+            pollTimer = setTimeout(poll, pollDelay);
+        };
+
+        const startPolling = () => {
+            if (polling) return;
+            polling = true;
+            pollDelay = POLL_INTERVAL;
+            poll();
+        };
+
+        const stopPolling = () => {
+            polling = false;
+            clearTimeout(pollTimer);
+            pollTimer = null;
+        };
+
+        const connect = () => {
+            const wsUrl = API_BASE.replace(/^http/, 'ws') + '/ws/stream';
+            socket = new WebSocket(wsUrl);
+
+            socket.onopen = () => {
+                reconnectDelay = RECONNECT_MIN;
+                stopPolling();
+            };
+
+            socket.onmessage = (event) => {
+                if (!isMounted) return;
+                try {
+                    const json = JSON.parse(event.data);
+                    setFullData({ ...json, status: "Active" });
+                } catch (error) {
+                    console.error("[FatigueContext] Stream Parse Error:", error);
+                }
+            };
+
+            socket.onclose = () => {
+                if (!isMounted) return;
+                startPolling();
+                reconnectTimer = setTimeout(connect, reconnectDelay);
+                reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX);
+            };
+        };
+
+        connect();
 
         return () => {
              isMounted = false;
-             clearInterval(interval);
+             stopPolling();
+             clearTimeout(reconnectTimer);
+             if (socket) socket.close();
         };
     }, []);
 
@@ -1,46 +1,25 @@
 import { useState, useEffect } from 'react';
-import { API_BASE } from '../api';
+import { useFatigueContext } from '../context/FatigueContext';
 
+// Reads the combined snapshot pushed over /ws/stream (FatigueContext)
 export const useCombinedData = () => {
-  const [data, setData] = useState({
-    temperature: null,
-    perclos: null,
-    status: 'Loading...',
-    timestamp: null,
-    history: []
-  });
+  const { fullData } = useFatigueContext();
+  const [history, setHistory] = useState([]);
 
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const [sensorRes, perclosRes] = await Promise.all([
-          fetch(`${API_BASE}/sensor_data`),
-          fetch(`${API_BASE}/perclos`)
-        ]);
+    if (!fullData) return;
+    setHistory(prev => [...prev.slice(-19), {
+      time: new Date().toLocaleTimeString(),
+      temperature: fullData.sensor?.temperature,
+      perclos: fullData.perclos?.perclos
+    }]);
+  }, [fullData]);
 
-        const sensorData = await sensorRes.json();
-        const perclosData = await perclosRes.json();
-
-        setData(prev => ({
-          temperature: sensorData.temperature,
-          perclos: perclosData.perclos,
-          status: perclosData.status,
-          timestamp: Date.now(),
-          history: [...prev.history.slice(-19), {
-            time: new Date().toLocaleTimeString(),
-            temperature: sensorData.temperature,
-            perclos: perclosData.perclos
-          }]
-        }));
-      } catch (error) {
-        console.error('Error fetching data:', error);
-      }
-    };
-
-    fetchData();
-    const interval = setInterval(fetchData, 3000);
-    return () => clearInterval(interval);
-  }, []);
-
-  return data;
+  return {
+    temperature: fullData?.sensor?.temperature ?? null,
+    perclos: fullData?.perclos?.perclos ?? null,
+    status: fullData?.perclos?.status ?? 'Loading...',
+    timestamp: fullData ? Date.now() : null,
+    history
+  };
 };
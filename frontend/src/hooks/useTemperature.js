@@ -1,29 +1,18 @@
-import { useState, useEffect } from 'react';
-import { getTemperatureHistory } from '../api';
+import { useMemo } from 'react';
+import { useFatigueContext } from '../context/FatigueContext';
 
+// Temperature history kept by FatigueContext from the /ws/stream snapshots
 export const useTemperature = () => {
-  const [data, setData] = useState([]);
-  const [latestTemp, setLatestTemp] = useState(null);
+  const { tempHistory } = useFatigueContext();
 
-  useEffect(() => {
-    const fetchTemperature = async () => {
-      const history = await getTemperatureHistory();
-      if (Array.isArray(history) && history.length > 0) {
-        const formatted = history.map((item) => ({
-          time: new Date(item.timestamp * 1000)
-            .toLocaleTimeString()
-            .slice(0, 8),
-          value: item.temperature,
-        }));
-        setData(formatted);
-        setLatestTemp(formatted[formatted.length - 1]?.value || null);
-      }
-    };
-
-    fetchTemperature();
-    const interval = setInterval(fetchTemperature, 5000);
-    return () => clearInterval(interval);
-  }, []);
+  const data = useMemo(
+    () => tempHistory.map((item) => ({
+      time: item.time.slice(0, 8),
+      value: item.temperature,
+    })),
+    [tempHistory]
+  );
+  const latestTemp = data[data.length - 1]?.value || null;
 
   return { data, latestTemp };
 };